@@ -1,10 +1,12 @@
 # Анализатор состояния пользователя
 
+import re
 from datetime import datetime, time
 from enum import Enum
 from dataclasses import dataclass
-from typing import List, Optional, Callable
+from typing import List, Optional, Callable, Pattern
 
+from .clock import Clock, SYSTEM_CLOCK
 from .tracker import ActivityState
 
 
@@ -79,9 +81,27 @@ class StateAnalyzer:
         'premiere', 'aftereffects', 'audacity', 'fl studio'
     ]
     
-    def __init__(self, work_apps: List[str] = None, entertainment_apps: List[str] = None):
-        self.work_apps = work_apps or self.DEEP_WORK_APPS
-        self.entertainment_apps = entertainment_apps or self.ENTERTAINMENT_APPS
+    # заголовки вкладок браузера: работа или развлечение
+    WORK_TITLE_KEYWORDS = [
+        'github', 'stackoverflow', 'docs', 'documentation',
+        'google docs', 'sheets', 'drive', 'jira', 'confluence'
+    ]
+    
+    ENTERTAINMENT_TITLE_KEYWORDS = [
+        'youtube', 'netflix', 'twitch', 'reddit',
+        'twitter', 'facebook', 'instagram'
+    ]
+    
+    def __init__(self, work_apps: List[str] = None, entertainment_apps: List[str] = None,
+                 clock: Clock = None):
+        # время суток, рабочие часы и длительности - по этим часам
+        self.clock = clock or SYSTEM_CLOCK
+        self._communication_re = self._compile(self.COMMUNICATION_APPS)
+        self._research_re = self._compile(self.RESEARCH_APPS)
+        self._creative_re = self._compile(self.CREATIVE_KEYWORDS)
+        self._work_title_re = self._compile(self.WORK_TITLE_KEYWORDS)
+        self._entertainment_title_re = self._compile(self.ENTERTAINMENT_TITLE_KEYWORDS)
+        self.set_app_lists(work_apps, entertainment_apps)
         
         self._work_session_start: Optional[datetime] = None
         self._last_mode: UserMode = UserMode.IDLE
@@ -99,6 +119,29 @@ class StateAnalyzer:
         self._warning_threshold = 15
         self._warning_cooldown = 20
     
+    @staticmethod
+    def _compile(apps: List[str]) -> Optional[Pattern]:
+        # список подстрок -> одна регулярка (длинные первыми)
+        names = sorted({a.lower() for a in apps if a}, key=len, reverse=True)
+        if not names:
+            return None
+        return re.compile('|'.join(re.escape(n) for n in names))
+    
+    @staticmethod
+    def _matches(pattern: Optional[Pattern], text: str) -> bool:
+        return pattern is not None and pattern.search(text) is not None
+    
+    def set_app_lists(self, work_apps: List[str] = None, entertainment_apps: List[str] = None):
+        # списки приложений из настроек - пересобрать классификатор категорий
+        self.work_apps = work_apps or self.DEEP_WORK_APPS
+        self.entertainment_apps = entertainment_apps or self.ENTERTAINMENT_APPS
+        self._work_re = self._compile(self.work_apps)
+        self._entertainment_re = self._compile(self.entertainment_apps)
+        # для режима - списки из настроек плюс встроенные: в настройках по
+        # умолчанию нет unity, youtube и т.п., режим для них не должен пропасть
+        self._work_mode_re = self._compile(self.work_apps + self.DEEP_WORK_APPS)
+        self._entertainment_mode_re = self._compile(self.entertainment_apps + self.ENTERTAINMENT_APPS)
+    
     def set_procrastination_settings(self, enabled: bool, work_start: str, work_end: str,
                                      threshold_minutes: int, cooldown_minutes: int):
         self._procrastination_enabled = enabled
@@ -116,7 +159,7 @@ class StateAnalyzer:
         self._warning_callback = callback
     
     def _is_work_hours(self) -> bool:
-        now = datetime.now().time()
+        now = self.clock.now().time()
         if self._work_hours_start < self._work_hours_end:
             return self._work_hours_start <= now <= self._work_hours_end
         # если конец < начала (ночная смена)
@@ -130,7 +173,7 @@ class StateAnalyzer:
             self._entertainment_start = None
             return ProcrastinationWarning()
         
-        now = datetime.now()
+        now = self.clock.now()
         
         if current_mode == UserMode.ENTERTAINMENT:
             if self._entertainment_start is None:
@@ -183,10 +226,9 @@ class StateAnalyzer:
             self._entertainment_start = None
             return ProcrastinationWarning()
     
-    @staticmethod
-    def get_time_of_day() -> TimeOfDay:
+    def get_time_of_day(self) -> TimeOfDay:
         # Определить время суток
-        hour = datetime.now().hour
+        hour = self.clock.now().hour
         
         if 6 <= hour < 12:
             return TimeOfDay.MORNING
@@ -205,53 +247,67 @@ class StateAnalyzer:
         if state.is_idle:
             return UserMode.IDLE, 1.0
         
-        # Проверка глубокой работы
-        for work_app in self.DEEP_WORK_APPS:
-            if work_app in app:
-                if state.activity_level == 'high':
-                    return UserMode.DEEP_WORK, 0.9
-                return UserMode.DEEP_WORK, 0.7
+        # Списки work/entertainment из настроек шире категорий режима: в них
+        # есть браузеры, мессенджеры и аудиоредакторы. Поэтому коммуникация,
+        # браузер и креатив проверяются раньше, чем списки
         
         # Проверка коммуникации
-        for comm_app in self.COMMUNICATION_APPS:
-            if comm_app in app:
-                return UserMode.COMMUNICATION, 0.85
-        
-        # Проверка развлечений
-        for ent_app in self.ENTERTAINMENT_APPS:
-            if ent_app in app:
-                return UserMode.ENTERTAINMENT, 0.9
+        if self._matches(self._communication_re, app):
+            return UserMode.COMMUNICATION, 0.85
         
-        # Проверка креатива по ключевым словам
-        for keyword in self.CREATIVE_KEYWORDS:
-            if keyword in app or keyword in window:
+        # Браузер - может быть работа или исследование
+        if self._matches(self._research_re, app):
+            if self._matches(self._creative_re, window):
                 return UserMode.CREATIVE, 0.75
+            # Попробуем определить по заголовку
+            if self._matches(self._work_title_re, window):
+                return UserMode.RESEARCH, 0.7
+            if self._matches(self._entertainment_title_re, window):
+                return UserMode.ENTERTAINMENT, 0.8
+            return UserMode.RESEARCH, 0.5
         
-        # Браузер - может быть работа или исследование
-        for browser in self.RESEARCH_APPS:
-            if browser in app:
-                # Попробуем определить по заголовку
-                work_keywords = ['github', 'stackoverflow', 'docs', 'documentation', 
-                               'google docs', 'sheets', 'drive', 'jira', 'confluence']
-                for kw in work_keywords:
-                    if kw in window:
-                        return UserMode.RESEARCH, 0.7
-                
-                entertainment_keywords = ['youtube', 'netflix', 'twitch', 'reddit', 
-                                         'twitter', 'facebook', 'instagram']
-                for kw in entertainment_keywords:
-                    if kw in window:
-                        return UserMode.ENTERTAINMENT, 0.8
-                
-                return UserMode.RESEARCH, 0.5
+        # Креативные приложения (audacity, premiere)
+        if self._matches(self._creative_re, app):
+            return UserMode.CREATIVE, 0.75
+        
+        # Проверка глубокой работы
+        if self._matches(self._work_mode_re, app):
+            if state.activity_level == 'high':
+                return UserMode.DEEP_WORK, 0.9
+            return UserMode.DEEP_WORK, 0.7
+        
+        # Проверка развлечений
+        if self._matches(self._entertainment_mode_re, app):
+            return UserMode.ENTERTAINMENT, 0.9
+        
+        # Креатив по заголовку окна
+        if self._matches(self._creative_re, window):
+            return UserMode.CREATIVE, 0.75
         
         return UserMode.IDLE, 0.3
     
+    def classify(self, app: str, window: str = "") -> UserMode:
+        # Режим для приложения/окна (для истории сессий)
+        state = ActivityState(current_app=app, current_window=window)
+        return self._detect_mode(state)[0]
+    
+    def categorize(self, app: str) -> str:
+        # Категория приложения: work, research, communication, entertainment, other
+        # work/entertainment - по спискам из настроек
+        app = app.lower()
+        for category, pattern in (('work', self._work_re),
+                                  ('entertainment', self._entertainment_re),
+                                  ('communication', self._communication_re),
+                                  ('research', self._research_re)):
+            if self._matches(pattern, app):
+                return category
+        return 'other'
+    
     def _get_work_session_minutes(self) -> int:
         # Получить длительность текущей рабочей сессии
         if self._work_session_start is None:
             return 0
-        return int((datetime.now() - self._work_session_start).total_seconds() / 60)
+        return int((self.clock.now() - self._work_session_start).total_seconds() / 60)
     
     def _should_take_break(self, work_minutes: int, break_after: int = 50) -> bool:
         # Проверить, нужен ли перерыв
@@ -330,7 +386,7 @@ class StateAnalyzer:
         is_work_mode = mode in [UserMode.DEEP_WORK, UserMode.RESEARCH, UserMode.CREATIVE]
         
         if is_work_mode and self._work_session_start is None:
-            self._work_session_start = datetime.now()
+            self._work_session_start = self.clock.now()
         elif not is_work_mode and mode != UserMode.COMMUNICATION:
             # Сбросить сессию если перешли к отдыху или простою
             if mode in [UserMode.ENTERTAINMENT, UserMode.BREAK, UserMode.IDLE]:
@@ -345,7 +401,7 @@ class StateAnalyzer:
         procrastination = self._check_procrastination(mode)
         
         # Сохранить историю
-        self._mode_history.append((datetime.now(), mode))
+        self._mode_history.append((self.clock.now(), mode))
         if len(self._mode_history) > 1000:
             self._mode_history = self._mode_history[-500:]
         
@@ -0,0 +1,243 @@
+# Постоянный процесс для воспроизведения звука
+#
+# Вместо отдельного powershell на каждый звук держим один процесс-хелпер
+# и шлём ему команды построчно через stdin:
+#
+#   play <путь к файлу>   - открыть файл и играть по кругу
+#   stop                  - остановить
+#   volume <0.0-1.0>      - громкость
+#   quit                  - завершиться
+#
+# Хелпер отвечает строкой "ready" при старте и "ok <команда>" / "err <текст>"
+# на каждую команду. Если процесс упал - перезапускаем и восстанавливаем
+# текущий звук и громкость.
+#
+# python -m afo.audiohost запускает заглушку с тем же протоколом
+# (без звука) - ей можно проверить протокол не на Windows. У заглушки
+# есть ещё команда state: "ok state <playing> <громкость> <файл>".
+
+import subprocess
+import sys
+import threading
+import time
+from typing import List, Optional
+
+
+POWERSHELL_HOST_SCRIPT = r'''
+Add-Type -AssemblyName PresentationCore
+$player = New-Object System.Windows.Media.MediaPlayer
+$culture = [Globalization.CultureInfo]::InvariantCulture
+$stdin = [Console]::In
+[Console]::Out.WriteLine('ready')
+[Console]::Out.Flush()
+while ($true) {
+    $task = $stdin.ReadLineAsync()
+    while (-not $task.Wait(500)) {
+        # зацикливание - MediaEnded без диспетчера не приходит
+        if ($player.Source -and $player.NaturalDuration.HasTimeSpan -and
+            $player.Position -ge $player.NaturalDuration.TimeSpan) {
+            $player.Position = [TimeSpan]::Zero
+            $player.Play()
+        }
+    }
+    $line = $task.Result
+    if ($line -eq $null) { break }
+    $parts = $line.Split(' ', 2)
+    $cmd = $parts[0]
+    try {
+        if ($cmd -eq 'play') {
+            $player.Open([Uri]$parts[1])
+            $player.Play()
+        } elseif ($cmd -eq 'stop') {
+            $player.Stop()
+            $player.Close()
+        } elseif ($cmd -eq 'volume') {
+            $player.Volume = [double]::Parse($parts[1], $culture)
+        } elseif ($cmd -eq 'quit') {
+            [Console]::Out.WriteLine('ok quit')
+            break
+        } else {
+            throw "unknown command"
+        }
+        [Console]::Out.WriteLine("ok $cmd")
+    } catch {
+        [Console]::Out.WriteLine("err $($_.Exception.Message)")
+    }
+    [Console]::Out.Flush()
+}
+$player.Close()
+'''
+
+
+def powershell_command() -> List[str]:
+    return ['powershell', '-NoProfile', '-NonInteractive', '-Command', POWERSHELL_HOST_SCRIPT]
+
+
+def stub_command() -> List[str]:
+    return [sys.executable, '-m', 'afo.audiohost']
+
+
+class AudioHost:
+    # Клиент к процессу-хелперу, один на всё приложение
+
+    # не больше N перезапусков за окно, чтобы не крутиться в цикле
+    MAX_RESTARTS = 5
+    RESTART_WINDOW = 60.0
+
+    def __init__(self, command: List[str] = None):
+        self.command = command or powershell_command()
+        self._proc: Optional[subprocess.Popen] = None
+        self._reader: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # что сейчас должно играть - для восстановления после падения
+        self._current_file: Optional[str] = None
+        self._volume: float = 0.3
+
+        self._restarts: List[float] = []
+        self.replies: List[str] = []
+        self._reply_event = threading.Event()
+
+    def _spawn(self):
+        # запустить процесс (под self._lock)
+        now = time.monotonic()
+        self._restarts = [t for t in self._restarts if now - t < self.RESTART_WINDOW]
+        if len(self._restarts) >= self.MAX_RESTARTS:
+            raise RuntimeError("audio host keeps crashing")
+        self._restarts.append(now)
+
+        self._proc = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding='utf-8',
+            bufsize=1,
+            creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+        )
+        self._reader = threading.Thread(target=self._read_loop, args=(self._proc,), daemon=True)
+        self._reader.start()
+
+    def _read_loop(self, proc: subprocess.Popen):
+        # читаем ответы хелпера, по EOF - процесс умер
+        for line in proc.stdout:
+            self.replies.append(line.rstrip('\n'))
+            if len(self.replies) > 100:
+                del self.replies[:50]
+            self._reply_event.set()
+
+        with self._lock:
+            if proc is not self._proc or self._closed:
+                return
+            self._proc = None
+            if self._current_file is None:
+                # ничего не играло - поднимем при следующей команде
+                return
+            try:
+                self._spawn()
+                self._restore()
+            except Exception as e:
+                print(f"Audio host restart failed: {e}")
+
+    def _restore(self):
+        self._write(f"volume {self._volume:.3f}")
+        if self._current_file:
+            self._write(f"play {self._current_file}")
+
+    def _write(self, line: str):
+        self._proc.stdin.write(line + '\n')
+        self._proc.stdin.flush()
+
+    def _send(self, line: str):
+        with self._lock:
+            if self._closed:
+                return
+            for attempt in range(2):
+                if self._proc is None or self._proc.poll() is not None:
+                    self._spawn()
+                    if line.split(' ', 1)[0] != 'volume':
+                        self._write(f"volume {self._volume:.3f}")
+                try:
+                    self._write(line)
+                    return
+                except (OSError, ValueError):
+                    # сломанный pipe - перезапуск и повтор
+                    self._proc = None
+            raise RuntimeError("audio host is not responding")
+
+    def play(self, file_path: str, volume: float = None):
+        if volume is not None:
+            self._volume = max(0.0, min(1.0, volume))
+        self._current_file = file_path
+        self._send(f"volume {self._volume:.3f}")
+        self._send(f"play {file_path}")
+
+    def stop(self):
+        self._current_file = None
+        if self._proc is not None:
+            self._send("stop")
+
+    def set_volume(self, volume: float):
+        self._volume = max(0.0, min(1.0, volume))
+        if self._proc is not None:
+            self._send(f"volume {self._volume:.3f}")
+
+    def is_alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def wait_reply(self, timeout: float = 5.0) -> Optional[str]:
+        # дождаться следующего ответа хелпера (для проверки протокола)
+        self._reply_event.clear()
+        if self._reply_event.wait(timeout) and self.replies:
+            return self.replies[-1]
+        return None
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            proc, self._proc = self._proc, None
+
+        if proc is None:
+            return
+        try:
+            proc.stdin.write("quit\n")
+            proc.stdin.flush()
+            proc.wait(timeout=2)
+        except Exception:
+            proc.kill()
+
+
+def _stub_main():
+    # Заглушка хелпера: тот же протокол, без звука
+    state = {'file': None, 'volume': 1.0, 'playing': False}
+    print('ready', flush=True)
+
+    for line in sys.stdin:
+        cmd, _, arg = line.rstrip('\n').partition(' ')
+        if cmd == 'play' and arg:
+            state['file'] = arg
+            state['playing'] = True
+        elif cmd == 'stop':
+            state['playing'] = False
+        elif cmd == 'volume':
+            try:
+                state['volume'] = float(arg)
+            except ValueError:
+                print(f"err bad volume {arg}", flush=True)
+                continue
+        elif cmd == 'state':
+            print(f"ok state {int(state['playing'])} {state['volume']:.3f} {state['file']}", flush=True)
+            continue
+        elif cmd == 'quit':
+            print('ok quit', flush=True)
+            break
+        else:
+            print(f"err unknown command {cmd}", flush=True)
+            continue
+        print(f"ok {cmd}", flush=True)
+
+
+if __name__ == '__main__':
+    _stub_main()
@@ -2,9 +2,14 @@
 
 import os
 import sys
-import winreg
 from pathlib import Path
 
+try:
+    import winreg
+    WINREG_AVAILABLE = True
+except ImportError:
+    WINREG_AVAILABLE = False
+
 
 REGISTRY_KEY = r"Software\Microsoft\Windows\CurrentVersion\Run"
 APP_NAME = "AmbientFlowOrchestrator"
@@ -12,6 +17,9 @@ APP_NAME = "AmbientFlowOrchestrator"
 
 def get_exe_path() -> str:
     # Получить путь к exe или скрипту
+    if not WINREG_AVAILABLE:
+        # не Windows - автозагрузки нет
+        return ""
     if getattr(sys, 'frozen', False):
         # PyInstaller exe
         return sys.executable
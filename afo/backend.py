@@ -0,0 +1,229 @@
+# Платформенный бэкенд: всё, что трогает ОС
+#
+# Трекер, дисплей, звук, фокус, автозагрузка и горячие клавиши ходят в
+# систему только через Backend. Реализации:
+#   headless  - Backend как есть: окна нет, простоя нет, действия в никуда;
+#   sim       - SimulatedBackend: окна и простой по сценарию, действия
+#               записываются - одинаковый прогон на любой машине;
+#   windows   - afo.win32, грузится только при выборе (pywin32, ctypes.windll,
+#               winreg, keyboard не импортируются на других ОС).
+#
+# По умолчанию windows на Windows и headless на остальных.
+
+import sys
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .startup import lazy_import
+
+
+class AudioOutput:
+    # Плеер фонового звука. Создаётся и вызывается только из потока звука
+    # SoundController - COM-объекты живут в потоке, который их создал
+
+    def open(self):
+        pass
+
+    def play(self, file_path: str, volume: float):
+        pass
+
+    def stop(self):
+        pass
+
+    def set_volume(self, volume: float):
+        pass
+
+    def close(self):
+        pass
+
+
+class Backend:
+    # Без ОС: для headless-запуска и как база для остальных
+
+    name = 'headless'
+
+    # --- активность
+
+    def foreground_window(self) -> Tuple[str, str]:
+        # (приложение без .exe в нижнем регистре, заголовок окна)
+        return "", ""
+
+    def idle_seconds(self) -> int:
+        # сколько секунд не было ввода
+        return 0
+
+    # --- дисплей
+
+    def set_gamma(self, r_factor: float, g_factor: float, b_factor: float):
+        pass
+
+    # --- звук
+
+    def audio_output(self) -> AudioOutput:
+        return AudioOutput()
+
+    def warm_up_audio(self):
+        # подгрузить аудиостек заранее, чтобы первый звук не ждал
+        pass
+
+    # --- уведомления
+
+    def set_focus_assist(self, enabled: bool) -> bool:
+        # True - режим переключён
+        return False
+
+    # --- автозагрузка
+
+    def autostart_available(self) -> bool:
+        return False
+
+    def autostart_enabled(self) -> bool:
+        return False
+
+    def set_autostart(self, enabled: bool) -> bool:
+        return False
+
+    # --- горячие клавиши
+
+    def hotkeys_available(self) -> bool:
+        return False
+
+    def add_hotkey(self, hotkey: str, callback: Callable):
+        raise RuntimeError("hotkeys not available")
+
+    def remove_hotkey(self, hotkey: str):
+        pass
+
+
+# (приложение, заголовок окна, сколько тиков трекера держится)
+DEFAULT_SCRIPT: List[Tuple[str, str, int]] = [
+    ('code', 'server.py - AFO - Visual Studio Code', 20),
+    ('chrome', 'Python docs - Google Chrome', 8),
+    ('code', 'app.js - AFO - Visual Studio Code', 15),
+    ('telegram', 'Telegram', 4),
+    ('figma', 'Dashboard - Figma', 10),
+    ('youtube', 'YouTube', 5),
+    ('', '', 6),  # отошёл от компьютера
+]
+
+
+class SimulatedAudio(AudioOutput):
+
+    def __init__(self, log: List[tuple]):
+        self.log = log
+
+    def play(self, file_path: str, volume: float):
+        self.log.append(('play', file_path, volume))
+
+    def stop(self):
+        self.log.append(('stop',))
+
+    def set_volume(self, volume: float):
+        self.log.append(('volume', volume))
+
+
+class SimulatedBackend(Backend):
+    # Окна и простой - по сценарию, один шаг за тик трекера (foreground_window).
+    # Всё, что бэкенд должен был сделать с системой, копится в списках
+
+    name = 'sim'
+
+    def __init__(self, script: List[Tuple[str, str, int]] = None):
+        self.script = script or DEFAULT_SCRIPT
+        self.step = 0
+        self.ticks_in_step = 0
+        self.gamma: List[Tuple[float, float, float]] = []
+        self.audio: List[tuple] = []
+        self.focus_assist = False
+        self.autostart = False
+        self.hotkeys: Dict[str, Callable] = {}
+        self._lock = threading.Lock()
+
+    def current(self) -> Tuple[str, str, int]:
+        return self.script[self.step % len(self.script)]
+
+    def foreground_window(self) -> Tuple[str, str]:
+        with self._lock:
+            app, title, ticks = self.current()
+            self.ticks_in_step += 1
+            if self.ticks_in_step > ticks:
+                self.step += 1
+                self.ticks_in_step = 1
+                app, title, _ = self.current()
+            return app, title
+
+    def idle_seconds(self) -> int:
+        # простой растёт, пока в сценарии "пустое" окно; тик простоя = минута,
+        # чтобы трекер успел признать idle
+        app, _, _ = self.current()
+        if app:
+            return 0
+        return self.ticks_in_step * 60
+
+    def set_gamma(self, r_factor: float, g_factor: float, b_factor: float):
+        self.gamma.append((r_factor, g_factor, b_factor))
+
+    def audio_output(self) -> AudioOutput:
+        return SimulatedAudio(self.audio)
+
+    def set_focus_assist(self, enabled: bool) -> bool:
+        self.focus_assist = enabled
+        return True
+
+    def autostart_available(self) -> bool:
+        return True
+
+    def autostart_enabled(self) -> bool:
+        return self.autostart
+
+    def set_autostart(self, enabled: bool) -> bool:
+        self.autostart = enabled
+        return True
+
+    def hotkeys_available(self) -> bool:
+        return True
+
+    def add_hotkey(self, hotkey: str, callback: Callable):
+        self.hotkeys[hotkey] = callback
+
+    def remove_hotkey(self, hotkey: str):
+        self.hotkeys.pop(hotkey, None)
+
+    def press(self, hotkey: str) -> bool:
+        # нажать комбинацию; False - она не зарегистрирована
+        callback = self.hotkeys.get(hotkey)
+        if callback is None:
+            return False
+        callback()
+        return True
+
+
+BACKENDS = ('windows', 'headless', 'sim')
+
+_default: Optional[Backend] = None
+_default_lock = threading.Lock()
+
+
+def create_backend(name: str = None) -> Backend:
+    # Бэкенд по имени; None - по ОС
+    if name is None:
+        name = 'windows' if sys.platform == 'win32' else 'headless'
+    if name == 'sim':
+        return SimulatedBackend()
+    if name == 'windows':
+        win32 = lazy_import('afo.win32')
+        if win32 is not None:
+            return win32.WindowsBackend()
+        print("Windows backend unavailable, running headless")
+    elif name != 'headless':
+        raise ValueError(f"unknown backend: {name}")
+    return Backend()
+
+
+def get_backend() -> Backend:
+    # общий бэкенд процесса для тех, кому его не передали
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = create_backend()
+        return _default
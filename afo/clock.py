@@ -0,0 +1,52 @@
+# Часы: системные и виртуальные
+#
+# Таймеры считают дедлайны по monotonic() - он не прыгает при переводе
+# системного времени. Даты (статистика по дням) - по time()/now().
+# VirtualClock двигается только вручную: через Scheduler.run_until
+# можно прогнать часы работы за миллисекунды.
+
+import time
+from datetime import date, datetime
+
+
+class Clock:
+    # системное время
+    realtime = True
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def time(self) -> float:
+        return time.time()
+
+    def now(self) -> datetime:
+        return datetime.fromtimestamp(self.time())
+
+    def today(self) -> date:
+        return self.now().date()
+
+
+SYSTEM_CLOCK = Clock()
+
+
+class VirtualClock(Clock):
+    # Время стоит, пока его не сдвинут
+
+    realtime = False
+
+    def __init__(self, start: float = None):
+        self._monotonic = 0.0
+        self._offset = time.time() if start is None else start
+
+    def monotonic(self) -> float:
+        return self._monotonic
+
+    def time(self) -> float:
+        return self._offset + self._monotonic
+
+    def advance(self, seconds: float):
+        self.advance_to(self._monotonic + seconds)
+
+    def advance_to(self, monotonic: float):
+        # назад время не идёт
+        self._monotonic = max(self._monotonic, monotonic)
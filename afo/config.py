@@ -2,9 +2,17 @@
 
 import json
 import os
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 from dataclasses import dataclass, asdict
-from typing import Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .schema import build, compile_schema, plan_patch
+from . import metrics
+from .storage import DebouncedWriter, atomic_write
+from .scheduler import Scheduler
+from .watcher import FileWatcher
 
 
 def get_app_data_dir() -> Path:
@@ -253,77 +261,318 @@ class Config:
             ]
 
 
+@dataclass(frozen=True)
+class ConfigChange:
+    # одно изменившееся поле: ('pomodoro', 'work_minutes'), 25 -> 30
+    path: Tuple[str, ...]
+    old: Any
+    new: Any
+    
+    @property
+    def section(self) -> str:
+        return self.path[0]
+    
+    @property
+    def key(self) -> str:
+        return '.'.join(self.path)
+
+
+def _at_least(minimum):
+    def check(value):
+        return None if value >= minimum else f"must be >= {minimum}"
+    return check
+
+
+def _between(low, high):
+    def check(value):
+        return None if low <= value <= high else f"must be between {low} and {high}"
+    return check
+
+
+def _clock_time(value: str) -> Optional[str]:
+    # "HH:MM"
+    try:
+        hours, minutes = value.split(':')
+        if len(minutes) == 2 and 0 <= int(hours) <= 23 and 0 <= int(minutes) <= 59:
+            return None
+    except ValueError:
+        pass
+    return "must be a time as HH:MM"
+
+
+# проверки сверх типов, по пути поля ('*' - любой элемент списка)
+CONFIG_CHECKS = {
+    ('sound', 'volume'): _between(0.0, 1.0),
+    ('display', 'night_mode_start'): _clock_time,
+    ('display', 'night_mode_end'): _clock_time,
+    ('display', 'color_temperature'): _between(1000, 10000),
+    ('notifications', 'quiet_hours_start'): _clock_time,
+    ('notifications', 'quiet_hours_end'): _clock_time,
+    ('breaks', 'work_duration_minutes'): _at_least(1),
+    ('breaks', 'break_duration_minutes'): _at_least(1),
+    ('tracking', 'idle_threshold_seconds'): _at_least(1),
+    ('reminders', 'water', 'interval_minutes'): _at_least(1),
+    ('reminders', 'stretch', 'interval_minutes'): _at_least(1),
+    ('reminders', 'eyes', 'interval_minutes'): _at_least(1),
+    ('reminders', 'custom', '*', 'interval_minutes'): _at_least(1),
+    ('procrastination', 'work_hours_start'): _clock_time,
+    ('procrastination', 'work_hours_end'): _clock_time,
+    ('procrastination', 'warning_threshold_minutes'): _at_least(1),
+    ('procrastination', 'cooldown_minutes'): _at_least(0),
+    ('pomodoro', 'work_minutes'): _at_least(1),
+    ('pomodoro', 'short_break_minutes'): _at_least(1),
+    ('pomodoro', 'long_break_minutes'): _at_least(1),
+    ('pomodoro', 'pomodoros_until_long_break'): _at_least(1),
+}
+
+# схема собирается один раз при импорте, дальше только обход по ней
+CONFIG_SCHEMA = compile_schema(Config, CONFIG_CHECKS)
+
+
+def diff_config(old: Dict, new: Dict, path: Tuple[str, ...] = ()) -> List[ConfigChange]:
+    # Сравнить два снимка конфига: вложенные dict - по полям,
+    # списки и значения - целиком
+    changes = []
+    for key in old.keys() | new.keys():
+        a = old.get(key)
+        b = new.get(key)
+        if a == b:
+            continue
+        if isinstance(a, dict) and isinstance(b, dict):
+            changes.extend(diff_config(a, b, path + (key,)))
+        else:
+            changes.append(ConfigChange(path + (key,), a, b))
+    return sorted(changes, key=lambda c: c.path)
+
+
+def _overlaps(a: Tuple[str, ...], b: Tuple[str, ...]) -> bool:
+    # одно поле или одно вложено в другое
+    n = min(len(a), len(b))
+    return a[:n] == b[:n]
+
+
+def _plain(value: Any) -> Any:
+    # значение поля в том виде, в каком оно лежит в to_dict()
+    if hasattr(value, '__dataclass_fields__'):
+        return asdict(value)
+    if isinstance(value, list):
+        return [_plain(v) for v in value]
+    return value
+
+
+def config_to_dict(config: Config) -> Dict:
+    # снимок конфига (то что пишется в config.json)
+    return {
+        'sound': asdict(config.sound),
+        'display': asdict(config.display),
+        'notifications': asdict(config.notifications),
+        'breaks': asdict(config.breaks),
+        'tracking': asdict(config.tracking),
+        'reminders': asdict(config.reminders),
+        'procrastination': asdict(config.procrastination),
+        'pomodoro': asdict(config.pomodoro),
+        'blocked_sites': list(config.blocked_sites or []),
+        'work_apps': list(config.work_apps or []),
+        'entertainment_apps': list(config.entertainment_apps or [])
+    }
+
+
 class ConfigManager:
     # Менеджер конфигурации
     
+    # сколько ждать следующих изменений перед записью на диск
+    SAVE_DELAY = 0.5
+    # опрос config.json на правки снаружи (на Windows - уведомления ОС)
+    WATCH_INTERVAL = 5.0
+    
     def __init__(self):
         self.config_path = get_app_data_dir() / 'config.json'
         self.config = self._load()
+        # что лежит в config.json по нашим сведениям: от него считаются
+        # несохранённые изменения при перечитывании файла
+        self._disk = self.to_dict()
+        # config.json могут подменить снаружи (админ раскатывает настройки)
+        self.watcher = FileWatcher(self.config_path, self.reload, interval=self.WATCH_INTERVAL,
+                                   name='config-watch')
+        # POST /api/config меняет несколько секций подряд - пишем файл один раз
+        self._writer = DebouncedWriter(self._write, delay=self.SAVE_DELAY, name='config')
+        
+        # подписчики на изменения: (callback(changes), секции или None = все)
+        self._subscribers: List[Tuple[Callable, Optional[Tuple[str, ...]]]] = []
+        self._tx_lock = threading.RLock()
+        self._tx_depth = 0
+        self._tx_before: Optional[Dict] = None
+    
+    def subscribe(self, callback: Callable[[List[ConfigChange]], None], *sections: str):
+        # callback получает только изменения своих секций, одним списком на транзакцию
+        self._subscribers.append((callback, sections or None))
+    
+    def _publish(self, changes: List[ConfigChange]):
+        for callback, sections in self._subscribers:
+            relevant = changes if sections is None else [c for c in changes if c.section in sections]
+            if not relevant:
+                continue
+            try:
+                callback(relevant)
+            except Exception as e:
+                print(f"Config subscriber error: {e}")
+    
+    @contextmanager
+    def transaction(self):
+        # Изменения конфига внутри блока: по выходу - один diff, одно сохранение
+        #   with config.transaction():
+        #       config.config.pomodoro.work_minutes = 30
+        with self._tx_lock:
+            if self._tx_depth == 0:
+                self._tx_before = self.to_dict()
+            self._tx_depth += 1
+            try:
+                yield self.config
+            finally:
+                self._tx_depth -= 1
+                changes = []
+                if self._tx_depth == 0:
+                    changes = diff_config(self._tx_before, self.to_dict())
+                    self._tx_before = None
+                    if changes:
+                        self.save()
+        
+        # подписчики - вне блокировки, они могут сами читать конфиг
+        if changes:
+            self._publish(changes)
     
     def _load(self) -> Config:
-        # Загрузить конфигурацию
+        # Загрузить конфигурацию; неверные поля - по умолчанию, остальное сохраняется
         if self.config_path.exists():
             try:
                 with open(self.config_path, 'r', encoding='utf-8') as f:
                     data = json.load(f)
-                return self._dict_to_config(data)
-            except Exception:
-                pass
+            except Exception as e:
+                print(f"Config load error: {e}")
+                return Config()
+            config, errors = build(CONFIG_SCHEMA, data)
+            for error in errors:
+                print(f"Config: {error}")
+            return config
         return Config()
     
-    def _dict_to_config(self, data: dict) -> Config:
-        # Преобразовать словарь в конфиг
-        # для напоминаний нужна отдельная логика т.к. там вложенные dataclass'ы
-        reminders_data = data.get('reminders', {})
-        reminders = ReminderSettings(
-            enabled=reminders_data.get('enabled', True),
-            water=ReminderItem(**reminders_data.get('water', {})) if reminders_data.get('water') else None,
-            stretch=ReminderItem(**reminders_data.get('stretch', {})) if reminders_data.get('stretch') else None,
-            eyes=ReminderItem(**reminders_data.get('eyes', {})) if reminders_data.get('eyes') else None,
-            custom=[ReminderItem(**r) for r in reminders_data.get('custom', [])],
-            pause_when_idle=reminders_data.get('pause_when_idle', True)
-        )
-        
-        return Config(
-            sound=SoundSettings(**data.get('sound', {})),
-            display=DisplaySettings(**data.get('display', {})),
-            notifications=NotificationSettings(**data.get('notifications', {})),
-            breaks=BreakSettings(**data.get('breaks', {})),
-            tracking=TrackingSettings(**data.get('tracking', {})),
-            reminders=reminders,
-            procrastination=ProcrastinationSettings(**data.get('procrastination', {})),
-            pomodoro=PomodoroSettings(**data.get('pomodoro', {})),
-            blocked_sites=data.get('blocked_sites'),
-            work_apps=data.get('work_apps'),
-            entertainment_apps=data.get('entertainment_apps')
-        )
-    
     def save(self):
-        # Сохранить конфигурацию
-        data = {
-            'sound': asdict(self.config.sound),
-            'display': asdict(self.config.display),
-            'notifications': asdict(self.config.notifications),
-            'breaks': asdict(self.config.breaks),
-            'tracking': asdict(self.config.tracking),
-            'reminders': asdict(self.config.reminders),
-            'procrastination': asdict(self.config.procrastination),
-            'pomodoro': asdict(self.config.pomodoro),
-            'blocked_sites': self.config.blocked_sites,
-            'work_apps': self.config.work_apps,
-            'entertainment_apps': self.config.entertainment_apps
-        }
-        with open(self.config_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        # Сохранить конфигурацию (в фоне, частые вызовы склеиваются)
+        self._writer.save()
+    
+    def flush(self):
+        # Записать несохранённые изменения прямо сейчас
+        self._writer.flush()
+    
+    def start_watching(self, scheduler: Scheduler = None):
+        # Подхватывать правки config.json без перезапуска
+        self.watcher.start(scheduler)
     
-    def update(self, section: str, **kwargs):
-        # Обновить секцию конфига
-        if hasattr(self.config, section):
-            obj = getattr(self.config, section)
-            if hasattr(obj, '__dataclass_fields__'):
-                for key, value in kwargs.items():
-                    if hasattr(obj, key):
-                        setattr(obj, key, value)
+    def reload(self) -> List[ConfigChange]:
+        # Перечитать config.json, изменённый снаружи.
+        # Файл с ошибками не применяется вовсе - остаётся текущий конфиг.
+        # Применяется на месте (подсистемы держат ссылки на секции), обратно
+        # не записывается, подписчики получают diff как от PATCH.
+        # Несохранённые свои изменения (отложенная запись) переносятся поверх
+        # файла, кроме полей, которые поменяли снаружи - там правка снаружи
+        # важнее. Не осталось своих изменений - отложенная запись отменяется,
+        # иначе она затёрла бы файл состоянием до перечитывания
+        try:
+            with open(self.config_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            metrics.CONFIG_RELOADS.inc('invalid')
+            print(f"Config reload skipped: {e}")
+            return []
+        
+        config, errors = build(CONFIG_SCHEMA, data)
+        if errors:
+            metrics.CONFIG_RELOADS.inc('invalid')
+            for error in errors:
+                print(f"Config reload skipped: {error}")
+            return []
+        
+        disk = config_to_dict(config)
+        with self._tx_lock:
+            external = diff_config(self._disk, disk)
+            local = [c for c in diff_config(self._disk, self.to_dict())
+                     if not any(_overlaps(c.path, e.path) for e in external)]
+            merged = config_to_dict(config)
+            for change in local:
+                parent = merged
+                for name in change.path[:-1]:
+                    parent = parent[name]
+                parent[change.path[-1]] = change.new
+            self._disk = disk
+            # подписчики - после блокировки, как в transaction()
+            self._tx_depth += 1
+            try:
+                changes = self.patch(merged, persist=False)
+            finally:
+                self._tx_depth -= 1
+            if local:
+                self.save()
             else:
-                setattr(self.config, section, kwargs.get('value', obj))
-        self.save()
+                self._writer.discard()
+        
+        if changes:
+            self._publish(changes)
+        metrics.CONFIG_RELOADS.inc('applied' if changes else 'unchanged')
+        if changes:
+            print(f"Config reloaded: {', '.join(c.key for c in changes)}")
+        return changes
+    
+    def close(self):
+        # Дописать изменения и остановить фоновую запись (при выходе)
+        self.watcher.stop()
+        self._writer.close()
+    
+    def write_stats(self) -> Dict[str, int]:
+        # сколько сохранений запрошено и сколько реально записано
+        return self._writer.stats()
+    
+    def _write(self):
+        # правку снаружи, которую watcher ещё не подхватил, сначала перечитать -
+        # иначе запись её затрёт. Своих изменений поверх неё нет - писать нечего
+        if self.watcher.changed() and self.watcher.check() and self.to_dict() == self._disk:
+            return
+        with self._tx_lock:
+            data = self.to_dict()
+            written = atomic_write(self.config_path, json.dumps(data, indent=2, ensure_ascii=False))
+            self._disk = data
+        # своя запись - не повод перечитывать файл
+        self.watcher.mark_seen(written)
+    
+    def to_dict(self) -> Dict:
+        # снимок конфига (то что пишется в config.json)
+        return config_to_dict(self.config)
+    
+    def patch(self, patch: Any, persist: bool = True) -> List[ConfigChange]:
+        # Применить JSON merge-patch (RFC 7396).
+        # Сначала проверяется весь патч (ValidationError со всеми ошибками),
+        # потом применяется целиком: один diff подписчикам, одно сохранение.
+        # diff считается по операциям патча, без снимка всего конфига
+        ops = plan_patch(CONFIG_SCHEMA, patch)
+        
+        changes: List[ConfigChange] = []
+        with self._tx_lock:
+            for path, value in ops:
+                parent = self.config
+                for name in path[:-1]:
+                    parent = getattr(parent, name)
+                old = _plain(getattr(parent, path[-1]))
+                setattr(parent, path[-1], value)
+                new = _plain(value)
+                if isinstance(old, dict) and isinstance(new, dict):
+                    changes.extend(diff_config(old, new, path))
+                elif old != new:
+                    changes.append(ConfigChange(path, old, new))
+            changes.sort(key=lambda c: c.path)
+            # внутри внешней транзакции сохранит и оповестит она
+            nested = self._tx_depth > 0
+            if changes and persist and not nested:
+                self.save()
+        
+        if changes and not nested:
+            self._publish(changes)
+        return changes
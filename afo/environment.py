@@ -1,15 +1,15 @@
 # Модуль управления окружением
 
-import ctypes
-import subprocess
+import queue
 import threading
-import time
 from pathlib import Path
 from typing import Optional, Dict
 from dataclasses import dataclass
 from enum import Enum
 
 from .analyzer import UserMode, TimeOfDay, AnalysisResult
+from .backend import Backend, get_backend
+from . import metrics
 from .config import Config
 
 
@@ -36,9 +36,8 @@ class EnvironmentState:
 class DisplayController:
     # Управление дисплеем
     
-    def __init__(self):
-        self._gamma_ramp = None
-        self._original_gamma = None
+    def __init__(self, backend: Backend = None):
+        self.backend = backend or get_backend()
     
     def set_color_temperature(self, temperature: int):
         # Установить цветовую температуру (1000-10000 Кельвинов)
@@ -75,22 +74,8 @@ class DisplayController:
     
     def _apply_gamma(self, r_factor: float, g_factor: float, b_factor: float):
         # Применить гамма-коррекцию
-        try:
-            # Создать гамма-рампу
-            ramp = (ctypes.c_ushort * 256 * 3)()
-            
-            for i in range(256):
-                ramp[0][i] = int(min(65535, i * 256 * r_factor))
-                ramp[1][i] = int(min(65535, i * 256 * g_factor))
-                ramp[2][i] = int(min(65535, i * 256 * b_factor))
-            
-            # Получить DC экрана
-            hdc = ctypes.windll.user32.GetDC(0)
-            ctypes.windll.gdi32.SetDeviceGammaRamp(hdc, ctypes.byref(ramp))
-            ctypes.windll.user32.ReleaseDC(0, hdc)
-            
-        except Exception:
-            pass
+        metrics.ENVIRONMENT_ACTIONS.inc('gamma')
+        self.backend.set_gamma(r_factor, g_factor, b_factor)
     
     def reset_gamma(self):
         # Сбросить гамму к стандартной
@@ -100,13 +85,17 @@ class DisplayController:
 class SoundController:
     # Управление фоновыми звуками
     
-    def __init__(self, sounds_dir: Path = None):
+    def __init__(self, sounds_dir: Path = None, backend: Backend = None):
         self.sounds_dir = sounds_dir or Path(__file__).parent / 'sounds'
-        self._player = None
+        self.backend = backend or get_backend()
         self._current_sound: AmbientSound = AmbientSound.NONE
         self._volume: float = 0.3
-        self._play_thread = None
-        self._stop_flag = False
+        # один поток на весь звук: плеер бэкенда (на Windows - COM-объект)
+        # живёт в потоке, который его создал, поэтому play/stop/громкость - командами через очередь.
+        # Поток ждёт команду, а не просыпается каждые полсекунды
+        self._commands: queue.Queue = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
         
         # Пути к звуковым файлам
         self.sound_files: Dict[AmbientSound, str] = {
@@ -127,7 +116,7 @@ class SoundController:
             self.stop()
             return
         
-        if sound == self._current_sound and self._player:
+        if sound == self._current_sound:
             return
         
         self.stop()
@@ -138,96 +127,69 @@ class SoundController:
             return
         
         self._current_sound = sound
-        self._stop_flag = False
-        
-        # Запустить воспроизведение в отдельном потоке
-        self._play_thread = threading.Thread(
-            target=self._play_loop, 
-            args=(str(sound_file),),
-            daemon=True
-        )
-        self._play_thread.start()
+        metrics.ENVIRONMENT_ACTIONS.inc('sound_play')
+        self._send('play', str(sound_file))
     
-    def _play_loop(self, file_path: str):
-        # Цикл воспроизведения через Windows Media Player COM
-        try:
-            import pythoncom
-            pythoncom.CoInitialize()
-            
-            from win32com.client import Dispatch
-            self._player = Dispatch("WMPlayer.OCX")
-            self._player.settings.autoStart = True
-            self._player.settings.setMode("loop", True)
-            self._player.settings.volume = int(self._volume * 100)
-            self._player.URL = file_path
-            
-            # Держим поток живым пока играет
-            while not self._stop_flag and self._player:
-                time.sleep(0.5)
-                
-        except ImportError:
-            # Fallback на PowerShell
-            self._play_powershell(file_path)
-        except Exception as e:
-            print(f"Ошибка воспроизведения: {e}")
-        finally:
-            try:
-                pythoncom.CoUninitialize()
-            except:
-                pass
+    def _send(self, command: str, arg: str = None):
+        # команда потоку звука, поток стартует с первым звуком
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._audio_loop, name='audio', daemon=True)
+                self._worker.start()
+        self._commands.put((command, arg))
     
-    def _play_powershell(self, file_path: str):
-        # Fallback через PowerShell MediaPlayer
+    def _audio_loop(self):
+        output = self.backend.audio_output()
+        output.open()
         try:
-            ps_script = f'''
-            Add-Type -AssemblyName PresentationCore
-            $player = New-Object System.Windows.Media.MediaPlayer
-            $player.Open([Uri]"{file_path}")
-            $player.Volume = {self._volume}
-            $player.Play()
-            while ($true) {{ Start-Sleep -Seconds 1 }}
-            '''
-            self._player = subprocess.Popen(
-                ["powershell", "-Command", ps_script],
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
-            self._player.wait()
-        except Exception as e:
-            print(f"PowerShell fallback error: {e}")
+            while True:
+                command, arg = self._commands.get()
+                if command == 'quit':
+                    break
+                try:
+                    if command == 'play':
+                        output.stop()
+                        output.play(arg, self._volume)
+                    elif command == 'stop':
+                        output.stop()
+                    elif command == 'volume':
+                        output.set_volume(self._volume)
+                except Exception as e:
+                    print(f"Ошибка воспроизведения: {e}")
+        finally:
+            output.close()
     
     def stop(self):
         # Остановить воспроизведение
-        self._stop_flag = True
-        
-        if self._player:
-            try:
-                if hasattr(self._player, 'controls'):
-                    self._player.controls.stop()
-                    self._player.close()
-                elif hasattr(self._player, 'terminate'):
-                    self._player.terminate()
-            except Exception:
-                pass
-            self._player = None
-        
+        if self._current_sound != AmbientSound.NONE:
+            metrics.ENVIRONMENT_ACTIONS.inc('sound_stop')
+            self._send('stop')
         self._current_sound = AmbientSound.NONE
     
     def set_volume(self, volume: float):
         # Установить громкость (0.0 - 1.0)
         self._volume = max(0.0, min(1.0, volume))
-        if self._player and hasattr(self._player, 'settings'):
-            try:
-                self._player.settings.volume = int(self._volume * 100)
-            except:
-                pass
+        metrics.ENVIRONMENT_ACTIONS.inc('sound_volume')
+        if self._worker:
+            self._send('volume')
+    
+    def warm_up(self):
+        # аудиостек грузится в фоне при запуске, чтобы первый звук не ждал импорта
+        self.backend.warm_up_audio()
+    
+    def close(self):
+        # Остановить поток звука, плеер закрывается в нём же
+        self.stop()
+        if self._worker:
+            self._commands.put(('quit', None))
+            self._worker.join(timeout=2)
 
 
 class NotificationController:
     # Управление уведомлениями
     
-    def __init__(self):
+    def __init__(self, backend: Backend = None):
+        self.backend = backend or get_backend()
         self._focus_assist_enabled = False
     
     def enable_focus_assist(self):
@@ -235,17 +197,14 @@ class NotificationController:
         if self._focus_assist_enabled:
             return
         
-        try:
-            # Установить Focus Assist через реестр
-            import winreg
-            key_path = r"SOFTWARE\Microsoft\Windows\CurrentVersion\CloudStore\Store\DefaultAccount\Current\default$windows.data.notifications.quiethourssettings\windows.data.notifications.quiethourssettings"
-            # В реальной реализации здесь будет код для включения Focus Assist
-            self._focus_assist_enabled = True
-        except Exception:
-            pass
+        metrics.ENVIRONMENT_ACTIONS.inc('focus_assist_on')
+        self._focus_assist_enabled = self.backend.set_focus_assist(True)
     
     def disable_focus_assist(self):
         # Выключить режим фокуса
+        if self._focus_assist_enabled:
+            metrics.ENVIRONMENT_ACTIONS.inc('focus_assist_off')
+            self.backend.set_focus_assist(False)
         self._focus_assist_enabled = False
     
     def is_focus_assist_enabled(self) -> bool:
@@ -255,13 +214,14 @@ class NotificationController:
 class EnvironmentController:
     # Главный контроллер окружения
     
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, backend: Backend = None):
         self.config = config
         self.state = EnvironmentState()
         
-        self.display = DisplayController()
-        self.sound = SoundController()
-        self.notifications = NotificationController()
+        backend = backend or get_backend()
+        self.display = DisplayController(backend)
+        self.sound = SoundController(backend=backend)
+        self.notifications = NotificationController(backend)
         
         self._auto_adjust = True
         self._transition_lock = threading.Lock()
@@ -362,6 +322,7 @@ class EnvironmentController:
         if self.state.night_mode_active:
             return
         
+        metrics.ENVIRONMENT_ACTIONS.inc('night_mode_on')
         self.display.set_color_temperature(self.config.display.color_temperature)
         self.state.night_mode_active = True
         self.state.color_temperature = self.config.display.color_temperature
@@ -371,6 +332,7 @@ class EnvironmentController:
         if not self.state.night_mode_active:
             return
         
+        metrics.ENVIRONMENT_ACTIONS.inc('night_mode_off')
         self.display.reset_gamma()
         self.state.night_mode_active = False
         self.state.color_temperature = 6500
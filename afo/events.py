@@ -0,0 +1,116 @@
+# Канал событий для UI (Server-Sent Events)
+#
+# Подсистемы публикуют сюда изменения состояния, а /api/events раздаёт их
+# открытым вкладкам. Кадр SSE сериализуется один раз при публикации и
+# дальше просто пишется в каждое соединение.
+
+import json
+import threading
+from collections import deque
+from itertools import islice
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+
+class EventHub:
+    # Кольцевой буфер последних событий + последнее значение по каждому типу
+
+    def __init__(self, backlog: int = 256):
+        self._cond = threading.Condition()
+        # (id, кадр SSE, имя, данные, это состояние?)
+        self._events: Deque[tuple] = deque(maxlen=backlog)
+        # name -> (id, data, frame, ключ для сравнения)
+        self._latest: Dict[str, tuple] = {}
+        self._last_id = 0
+        self.closed = False
+
+    @staticmethod
+    def _frame(event_id: int, name: str, data: Any) -> bytes:
+        payload = json.dumps(data, ensure_ascii=False)
+        return f"id: {event_id}\nevent: {name}\ndata: {payload}\n\n".encode('utf-8')
+
+    def publish(self, name: str, data: Any, key: Any = None, state: bool = True) -> Optional[int]:
+        # state=True - это состояние (activity, pomodoro...), шлём только если изменилось
+        # и отдаём новым клиентам при подключении;
+        # state=False - разовое событие (напоминание), шлём всегда
+        compare = data if key is None else key
+        with self._cond:
+            if state:
+                prev = self._latest.get(name)
+                if prev is not None and prev[3] == compare:
+                    return None
+
+            self._last_id += 1
+            event_id = self._last_id
+            frame = self._frame(event_id, name, data)
+            self._events.append((event_id, frame, name, data, state))
+            if state:
+                self._latest[name] = (event_id, data, frame, compare)
+            self._cond.notify_all()
+            return event_id
+
+    def latest(self, name: str) -> Optional[Any]:
+        entry = self._latest.get(name)
+        return entry[1] if entry else None
+
+    def versions(self, *names: str) -> Tuple[int, ...]:
+        # id последнего изменения каждого типа - версия для кэшей
+        return tuple(self._latest[n][0] if n in self._latest else 0 for n in names)
+
+    def latest_many(self, *names: str) -> Tuple[Tuple[int, ...], List[Any]]:
+        # версии и данные одним согласованным срезом
+        with self._cond:
+            return self.versions(*names), [self.latest(n) for n in names]
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    def _snapshot(self) -> List[bytes]:
+        # последнее состояние каждого типа, в порядке публикации
+        return [entry[2] for entry in sorted(self._latest.values(), key=lambda e: e[0])]
+
+    def _entries_since(self, cursor: int) -> Optional[List[tuple]]:
+        # события после cursor; None если они уже вытеснены из буфера
+        if cursor >= self._last_id:
+            return []
+        if not self._events or cursor < self._events[0][0] - 1:
+            return None
+        start = cursor - self._events[0][0] + 1
+        return list(islice(self._events, start, None))
+
+    def _since(self, cursor: int) -> Optional[List[bytes]]:
+        entries = self._entries_since(cursor)
+        return None if entries is None else [e[1] for e in entries]
+
+    def changes_since(self, cursor: int) -> Tuple[List[Dict], int]:
+        # изменения состояния после cursor (без разовых событий) - для ответов на команды
+        with self._cond:
+            entries = self._entries_since(cursor) or []
+            changes = [{'id': e[0], 'event': e[2], 'data': e[3]} for e in entries if e[4]]
+            return changes, self._last_id
+
+    def initial(self, last_event_id: Optional[int]) -> Tuple[List[bytes], int]:
+        # что отправить при (пере)подключении
+        with self._cond:
+            frames = None
+            if last_event_id is not None:
+                frames = self._since(last_event_id)
+            if frames is None:
+                frames = self._snapshot()
+            return frames, self._last_id
+
+    def wait(self, cursor: int, timeout: float) -> Tuple[List[bytes], int]:
+        # дождаться событий новее cursor (или таймаута - тогда пустой список)
+        with self._cond:
+            if cursor >= self._last_id and not self.closed:
+                self._cond.wait(timeout)
+            frames = self._since(cursor)
+            if frames is None:
+                # клиент отстал больше чем на буфер - отдаём текущее состояние
+                frames = self._snapshot()
+            return frames, self._last_id
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
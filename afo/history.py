@@ -0,0 +1,331 @@
+# История сессий: что, когда и в каком режиме было открыто
+#
+# Сессии дописываются в sessions.jsonl (одна JSON строка на сессию) и
+# переживают перезапуск. Для запросов по диапазону времени файл читается
+# один раз (при первом запросе) в индекс по классам длины, внутри класса
+# отсортированный по началу: поиск - bisect, дальше просматриваются только
+# пересекающиеся с диапазоном сессии (плюс не больше класса длины до него),
+# O(log n + k) на класс вместо полного прохода.
+
+import csv
+import heapq
+import io
+import json
+import math
+import threading
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from operator import attrgetter
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+BUCKETS = ('hour', 'day', 'week')
+GROUPS = ('app', 'mode', 'category')
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+CSV_COLUMNS = ['start', 'end', 'duration_seconds', 'app', 'mode', 'category']
+
+# размер блока при выгрузке - одна запись в сокет
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+# больше бакетов за один ответ не отдаём - дальше по offset
+MAX_PAGE_SIZE = 1000
+
+# диапазон длиннее этого числа бакетов - ошибка запроса (час ~ 11 лет)
+MAX_BUCKETS = 100_000
+
+BUCKET_STEPS = {
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+    'week': timedelta(weeks=1),
+}
+
+
+@dataclass
+class Session:
+    start: float  # unix time
+    end: float
+    app: str
+    mode: str = ""
+    category: str = ""
+
+    def to_json(self) -> str:
+        return json.dumps(vars(self), ensure_ascii=False)
+
+
+class IntervalIndex:
+    # Интервалы по классам длины: в классе c - сессии не длиннее 2**c секунд,
+    # внутри класса - по началу. Сессия класса c, пересекающая [start, end),
+    # начинается не раньше start - 2**c, так что одна ночная сессия удлиняет
+    # просмотр только в своём классе, где таких единицы, а не во всём индексе.
+    # Сессии почти всегда приходят по порядку - вставка в конец за O(1)
+
+    def __init__(self):
+        # класс -> (начала, сессии)
+        self._classes: Dict[int, Tuple[List[float], List[Session]]] = {}
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    @staticmethod
+    def _length_class(session: Session) -> int:
+        # наименьшее c, при котором длина <= 2**c
+        return math.ceil(max(0.0, session.end - session.start)).bit_length()
+
+    def add(self, session: Session):
+        c = self._length_class(session)
+        starts, items = self._classes.setdefault(c, ([], []))
+        if not starts or session.start >= starts[-1]:
+            starts.append(session.start)
+            items.append(session)
+        else:
+            i = bisect_right(starts, session.start)
+            starts.insert(i, session.start)
+            items.insert(i, session)
+        self._count += 1
+
+    def overlapping(self, start: float, end: float) -> Iterator[Session]:
+        # сессии, пересекающие [start, end), по началу
+        runs = [self._overlapping_in(c, start, end) for c in sorted(self._classes)]
+        return heapq.merge(*runs, key=attrgetter('start'))
+
+    def _overlapping_in(self, c: int, start: float, end: float) -> Iterator[Session]:
+        starts, items = self._classes[c]
+        i = bisect_left(starts, start - (1 << c))
+        while i < len(items) and items[i].start < end:
+            if items[i].end > start:
+                yield items[i]
+            i += 1
+
+    def __iter__(self) -> Iterator[Session]:
+        return heapq.merge(*(items for _, items in self._classes.values()), key=attrgetter('start'))
+
+
+def bucket_floor(moment: datetime, bucket: str) -> datetime:
+    # начало бакета (локальное время), неделя - с понедельника
+    if bucket == 'hour':
+        return moment.replace(minute=0, second=0, microsecond=0)
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if bucket == 'week':
+        day -= timedelta(days=day.weekday())
+    return day
+
+
+class BucketGrid:
+    # Границы бакетов, покрывающих [start, end), без построения всего списка:
+    # n-я граница считается сразу - локальное время начала первого бакета
+    # плюс n шагов (как при переходе на летнее время, так и без него)
+
+    def __init__(self, start: float, end: float, bucket: str):
+        self.step = BUCKET_STEPS[bucket]
+        self.first = bucket_floor(datetime.fromtimestamp(start), bucket)
+        self.end = end
+        # оценка по средней длине шага, дальше - поправка на переход времени
+        step = self.step.total_seconds()
+        count = max(1, math.ceil((end - self.first.timestamp()) / step))
+        while count > 1 and self.edge(count - 1) >= end:
+            count -= 1
+        while self.edge(count) < end:
+            count += 1
+        self.count = count
+
+    def edge(self, n: int) -> float:
+        return (self.first + self.step * n).timestamp()
+
+    def edges(self, offset: int, limit: int) -> List[float]:
+        # границы бакетов offset..offset+limit (limit+1 значение, не дальше последнего)
+        last = min(offset + limit, self.count)
+        return [self.edge(n) for n in range(offset, last + 1)] if offset < self.count else []
+
+
+class SessionStore:
+    # Хранилище сессий: append-only файл + индекс в памяти
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._index: Optional[IntervalIndex] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> IntervalIndex:
+        # прочитать файл в индекс (под self._lock)
+        index = IntervalIndex()
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        index.add(Session(**json.loads(line)))
+                    except (ValueError, TypeError):
+                        # оборванная строка после падения - пропускаем
+                        continue
+        return index
+
+    def _ensure_index(self) -> IntervalIndex:
+        with self._lock:
+            if self._index is None:
+                self._index = self._load()
+            return self._index
+
+    def append(self, session: Session):
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(session.to_json() + '\n')
+            # индекс обновляем только если он уже построен, иначе
+            # сессия прочитается из файла при первом запросе
+            if self._index is not None:
+                self._index.add(session)
+
+    def __len__(self) -> int:
+        return len(self._ensure_index())
+    
+    def iter_file(self, start: float = None, end: float = None) -> Iterator[Session]:
+        # Сессии прямо из файла, по одной - для выгрузки любого объёма.
+        # Индекс не трогаем: его блокировка не держится пока клиент читает
+        if not self.path.exists():
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    session = Session(**json.loads(line))
+                except (ValueError, TypeError):
+                    continue
+                if start is not None and session.end <= start:
+                    continue
+                if end is not None and session.start >= end:
+                    continue
+                yield session
+
+    def query(self, start: float, end: float) -> List[Session]:
+        index = self._ensure_index()
+        with self._lock:
+            return list(index.overlapping(start, end))
+
+    def aggregate(self, start: float, end: float, bucket: str = 'day', group: str = 'app',
+                  offset: int = 0, limit: int = 100, extra: List[Session] = None) -> Dict:
+        # Время по бакетам и группам за [start, end).
+        # Сессии на границе бакетов режутся по границе; пагинация - по бакетам,
+        # в индексе читается только окно текущей страницы.
+        # extra - незавершённые сессии, которых ещё нет в файле
+        if bucket not in BUCKETS:
+            raise ValueError(f"bucket must be one of: {', '.join(BUCKETS)}")
+        if group not in GROUPS:
+            raise ValueError(f"group must be one of: {', '.join(GROUPS)}")
+        if end <= start:
+            raise ValueError("to must be after from")
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        offset = max(0, offset)
+
+        try:
+            grid = BucketGrid(start, end, bucket)
+            total_buckets = grid.count
+            if total_buckets > MAX_BUCKETS:
+                raise ValueError(f"range too large: {total_buckets} {bucket} buckets, max {MAX_BUCKETS}")
+            page = grid.edges(offset, limit)
+        except (OverflowError, OSError) as e:
+            raise ValueError(f"range out of bounds: {e}")
+
+        buckets = []
+        if len(page) > 1:
+            # первый и последний бакет обрезаны самим диапазоном
+            page_start = max(page[0], start)
+            page_end = min(page[-1], end)
+            sums: List[Dict[str, float]] = [{} for _ in range(len(page) - 1)]
+
+            sessions = self.query(page_start, page_end)
+            for s in extra or []:
+                if s.start < page_end and s.end > page_start:
+                    sessions.append(s)
+
+            for s in sessions:
+                key = getattr(s, group) or 'unknown'
+                s_start = max(s.start, page_start)
+                s_end = min(s.end, page_end)
+                # первый бакет сессии - bisect, дальше по соседним
+                i = max(0, bisect_right(page, s_start) - 1)
+                while i < len(sums) and page[i] < s_end:
+                    part = min(s_end, page[i + 1]) - max(s_start, page[i])
+                    if part > 0:
+                        sums[i][key] = sums[i].get(key, 0) + part
+                    i += 1
+
+            for i, groups in enumerate(sums):
+                items = sorted(groups.items(), key=lambda kv: -kv[1])
+                buckets.append({
+                    'start': datetime.fromtimestamp(max(page[i], start)).isoformat(timespec='seconds'),
+                    'end': datetime.fromtimestamp(min(page[i + 1], end)).isoformat(timespec='seconds'),
+                    'total_seconds': int(sum(groups.values())),
+                    'groups': [{'key': k, 'seconds': int(v)} for k, v in items],
+                })
+
+        next_offset = offset + limit
+        return {
+            'from': datetime.fromtimestamp(start).isoformat(timespec='seconds'),
+            'to': datetime.fromtimestamp(end).isoformat(timespec='seconds'),
+            'bucket': bucket,
+            'group': group,
+            'offset': offset,
+            'limit': limit,
+            'total_buckets': total_buckets,
+            'next_offset': next_offset if next_offset < total_buckets else None,
+            'buckets': buckets,
+        }
+
+
+def export_ndjson(sessions: Iterator[Session]) -> Iterator[str]:
+    for session in sessions:
+        yield session.to_json() + '\n'
+
+
+def export_csv(sessions: Iterator[Session]) -> Iterator[str]:
+    # CSV с заголовком, время - локальное ISO
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(CSV_COLUMNS)
+    for session in sessions:
+        writer.writerow([
+            datetime.fromtimestamp(session.start).isoformat(timespec='seconds'),
+            datetime.fromtimestamp(session.end).isoformat(timespec='seconds'),
+            round(session.end - session.start, 3),
+            session.app,
+            session.mode,
+            session.category,
+        ])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def chunks(lines: Iterator[str], size: int = EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    # склеить строки в блоки ~size байт
+    parts = []
+    length = 0
+    for line in lines:
+        data = line.encode('utf-8')
+        parts.append(data)
+        length += len(data)
+        if length >= size:
+            yield b''.join(parts)
+            parts = []
+            length = 0
+    if parts:
+        yield b''.join(parts)
+
+
+def parse_time(value: str) -> float:
+    # unix time или ISO дата/время (локальное) -> unix time
+    value = value.strip()
+    try:
+        result = float(value)
+    except ValueError:
+        result = datetime.fromisoformat(value).timestamp()
+    # inf/nan и то, что не переводится в дату, - ошибка запроса, а не 500
+    if not math.isfinite(result):
+        raise ValueError(f"not a finite time: {value}")
+    try:
+        datetime.fromtimestamp(result)
+    except (OverflowError, OSError) as e:
+        raise ValueError(f"time out of range: {value}") from e
+    return result
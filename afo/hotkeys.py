@@ -3,11 +3,7 @@
 import threading
 from typing import Dict, Callable, Optional
 
-try:
-    import keyboard
-    KEYBOARD_AVAILABLE = True
-except ImportError:
-    KEYBOARD_AVAILABLE = False
+from .backend import Backend, get_backend
 
 
 class HotkeyManager:
@@ -20,7 +16,9 @@ class HotkeyManager:
         'skip_pomodoro': 'ctrl+alt+s',
     }
     
-    def __init__(self):
+    def __init__(self, backend: Backend = None):
+        # хук клавиатуры ставит бэкенд (на Windows - модуль keyboard)
+        self.backend = backend or get_backend()
         self._hotkeys: Dict[str, str] = self.DEFAULT_HOTKEYS.copy()
         self._callbacks: Dict[str, Callable] = {}
         self._registered: Dict[str, bool] = {}
@@ -36,8 +34,8 @@ class HotkeyManager:
             if action in self._registered and self._registered[action]:
                 try:
                     old_hotkey = self._hotkeys.get(action)
-                    if old_hotkey and KEYBOARD_AVAILABLE:
-                        keyboard.remove_hotkey(old_hotkey)
+                    if old_hotkey:
+                        self.backend.remove_hotkey(old_hotkey)
                 except Exception:
                     pass
             
@@ -49,7 +47,7 @@ class HotkeyManager:
                 self._register_hotkey(action)
     
     def _register_hotkey(self, action: str):
-        if not KEYBOARD_AVAILABLE:
+        if not self.backend.hotkeys_available():
             return
         
         hotkey = self._hotkeys.get(action)
@@ -57,14 +55,14 @@ class HotkeyManager:
         
         if hotkey and callback:
             try:
-                keyboard.add_hotkey(hotkey, callback, suppress=False)
+                self.backend.add_hotkey(hotkey, callback)
                 self._registered[action] = True
             except Exception as e:
                 print(f"Hotkey registration failed for {action}: {e}")
     
     def start(self):
-        if not KEYBOARD_AVAILABLE:
-            print("Keyboard module not available, hotkeys disabled")
+        if not self.backend.hotkeys_available():
+            print(f"Hotkeys not available ({self.backend.name} backend), disabled")
             return
         
         with self._lock:
@@ -74,7 +72,7 @@ class HotkeyManager:
                     self._register_hotkey(action)
     
     def stop(self):
-        if not KEYBOARD_AVAILABLE:
+        if not self.backend.hotkeys_available():
             return
         
         with self._lock:
@@ -82,7 +80,7 @@ class HotkeyManager:
             for action, hotkey in self._hotkeys.items():
                 if self._registered.get(action):
                     try:
-                        keyboard.remove_hotkey(hotkey)
+                        self.backend.remove_hotkey(hotkey)
                     except Exception:
                         pass
                     self._registered[action] = False
@@ -91,4 +89,4 @@ class HotkeyManager:
         return self._hotkeys.copy()
     
     def is_available(self) -> bool:
-        return KEYBOARD_AVAILABLE
+        return self.backend.hotkeys_available()
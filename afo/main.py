@@ -4,6 +4,7 @@ import sys
 import os
 import signal
 import argparse
+import importlib
 import time
 import socket
 
@@ -11,9 +12,20 @@ import socket
 if __name__ == '__main__' or getattr(sys, 'frozen', False):
     # Добавить родительскую папку в path для импортов
     sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    from afo.server import Orchestrator
+    from afo.startup import PROFILE
+    from afo.backend import BACKENDS, create_backend
 else:
-    from .server import Orchestrator
+    from .startup import PROFILE
+    from .backend import BACKENDS, create_backend
+
+# модули afo в порядке зависимостей - для разбивки времени импорта
+# в --profile-startup (каждый следующий платит только за своё)
+PROFILED_MODULES = [
+    'afo.metrics', 'afo.storage', 'afo.schema', 'afo.config', 'afo.backend', 'afo.tracker',
+    'afo.analyzer', 'afo.audiohost', 'afo.environment', 'afo.reminders',
+    'afo.pomodoro', 'afo.hotkeys', 'afo.events', 'afo.history', 'afo.static',
+    'afo.websocket', 'afo.server',
+]
 
 
 def is_already_running(port: int) -> bool:
@@ -31,6 +43,10 @@ def main():
     parser = argparse.ArgumentParser(description='AFO - настройка окружения под задачу')
     parser.add_argument('--no-browser', action='store_true', help='Не открывать браузер')
     parser.add_argument('--port', type=int, default=8420, help='Порт сервера')
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='Напечатать время импортов и этапов запуска')
+    parser.add_argument('--backend', choices=BACKENDS,
+                        help='windows / headless (без ОС) / sim (сценарий); по умолчанию по ОС')
     
     args = parser.parse_args()
     
@@ -42,7 +58,14 @@ def main():
         webbrowser.open(f'http://localhost:{args.port}')
         sys.exit(0)
     
-    orchestrator = Orchestrator()
+    modules = PROFILED_MODULES if args.profile_startup else ['afo.server']
+    for name in modules:
+        with PROFILE.phase('import', name):
+            importlib.import_module(name)
+    from afo.server import Orchestrator
+    
+    with PROFILE.phase('init', 'Orchestrator()'):
+        orchestrator = Orchestrator(create_backend(args.backend))
     orchestrator.server.port = args.port
     
     def shutdown(signum=None, frame=None):
@@ -65,6 +88,12 @@ def main():
     if not args.no_browser:
         orchestrator.server.open_browser()
     
+    if args.profile_startup:
+        orchestrator.wait_ready(timeout=30)
+        print(PROFILE.report())
+        stages = orchestrator.ready_payload()['stages']
+        print(f"ready in {max(stages.values()):.1f} ms after afo import")
+    
     # Основной цикл
     try:
         while orchestrator.running:
@@ -0,0 +1,269 @@
+# Метрики приложения в текстовом формате Prometheus (/api/metrics)
+#
+# Счётчики пишутся в шард текущего потока - горячий путь не берёт
+# общих блокировок, только дописывает в свой dict. Шарды складываются
+# только при чтении метрик. Шарды завершившихся потоков (сервер создаёт
+# поток на соединение) сворачиваются в общий итог, чтобы не копиться.
+
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .startup import lazy_import
+
+
+# границы бакетов по умолчанию, секунды
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# сколько шардов держать до уборки завершившихся потоков
+SWEEP_THRESHOLD = 64
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = '') -> str:
+    parts = []
+    for name, value in zip(names, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{name}="{value}"')
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _format_value(value: float) -> str:
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Sharded:
+    # Общая часть: значение по набору меток, шард на поток
+
+    kind = ''
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # (поток, шард) живых потоков
+        self._shards: List[Tuple[threading.Thread, Dict]] = []
+        # итог завершившихся потоков
+        self._retired: Dict[Tuple, object] = {}
+
+    def _shard(self) -> Dict:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                if len(self._shards) >= SWEEP_THRESHOLD:
+                    self._sweep()
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def _sweep(self):
+        # свернуть шарды завершившихся потоков (под self._lock);
+        # мёртвый поток уже ничего не допишет, так что это безопасно
+        alive = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                alive.append((thread, shard))
+            else:
+                for key, value in shard.items():
+                    self._merge(self._retired, key, value)
+        self._shards = alive
+
+    def _merge(self, target: Dict, key: Tuple, value):
+        raise NotImplementedError
+
+    def collect(self) -> Dict[Tuple, object]:
+        # сумма по всем шардам
+        with self._lock:
+            self._sweep()
+            total = {}
+            for key, value in self._retired.items():
+                self._merge(total, key, value)
+            shards = [shard.copy() for _, shard in self._shards]
+        for shard in shards:
+            for key, value in shard.items():
+                self._merge(total, key, value)
+        return total
+
+
+class Counter(_Sharded):
+    kind = 'counter'
+
+    def inc(self, *label_values, amount: float = 1):
+        shard = self._shard()
+        shard[label_values] = shard.get(label_values, 0) + amount
+
+    def _merge(self, target: Dict, key: Tuple, value):
+        target[key] = target.get(key, 0) + value
+
+    def render(self) -> List[str]:
+        lines = []
+        for key, value in sorted(self.collect().items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Sharded):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *label_values):
+        # [счётчики по бакетам..., +Inf, сумма]
+        shard = self._shard()
+        data = shard.get(label_values)
+        if data is None:
+            data = shard[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        data[bisect_left(self.buckets, value)] += 1
+        data[-1] += value
+
+    def time(self, *label_values) -> '_Timer':
+        # with histogram.time(): ...
+        return _Timer(self, label_values)
+
+    def _merge(self, target: Dict, key: Tuple, value):
+        current = target.get(key)
+        if current is None:
+            target[key] = list(value)
+        else:
+            for i, v in enumerate(value):
+                current[i] += v
+
+    def render(self) -> List[str]:
+        lines = []
+        for key, data in sorted(self.collect().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, data):
+                cumulative += count
+                le = _format_labels(self.labels, key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            cumulative += data[len(self.buckets)]
+            inf = _format_labels(self.labels, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf} {cumulative}")
+            labels = _format_labels(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(data[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, label_values: Tuple):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.label_values)
+        return False
+
+
+class Gauge:
+    # Значение считается в момент чтения метрик
+    kind = 'gauge'
+
+    def __init__(self, name: str, help_text: str, read: Callable[[], Optional[float]],
+                 kind: str = 'gauge'):
+        self.name = name
+        self.help = help_text
+        self.read = read
+        self.kind = kind
+
+    def render(self) -> List[str]:
+        try:
+            value = self.read()
+        except Exception:
+            value = None
+        if value is None:
+            return []
+        return [f"{self.name} {_format_value(value)}"]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        out = []
+        for metric in self._metrics:
+            lines = metric.render()
+            if not lines:
+                continue
+            out.append(f"# HELP {metric.name} {metric.help}")
+            out.append(f"# TYPE {metric.name} {metric.kind}")
+            out.extend(lines)
+        return '\n'.join(out) + '\n'
+
+
+# Процесс
+
+_START_TIME = time.time()
+
+
+def _rss_bytes() -> Optional[int]:
+    # psutil - только когда метрики реально читают
+    psutil = lazy_import('psutil')
+    if psutil:
+        return psutil.Process().memory_info().rss
+    if sys.platform.startswith('linux'):
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    return None
+
+
+def _cpu_seconds() -> float:
+    times = os.times()
+    return times.user + times.system
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    'afo_http_requests_total', 'HTTP requests by route, method and status',
+    ('route', 'method', 'code')))
+HTTP_DURATION = REGISTRY.register(Histogram(
+    'afo_http_request_duration_seconds', 'HTTP request handling time by route',
+    ('route', 'method')))
+ANALYSIS_DURATION = REGISTRY.register(Histogram(
+    'afo_analysis_duration_seconds', 'Analysis loop iteration time'))
+TRACKER_TICK_DURATION = REGISTRY.register(Histogram(
+    'afo_tracker_tick_duration_seconds', 'Activity tracker tick time'))
+TRACKER_TICK_ERRORS = REGISTRY.register(Counter(
+    'afo_tracker_tick_errors_total', 'Activity tracker ticks that failed'))
+ENVIRONMENT_ACTIONS = REGISTRY.register(Counter(
+    'afo_environment_actions_total', 'Environment changes applied', ('action',)))
+FILE_WRITES = REGISTRY.register(Counter(
+    'afo_file_writes_total', 'Data file saves: requested vs actually written', ('file', 'result')))
+
+CONFIG_RELOADS = REGISTRY.register(Counter(
+    'afo_config_reloads_total', 'config.json changes picked up from disk', ('result',)))
+
+NOTIFICATIONS = REGISTRY.register(Counter(
+    'afo_notifications_total', 'UI notifications: pushed, coalesced into a repeat, acked', ('result',)))
+
+REGISTRY.register(Gauge('afo_threads', 'Live Python threads', threading.active_count))
+REGISTRY.register(Gauge('process_resident_memory_bytes', 'Resident memory size', _rss_bytes))
+REGISTRY.register(Gauge('process_cpu_seconds_total', 'User and system CPU time',
+                        _cpu_seconds, kind='counter'))
+REGISTRY.register(Gauge('process_start_time_seconds', 'Process start time (unix)',
+                        lambda: _START_TIME))
+
+
+def render() -> str:
+    return REGISTRY.render()
@@ -0,0 +1,111 @@
+# Очередь уведомлений для UI: напоминания, pomodoro, прокрастинация
+#
+# Кольцевой буфер с номерами seq по возрастанию. Курсор держит клиент -
+# последний увиденный seq, как Last-Event-ID в SSE. Опрос отдаёт только
+# то, что новее курсора (O(новых)), и ничего не удаляет, так что каждая
+# вкладка видит каждое уведомление.
+#
+# Повтор с тем же key, пока прошлое не подтверждено и не старше
+# coalesce_window, второй записью не ложится: прошлое помечается
+# заменённым, новое несёт count. Подтверждение (ack) - юзер выполнил,
+# отложил или закрыл - убирает уведомление из выдачи всем клиентам.
+
+import threading
+from collections import deque
+from itertools import islice
+from typing import Deque, Dict, List, Optional, Tuple
+
+from . import metrics
+from .clock import Clock, SYSTEM_CLOCK
+
+
+class Notification:
+    __slots__ = ('seq', 'key', 'data', 'created', 'count', 'acked', 'superseded')
+
+    def __init__(self, seq: int, key: str, data: Dict, created: float, count: int):
+        self.seq = seq
+        self.key = key
+        self.data = data
+        self.created = created
+        self.count = count
+        self.acked = False
+        self.superseded = False
+
+    def to_dict(self) -> Dict:
+        return {**self.data, 'seq': self.seq, 'count': self.count}
+
+
+class NotificationQueue:
+
+    def __init__(self, capacity: int = 64, coalesce_window: float = 120.0, ttl: float = 1800.0,
+                 clock: Clock = None):
+        self.capacity = capacity
+        self.coalesce_window = coalesce_window
+        # старые неподтверждённые не показываем новым вкладкам
+        self.ttl = ttl
+        self.clock = clock or SYSTEM_CLOCK
+        self._lock = threading.Lock()
+        self._items: Deque[Notification] = deque()
+        # последняя запись по каждому key - для склейки и ack по key
+        self._by_key: Dict[str, Notification] = {}
+        self._last_seq = 0
+
+    @property
+    def last_seq(self) -> int:
+        return self._last_seq
+
+    def push(self, key: str, data: Dict) -> Dict:
+        # добавить уведомление; вернуть его вместе с seq и count
+        with self._lock:
+            now = self.clock.monotonic()
+            count = 1
+            prev = self._by_key.get(key)
+            if prev and not prev.acked and now - prev.created <= self.coalesce_window:
+                prev.superseded = True
+                count = prev.count + 1
+                metrics.NOTIFICATIONS.inc('coalesced')
+            self._last_seq += 1
+            item = Notification(self._last_seq, key, data, now, count)
+            self._items.append(item)
+            self._by_key[key] = item
+            if len(self._items) > self.capacity:
+                old = self._items.popleft()
+                if self._by_key.get(old.key) is old:
+                    del self._by_key[old.key]
+            metrics.NOTIFICATIONS.inc('pushed')
+            return item.to_dict()
+
+    def _get(self, seq: int) -> Optional[Notification]:
+        # (под self._lock) seq идут подряд - индекс в буфере вычисляется
+        if not self._items:
+            return None
+        index = seq - self._items[0].seq
+        if 0 <= index < len(self._items):
+            return self._items[index]
+        return None
+
+    def since(self, cursor: int) -> Tuple[List[Dict], int]:
+        # уведомления новее cursor и новый курсор
+        with self._lock:
+            # курсор из прошлого запуска (seq начались заново) - отдаём всё
+            if cursor > self._last_seq:
+                cursor = 0
+            if cursor >= self._last_seq or not self._items:
+                return [], self._last_seq
+            start = max(0, cursor - self._items[0].seq + 1)
+            oldest = self.clock.monotonic() - self.ttl
+            result = [
+                item.to_dict() for item in islice(self._items, start, None)
+                if not item.acked and not item.superseded and item.created >= oldest
+            ]
+            return result, self._last_seq
+
+    def ack(self, seq: int = None, key: str = None) -> Optional[int]:
+        # подтвердить по seq или последнее по key; seq подтверждённого или None
+        with self._lock:
+            item = self._get(seq) if seq is not None else self._by_key.get(key)
+            if item is None or item.acked:
+                return None
+            item.acked = True
+            metrics.NOTIFICATIONS.inc('acked')
+            return item.seq
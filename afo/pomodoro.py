@@ -1,13 +1,18 @@
 # Pomodoro таймер
 
+import json
+import math
 import threading
-import time
-from datetime import datetime, date
-from dataclasses import dataclass, field
-from typing import Dict, List, Callable, Optional
+from collections import deque
+from dataclasses import dataclass, asdict, replace
+from itertools import islice
+from pathlib import Path
+from typing import Deque, Dict, List, Callable, Optional
 from enum import Enum
 
 from .config import PomodoroSettings
+from .scheduler import Scheduler, Timer
+from .storage import DebouncedWriter, atomic_write
 
 
 class PomodoroPhase(Enum):
@@ -25,151 +30,302 @@ class PomodoroStats:
     total_break_minutes: int = 0
 
 
+class PomodoroStore:
+    # Итоги по дням и текущая фаза на диске.
+    # pomodoro_days.jsonl - append-only: на каждое изменение дописывается
+    # итог дня целиком, при загрузке побеждает последняя строка дня.
+    # pomodoro_state.json - текущая фаза, переживает перезапуск
+    
+    # строк больше чем дней * COMPACT_RATIO - при загрузке файл переписывается
+    COMPACT_RATIO = 4
+    
+    def __init__(self, data_dir: Path):
+        self.days_path = data_dir / 'pomodoro_days.jsonl'
+        self.state_path = data_dir / 'pomodoro_state.json'
+        self._lock = threading.Lock()
+        self._state: Optional[Dict] = None
+        self._writer = DebouncedWriter(self._write_state, name='pomodoro')
+    
+    def load_days(self) -> List[PomodoroStats]:
+        # все дни по возрастанию даты
+        days: Dict[str, PomodoroStats] = {}
+        lines = 0
+        if self.days_path.exists():
+            with open(self.days_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        stats = PomodoroStats(**json.loads(line))
+                    except (ValueError, TypeError):
+                        # оборванная строка после падения
+                        continue
+                    days[stats.date] = stats
+                    lines += 1
+        result = [days[d] for d in sorted(days)]
+        if lines > len(days) * self.COMPACT_RATIO:
+            self._compact(result)
+        return result
+    
+    def _compact(self, days: List[PomodoroStats]):
+        with self._lock:
+            atomic_write(self.days_path, ''.join(json.dumps(asdict(d)) + '\n' for d in days))
+    
+    def append_day(self, stats: PomodoroStats):
+        with self._lock:
+            with open(self.days_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(asdict(stats)) + '\n')
+    
+    def load_state(self) -> Optional[Dict]:
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def save_state(self, state: Dict):
+        self._state = state
+        self._writer.save()
+    
+    def _write_state(self):
+        atomic_write(self.state_path, json.dumps(self._state))
+    
+    def close(self):
+        self._writer.close()
+
+
 @dataclass
 class PomodoroState:
     phase: PomodoroPhase = PomodoroPhase.IDLE
     running: bool = False
-    seconds_left: int = 0
     current_pomodoro: int = 0
     completed_today: int = 0
+    # пока идёт - дедлайн по clock.monotonic(), на паузе - сколько осталось
+    deadline: Optional[float] = None
+    remaining: float = 0.0
 
 
 class PomodoroTimer:
+    # Конечный автомат на дедлайнах: тиков нет, seconds_left считается
+    # при чтении, конец фазы - один таймер в общем планировщике
+    
+    # сколько последних дней держать в памяти (в файле - все)
+    MAX_DAYS = 400
     
-    def __init__(self, settings: PomodoroSettings):
+    def __init__(self, settings: PomodoroSettings, scheduler: Scheduler = None,
+                 store: PomodoroStore = None):
         self.settings = settings
+        self.store = store
+        self.scheduler = scheduler or Scheduler(name='pomodoro')
+        self.clock = self.scheduler.clock
         self.state = PomodoroState()
-        self._thread: Optional[threading.Thread] = None
-        self._stop_event = threading.Event()
+        self._timer: Optional[Timer] = None
         self._lock = threading.Lock()
         
         # колбэки для событий
-        self._on_tick: Optional[Callable] = None
         self._on_phase_complete: Optional[Callable] = None
         self._on_pomodoro_complete: Optional[Callable] = None
         
-        # статистика по дням
+        # слушатели любых изменений состояния (для push в UI)
+        self._listeners: List[Callable] = []
+        
+        # статистика по дням; _days - даты по возрастанию, история без сортировки
         self._stats: Dict[str, PomodoroStats] = {}
-        self._load_today_stats()
+        self._days: Deque[str] = deque()
+        # новый день могут завести два потока сразу (get_status и конец фазы)
+        self._days_lock = threading.Lock()
+        if store:
+            for stats in store.load_days()[-self.MAX_DAYS:]:
+                self._add_day(stats)
+        self.state.completed_today = self._get_today_stats().completed_pomodoros
+        
+        if store:
+            self._restore(store.load_state())
     
-    def _load_today_stats(self):
-        today = date.today().isoformat()
-        if today not in self._stats:
-            self._stats[today] = PomodoroStats(date=today)
-        self.state.completed_today = self._stats[today].completed_pomodoros
+    def _add_day(self, stats: PomodoroStats):
+        self._stats[stats.date] = stats
+        self._days.append(stats.date)
+        while len(self._days) > self.MAX_DAYS:
+            del self._stats[self._days.popleft()]
     
     def _get_today_stats(self) -> PomodoroStats:
-        today = date.today().isoformat()
-        if today not in self._stats:
-            self._stats[today] = PomodoroStats(date=today)
-        return self._stats[today]
-    
-    def set_callbacks(self, on_tick: Callable = None, on_phase_complete: Callable = None,
-                     on_pomodoro_complete: Callable = None):
-        self._on_tick = on_tick
+        today = self.clock.today().isoformat()
+        stats = self._stats.get(today)
+        if stats is None:
+            with self._days_lock:
+                stats = self._stats.get(today)
+                if stats is None:
+                    stats = PomodoroStats(date=today)
+                    self._add_day(stats)
+        return stats
+    
+    def _snapshot(self) -> Dict:
+        # текущая фаза для pomodoro_state.json; дедлайн - по настенным часам,
+        # monotonic после перезапуска ничего не значит
+        state = self.state
+        return {
+            'phase': state.phase.value,
+            'running': state.running,
+            'current_pomodoro': state.current_pomodoro,
+            'remaining': self.seconds_left,
+            'ends_at': self.clock.time() + (state.deadline - self.clock.monotonic())
+                       if state.running and state.deadline is not None else None,
+        }
+    
+    def _restore(self, data: Optional[Dict]):
+        # Вернуть фазу после перезапуска. Если она закончилась, пока
+        # приложение было закрыто - завершаем её, как после сна системы
+        if not data:
+            return
+        try:
+            phase = PomodoroPhase(data['phase'])
+            current = int(data['current_pomodoro'])
+            remaining = float(data['remaining'])
+            ends_at = data.get('ends_at')
+            running = bool(data['running']) and ends_at is not None
+            if running:
+                remaining = float(ends_at) - self.clock.time()
+        except (KeyError, TypeError, ValueError):
+            return
+        
+        with self._lock:
+            self.state.phase = phase
+            self.state.current_pomodoro = current
+            self.state.remaining = max(0.0, remaining)
+            if running and remaining > 0:
+                self._run_locked(remaining)
+        if running and remaining <= 0:
+            self._complete_phase()
+    
+    def _changed(self):
+        # состояние поменялось: сохранить и сообщить слушателям
+        if self.store:
+            with self._lock:
+                snapshot = self._snapshot()
+            self.store.save_state(snapshot)
+        self._notify_listeners()
+    
+    def close(self):
+        # дописать состояние на диск
+        if self.store:
+            self.store.close()
+    
+    def set_callbacks(self, on_phase_complete: Callable = None, on_pomodoro_complete: Callable = None):
         self._on_phase_complete = on_phase_complete
         self._on_pomodoro_complete = on_pomodoro_complete
     
+    def add_listener(self, callback: Callable):
+        self._listeners.append(callback)
+    
+    def _notify_listeners(self):
+        for listener in self._listeners:
+            try:
+                listener(self)
+            except Exception:
+                pass
+    
     def update_settings(self, settings: PomodoroSettings):
         with self._lock:
             self.settings = settings
+        self._changed()
+    
+    @property
+    def seconds_left(self) -> int:
+        state = self.state
+        if state.running and state.deadline is not None:
+            return max(0, math.ceil(state.deadline - self.clock.monotonic()))
+        return max(0, math.ceil(state.remaining))
+    
+    def _duration(self, phase: PomodoroPhase) -> int:
+        if phase == PomodoroPhase.WORK:
+            return self.settings.work_minutes * 60
+        if phase == PomodoroPhase.SHORT_BREAK:
+            return self.settings.short_break_minutes * 60
+        if phase == PomodoroPhase.LONG_BREAK:
+            return self.settings.long_break_minutes * 60
+        return 0
+    
+    def _run_locked(self, remaining: float):
+        # запустить отсчёт (под self._lock)
+        self._cancel_locked()
+        self.state.remaining = remaining
+        self.state.deadline = self.clock.monotonic() + remaining
+        self.state.running = True
+        self._timer = self.scheduler.call_at(self.state.deadline, self._on_deadline, self.state.deadline)
+    
+    def _halt_locked(self):
+        # остановить отсчёт, запомнив остаток (под self._lock)
+        if self.state.running and self.state.deadline is not None:
+            self.state.remaining = max(0.0, self.state.deadline - self.clock.monotonic())
+        self._cancel_locked()
+        self.state.running = False
+        self.state.deadline = None
+    
+    def _cancel_locked(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
     
     def start(self, phase: PomodoroPhase = None):
-        if self.state.running:
-            return
-        
         with self._lock:
+            if self.state.running:
+                return
             if phase:
                 self.state.phase = phase
             elif self.state.phase == PomodoroPhase.IDLE:
                 self.state.phase = PomodoroPhase.WORK
-            
-            # установить время в зависимости от фазы
-            if self.state.phase == PomodoroPhase.WORK:
-                self.state.seconds_left = self.settings.work_minutes * 60
-            elif self.state.phase == PomodoroPhase.SHORT_BREAK:
-                self.state.seconds_left = self.settings.short_break_minutes * 60
-            elif self.state.phase == PomodoroPhase.LONG_BREAK:
-                self.state.seconds_left = self.settings.long_break_minutes * 60
-            
-            self.state.running = True
-            self._stop_event.clear()
-        
-        self._thread = threading.Thread(target=self._timer_loop, daemon=True)
-        self._thread.start()
+            self._run_locked(self._duration(self.state.phase))
+        self._changed()
     
     def pause(self):
         with self._lock:
-            self.state.running = False
-            self._stop_event.set()
+            self._halt_locked()
+        self._changed()
     
     def resume(self):
-        if self.state.running or self.state.seconds_left <= 0:
-            return
-        
         with self._lock:
-            self.state.running = True
-            self._stop_event.clear()
-        
-        self._thread = threading.Thread(target=self._timer_loop, daemon=True)
-        self._thread.start()
+            if self.state.running or self.state.remaining <= 0:
+                return
+            self._run_locked(self.state.remaining)
+        self._changed()
     
     def stop(self):
         with self._lock:
-            self.state.running = False
+            self._halt_locked()
             self.state.phase = PomodoroPhase.IDLE
-            self.state.seconds_left = 0
-            self._stop_event.set()
+            self.state.remaining = 0.0
+        self._changed()
     
     def skip(self):
         # пропустить текущую фазу
-        was_running = self.state.running
-        self.pause()
-        self._complete_phase()
-        
-        if was_running and self.state.phase != PomodoroPhase.IDLE:
-            if self.state.phase == PomodoroPhase.WORK or self.settings.auto_start_breaks:
-                self.start()
+        with self._lock:
+            was_running = self.state.running
+            self._halt_locked()
+        self._complete_phase(was_running)
     
-    def _timer_loop(self):
-        while not self._stop_event.is_set():
-            time.sleep(1)
-            
-            with self._lock:
-                if not self.state.running:
-                    break
-                
-                self.state.seconds_left -= 1
-                
-                if self._on_tick:
-                    try:
-                        self._on_tick(self.state)
-                    except Exception:
-                        pass
-                
-                if self.state.seconds_left <= 0:
-                    self.state.running = False
-                    break
-        
-        if self.state.seconds_left <= 0:
-            self._complete_phase()
+    def _on_deadline(self, deadline: float):
+        # таймер планировщика: фаза закончилась
+        with self._lock:
+            # таймер от уже отменённого/перезапущенного отсчёта
+            if not self.state.running or self.state.deadline != deadline:
+                return
+            self._cancel_locked()
+            self.state.running = False
+            self.state.deadline = None
+            self.state.remaining = 0.0
+        self._complete_phase()
     
-    def _complete_phase(self):
-        stats = self._get_today_stats()
-        prev_phase = self.state.phase
-        
+    def _complete_phase(self, was_running: bool = False):
+        # Переход к следующей фазе. Автозапуск - внутри той же блокировки,
+        # колбэки и слушатели - после неё
         with self._lock:
+            stats = self._get_today_stats()
+            prev_phase = self.state.phase
+            completed = None
+            
             if prev_phase == PomodoroPhase.WORK:
                 self.state.current_pomodoro += 1
-                self.state.completed_today += 1
                 stats.completed_pomodoros += 1
                 stats.total_work_minutes += self.settings.work_minutes
-                
-                if self._on_pomodoro_complete:
-                    try:
-                        self._on_pomodoro_complete(self.state.completed_today)
-                    except Exception:
-                        pass
+                self.state.completed_today = completed = stats.completed_pomodoros
                 
                 # следующая фаза - перерыв
                 if self.state.current_pomodoro >= self.settings.pomodoros_until_long_break:
@@ -177,26 +333,41 @@ class PomodoroTimer:
                     self.state.current_pomodoro = 0
                 else:
                     self.state.phase = PomodoroPhase.SHORT_BREAK
-                
-                if self.settings.auto_start_breaks:
-                    self.start()
+                auto_start = self.settings.auto_start_breaks
             
             elif prev_phase in [PomodoroPhase.SHORT_BREAK, PomodoroPhase.LONG_BREAK]:
                 duration = self.settings.short_break_minutes if prev_phase == PomodoroPhase.SHORT_BREAK else self.settings.long_break_minutes
                 stats.total_break_minutes += duration
                 
                 self.state.phase = PomodoroPhase.WORK
-                
-                if self.settings.auto_start_work:
-                    self.start()
+                # пропуск перерыва на ходу сразу продолжает работу
+                auto_start = self.settings.auto_start_work or was_running
             else:
                 self.state.phase = PomodoroPhase.IDLE
+                auto_start = False
+            
+            next_phase = self.state.phase
+            self.state.remaining = float(self._duration(next_phase))
+            if auto_start:
+                self._run_locked(self.state.remaining)
+            day = replace(stats) if prev_phase != PomodoroPhase.IDLE else None
+        
+        if day and self.store:
+            self.store.append_day(day)
+        
+        if completed is not None and self._on_pomodoro_complete:
+            try:
+                self._on_pomodoro_complete(completed)
+            except Exception:
+                pass
         
         if self._on_phase_complete:
             try:
-                self._on_phase_complete(prev_phase, self.state.phase)
+                self._on_phase_complete(prev_phase, next_phase)
             except Exception:
                 pass
+        
+        self._changed()
     
     def get_status(self) -> Dict:
         stats = self._get_today_stats()
@@ -204,9 +375,9 @@ class PomodoroTimer:
         return {
             'phase': self.state.phase.value,
             'running': self.state.running,
-            'seconds_left': self.state.seconds_left,
+            'seconds_left': self.seconds_left,
             'current_pomodoro': self.state.current_pomodoro,
-            'completed_today': self.state.completed_today,
+            'completed_today': stats.completed_pomodoros,
             'total_work_minutes': stats.total_work_minutes,
             'total_break_minutes': stats.total_break_minutes,
             'settings': {
@@ -220,8 +391,12 @@ class PomodoroTimer:
         }
     
     def get_history(self, days: int = 7) -> List[Dict]:
+        # последние days дней с данными, от свежих к старым - O(days).
+        # Под _days_lock: новый день может вытеснить старый прямо во время обхода
+        with self._days_lock:
+            recent = [(d, self._stats[d]) for d in islice(reversed(self._days), days)]
         result = []
-        for date_str, stats in sorted(self._stats.items(), reverse=True)[:days]:
+        for date_str, stats in recent:
             result.append({
                 'date': date_str,
                 'pomodoros': stats.completed_pomodoros,
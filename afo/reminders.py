@@ -1,36 +1,152 @@
 # Напоминания о воде, разминке и прочем
+#
+# У каждого напоминания - один таймер в общем планировщике (куча
+# дедлайнов), поток спит ровно до ближайшего. Отложить, "выполнено",
+# смена интервала - отмена старого таймера и новый: O(log n).
+#
+# Когда юзер отошёл (pause_when_idle) или напоминания выключены,
+# наступившее напоминание не показывается, а ждёт: set_idle(False) или
+# включение выпускают все ждущие разом.
+#
+# Состояние (от чего считать интервал, отложено ли, сколько раз
+# сработало) переживает перезапуск: reminders_state.json, запись пачкой
+# через DebouncedWriter. Что наступило, пока приложение было закрыто,
+# срабатывает при старте один раз, а не по разу за каждый интервал.
 
+import json
 import threading
-import time
-from datetime import datetime, timedelta
+from datetime import datetime
 from dataclasses import dataclass
-from typing import Dict, List, Callable, Optional
-from .config import ReminderSettings, ReminderItem
+from pathlib import Path
+from typing import Any, Dict, List, Callable, Optional, Set
+from .config import ReminderSettings, ReminderItem, ConfigChange
+from .scheduler import Scheduler, Timer
+from .storage import DebouncedWriter, atomic_write
 
 
 @dataclass
 class ReminderState:
     id: str
+    # от чего считается интервал (monotonic): старт, срабатывание, "выполнено"
+    anchor: float = 0.0
+    # когда сработает (monotonic)
+    due: float = 0.0
+    snoozed: bool = False
     last_triggered: Optional[datetime] = None
-    snooze_until: Optional[datetime] = None
     trigger_count: int = 0
+    timer: Optional[Timer] = None
+
+
+class ReminderStore:
+    # reminders_state.json: {id: {anchor_at, snooze_until, last_triggered, trigger_count}},
+    # время - по настенным часам (monotonic после перезапуска ничего не значит)
+    
+    def __init__(self, data_dir: Path):
+        self.path = data_dir / 'reminders_state.json'
+        self._snapshot: Optional[Callable[[], Dict]] = None
+        self._writer = DebouncedWriter(self._write, name='reminders')
+    
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+    
+    def save(self, snapshot: Callable[[], Dict]):
+        # снимок берётся при записи: пачка изменений - один обход и одна запись
+        self._snapshot = snapshot
+        self._writer.save()
+    
+    def _write(self):
+        atomic_write(self.path, json.dumps(self._snapshot()))
+    
+    def close(self):
+        self._writer.close()
 
 
 class ReminderManager:
     
-    def __init__(self, settings: ReminderSettings, is_idle_callback: Callable[[], bool] = None):
+    def __init__(self, settings: ReminderSettings, scheduler: Scheduler = None,
+                 store: ReminderStore = None):
         self.settings = settings
-        self._is_idle = is_idle_callback or (lambda: False)
+        self.store = store
+        self.scheduler = scheduler or Scheduler(name='reminders')
+        self.clock = self.scheduler.clock
+        # сохранённые состояния, ещё не разобранные по напоминаниям
+        self._saved: Dict[str, Dict[str, Any]] = store.load() if store else {}
+        self._idle = False
         self._states: Dict[str, ReminderState] = {}
+        self._items: Dict[str, ReminderItem] = {}
+        # наступили, пока юзер отошёл или напоминания выключены
+        self._held: Set[str] = set()
         self._listeners: List[Callable[[ReminderItem], None]] = []
         self._running = False
-        self._thread: Optional[threading.Thread] = None
         self._lock = threading.Lock()
         self._init_states()
     
     def _init_states(self):
-        for reminder in self._get_all_reminders():
-            self._states[reminder.id] = ReminderState(id=reminder.id)
+        # (под self._lock или до старта)
+        self._index()
+        for rid in list(self._states):
+            if rid not in self._items:
+                self._drop(rid)
+        for rid, reminder in self._items.items():
+            state = self._states.get(rid) or self._new_state(rid)
+            self._rearm(state, reminder)
+    
+    def _new_state(self, reminder_id: str) -> ReminderState:
+        # (под self._lock) новое состояние; если есть сохранённое - из него
+        now = self.clock.monotonic()
+        state = self._states[reminder_id] = ReminderState(id=reminder_id, anchor=now)
+        saved = self._saved.pop(reminder_id, None)
+        if not saved:
+            return state
+        try:
+            wall = self.clock.time()
+            # часы могли перевести назад - anchor не в будущем
+            state.anchor = now - max(0.0, wall - float(saved['anchor_at']))
+            state.trigger_count = int(saved.get('trigger_count', 0))
+            if saved.get('last_triggered') is not None:
+                state.last_triggered = datetime.fromtimestamp(float(saved['last_triggered']))
+            if saved.get('snooze_until') is not None:
+                state.due = now + max(0.0, float(saved['snooze_until']) - wall)
+                state.snoozed = True
+        except (KeyError, TypeError, ValueError, OSError):
+            # битая запись - как новое напоминание
+            state.anchor, state.due, state.snoozed = now, 0.0, False
+        # наступившее за время простоя: due в прошлом, таймер сработает
+        # сразу и один раз, следующий интервал - от этого срабатывания
+        return state
+    
+    def _snapshot(self) -> Dict[str, Dict[str, Any]]:
+        # для ReminderStore; вызывается из потока записи
+        with self._lock:
+            offset = self.clock.time() - self.clock.monotonic()
+            return {
+                rid: {
+                    'anchor_at': round(state.anchor + offset, 3),
+                    'snooze_until': round(state.due + offset, 3) if state.snoozed else None,
+                    'last_triggered': state.last_triggered.timestamp() if state.last_triggered else None,
+                    'trigger_count': state.trigger_count,
+                }
+                for rid, state in self._states.items()
+            }
+    
+    def _persist(self):
+        # не под self._lock: после close() DebouncedWriter пишет сразу,
+        # а _snapshot берёт self._lock
+        if self.store:
+            self.store.save(self._snapshot)
+    
+    def close(self):
+        # дописать состояние на диск
+        if self.store:
+            self.store.close()
+    
+    def _index(self):
+        self._items = {r.id: r for r in self._get_all_reminders()}
     
     def _get_all_reminders(self) -> List[ReminderItem]:
         reminders = []
@@ -55,118 +171,139 @@ class ReminderManager:
                 print(f"Reminder callback error: {e}")
     
     def start(self):
-        if self._running:
-            return
-        self._running = True
-        self._thread = threading.Thread(target=self._loop, daemon=True)
-        self._thread.start()
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            for rid, state in self._states.items():
+                self._rearm(state, self._items[rid])
     
     def stop(self):
-        self._running = False
-        if self._thread:
-            self._thread.join(timeout=2)
+        with self._lock:
+            self._running = False
+            for state in self._states.values():
+                self._cancel(state)
     
-    def _loop(self):
-        while self._running:
-            try:
-                self._check_reminders()
-            except Exception as e:
-                print(f"Reminder loop error: {e}")
-            time.sleep(10)
+    # --- таймеры (всё под self._lock) ---
+    
+    def _schedule(self, state: ReminderState, reminder: ReminderItem, due: float = None):
+        # перевзвести таймер: по умолчанию anchor + интервал
+        self._cancel(state)
+        self._held.discard(state.id)
+        if due is None:
+            state.snoozed = False
+            due = state.anchor + reminder.interval_minutes * 60
+        state.due = due
+        if self._running and reminder.enabled:
+            state.timer = self.scheduler.call_at(due, self._on_due, state.id, due)
     
-    def _check_reminders(self):
-        if not self.settings.enabled:
+    def _rearm(self, state: ReminderState, reminder: ReminderItem):
+        # перевзвести, не теряя отложенности
+        snoozed = state.snoozed
+        self._schedule(state, reminder, due=state.due if snoozed else None)
+        state.snoozed = snoozed
+    
+    def _cancel(self, state: ReminderState):
+        if state.timer:
+            state.timer.cancel()
+            state.timer = None
+    
+    def _drop(self, reminder_id: str):
+        state = self._states.pop(reminder_id, None)
+        if state:
+            self._cancel(state)
+        self._held.discard(reminder_id)
+    
+    def _paused(self) -> bool:
+        return not self.settings.enabled or (self.settings.pause_when_idle and self._idle)
+    
+    def _on_due(self, reminder_id: str, due: float):
+        # в потоке планировщика
+        with self._lock:
+            state = self._states.get(reminder_id)
+            reminder = self._items.get(reminder_id)
+            # таймер успели перевзвести, пока он доставался из кучи
+            if state is None or reminder is None or state.due != due or not self._running:
+                return
+            state.timer = None
+            if self._paused():
+                self._held.add(reminder_id)
+                return
+            self._trigger_locked(state, reminder)
+        self._persist()
+        self._notify(reminder)
+    
+    def _trigger_locked(self, state: ReminderState, reminder: ReminderItem):
+        state.anchor = self.clock.monotonic()
+        state.last_triggered = self.clock.now()
+        state.trigger_count += 1
+        self._schedule(state, reminder)
+    
+    def _release_held(self):
+        # (под self._lock) ждущие - показать сейчас, через планировщик
+        if self._paused() or not self._held:
             return
-        
-        if self.settings.pause_when_idle and self._is_idle():
+        now = self.clock.monotonic()
+        for rid in list(self._held):
+            state = self._states.get(rid)
+            if state:
+                self._schedule(state, self._items[rid], due=now)
+    
+    def set_idle(self, idle: bool):
+        # трекер сообщает, отошёл ли юзер; дёргается часто, без изменений - ничего
+        if idle == self._idle:
             return
-        
-        now = datetime.now()
-        
-        for reminder in self._get_all_reminders():
-            if not reminder.enabled:
-                continue
-            
-            state = self._states.get(reminder.id)
-            if not state:
-                state = ReminderState(id=reminder.id)
-                self._states[reminder.id] = state
-            
-            if state.snooze_until and now < state.snooze_until:
-                continue
-            
-            should_trigger = False
-            
-            if state.last_triggered is None:
-                # ждём полный интервал от старта
-                if not hasattr(state, '_start_time'):
-                    state._start_time = now
-                elif (now - state._start_time).total_seconds() >= reminder.interval_minutes * 60:
-                    should_trigger = True
-            else:
-                elapsed = (now - state.last_triggered).total_seconds()
-                if elapsed >= reminder.interval_minutes * 60:
-                    should_trigger = True
-            
-            if should_trigger:
-                self._trigger_reminder(reminder, state)
-    
-    def _trigger_reminder(self, reminder: ReminderItem, state: ReminderState):
         with self._lock:
-            state.last_triggered = datetime.now()
-            state.trigger_count += 1
-        self._notify(reminder)
+            self._idle = idle
+            self._release_held()
     
     def snooze(self, reminder_id: str, minutes: int = 10):
         # отложить на N минут
         with self._lock:
-            if reminder_id in self._states:
-                self._states[reminder_id].snooze_until = datetime.now() + timedelta(minutes=minutes)
+            state = self._states.get(reminder_id)
+            if state:
+                self._schedule(state, self._items[reminder_id], due=self.clock.monotonic() + minutes * 60)
+                state.snoozed = True
+        self._persist()
     
     def dismiss(self, reminder_id: str):
         # сбросить таймер (выполнено)
         with self._lock:
-            if reminder_id in self._states:
-                self._states[reminder_id].last_triggered = datetime.now()
-                self._states[reminder_id].snooze_until = None
+            state = self._states.get(reminder_id)
+            if state:
+                state.anchor = self.clock.monotonic()
+                self._schedule(state, self._items[reminder_id])
+        self._persist()
     
     def get_status(self) -> Dict:
-        now = datetime.now()
+        now = self.clock.monotonic()
         result = {
             'enabled': self.settings.enabled,
             'reminders': []
         }
         
-        for reminder in self._get_all_reminders():
-            state = self._states.get(reminder.id, ReminderState(id=reminder.id))
-            
-            next_in_seconds = None
-            if reminder.enabled:
-                if state.snooze_until and now < state.snooze_until:
-                    next_in_seconds = int((state.snooze_until - now).total_seconds())
-                elif state.last_triggered:
-                    elapsed = (now - state.last_triggered).total_seconds()
-                    remaining = (reminder.interval_minutes * 60) - elapsed
-                    next_in_seconds = max(0, int(remaining))
-                else:
-                    if hasattr(state, '_start_time'):
-                        elapsed = (now - state._start_time).total_seconds()
-                        remaining = (reminder.interval_minutes * 60) - elapsed
-                        next_in_seconds = max(0, int(remaining))
-                    else:
-                        next_in_seconds = reminder.interval_minutes * 60
-            
-            result['reminders'].append({
-                'id': reminder.id,
-                'name': reminder.name,
-                'enabled': reminder.enabled,
-                'interval_minutes': reminder.interval_minutes,
-                'message': reminder.message,
-                'icon': reminder.icon,
-                'next_in_seconds': next_in_seconds,
-                'trigger_count': state.trigger_count,
-                'snoozed': state.snooze_until is not None and now < state.snooze_until
-            })
+        with self._lock:
+            for reminder in self._get_all_reminders():
+                state = self._states.get(reminder.id)
+                if state is None:
+                    state = ReminderState(id=reminder.id, anchor=now, due=now + reminder.interval_minutes * 60)
+                
+                next_in_seconds = None
+                if reminder.enabled:
+                    next_in_seconds = max(0, int(state.due - now))
+                
+                result['reminders'].append({
+                    'id': reminder.id,
+                    'name': reminder.name,
+                    'enabled': reminder.enabled,
+                    'interval_minutes': reminder.interval_minutes,
+                    'message': reminder.message,
+                    'icon': reminder.icon,
+                    'next_in_seconds': next_in_seconds,
+                    'trigger_count': state.trigger_count,
+                    'last_triggered': state.last_triggered.timestamp() if state.last_triggered else None,
+                    'snoozed': state.snoozed and now < state.due
+                })
         
         return result
     
@@ -174,31 +311,72 @@ class ReminderManager:
         with self._lock:
             self.settings = settings
             self._init_states()
+            self._release_held()
+        self._persist()
     
-    def add_custom_reminder(self, name: str, interval_minutes: int, message: str, icon: str = 'bell') -> ReminderItem:
-        custom_id = f"custom_{int(time.time())}_{len(self.settings.custom)}"
-        
-        reminder = ReminderItem(
-            id=custom_id,
-            name=name,
-            enabled=True,
-            interval_minutes=interval_minutes,
-            message=message,
-            icon=icon
-        )
-        
+    def apply_changes(self, changes: List[ConfigChange]):
+        # Применить изменения настроек точечно: перепланируется только
+        # изменённое напоминание, у остальных таймеры не сбрасываются
         with self._lock:
-            self.settings.custom.append(reminder)
-            self._states[custom_id] = ReminderState(id=custom_id)
-        
-        return reminder
+            for change in changes:
+                path = change.path[1:]
+                if not path:
+                    continue
+                if path[0] == 'custom':
+                    self._apply_custom_change(change.old or [], change.new or [])
+                elif path[0] in ('water', 'stretch', 'eyes'):
+                    reminder = getattr(self.settings, path[0])
+                    if reminder is None:
+                        continue
+                    if len(path) == 1:
+                        # напоминание заменили целиком (сброс к умолчанию)
+                        self._index()
+                    if reminder.id not in self._states:
+                        self._new_state(reminder.id)
+                    field = path[1] if len(path) > 1 else None
+                    self._reschedule(reminder.id, field, change.new)
+            # могли включить напоминания или pause_when_idle
+            self._release_held()
+        self._persist()
     
-    def remove_custom_reminder(self, reminder_id: str) -> bool:
-        with self._lock:
-            for i, r in enumerate(self.settings.custom):
-                if r.id == reminder_id:
-                    self.settings.custom.pop(i)
-                    if reminder_id in self._states:
-                        del self._states[reminder_id]
-                    return True
-        return False
+    def _apply_custom_change(self, old: List[Dict], new: List[Dict]):
+        # список пришёл целиком - объекты в settings.custom новые
+        self._index()
+        old_by_id = {r.get('id'): r for r in old}
+        new_by_id = {r.get('id'): r for r in new}
+        for rid in old_by_id.keys() - new_by_id.keys():
+            self._drop(rid)
+        for rid, item in new_by_id.items():
+            before = old_by_id.get(rid)
+            if rid not in self._states:
+                self._new_state(rid)
+                self._reschedule(rid, None, None)
+            elif before is None:
+                self._reschedule(rid, None, None)
+            elif before.get('enabled') != item.get('enabled'):
+                self._reschedule(rid, 'enabled', item.get('enabled'))
+            elif before.get('interval_minutes') != item.get('interval_minutes'):
+                self._reschedule(rid, 'interval_minutes', item.get('interval_minutes'))
+    
+    def _reschedule(self, reminder_id: str, field: Optional[str], value):
+        # (под self._lock)
+        state = self._states[reminder_id]
+        reminder = self._items[reminder_id]
+        if field == 'enabled' and value:
+            # включили заново - отсчёт полного интервала с этого момента
+            state.anchor = self.clock.monotonic()
+            self._schedule(state, reminder)
+        elif field in ('interval_minutes', 'enabled', None):
+            # новый интервал считается от последнего срабатывания,
+            # отложенное так и остаётся отложенным
+            self._rearm(state, reminder)
+    
+    def new_custom_id(self) -> str:
+        # id для нового кастомного напоминания; само оно добавляется патчем
+        # конфига (reminders.custom), дальше - через apply_changes
+        base = f"custom_{int(self.clock.time())}"
+        taken = {r.id for r in self.settings.custom}
+        n = len(self.settings.custom)
+        while f"{base}_{n}" in taken:
+            n += 1
+        return f"{base}_{n}"
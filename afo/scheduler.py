@@ -0,0 +1,247 @@
+# Общий планировщик таймеров
+#
+# Один поток на всё приложение вместо потока на каждый таймер: дедлайны
+# лежат в куче (heapq), поток спит до ближайшего. Отмена - пометка,
+# отменённые записи выбрасываются при извлечении из кучи, а если их
+# набралось больше половины - куча пересобирается.
+#
+# Колбэки выполняются в потоке планировщика и должны быть короткими.
+# Всё, что может зависнуть на вызове ОС (окна, процессы, дисплей, файлы),
+# уходит в ограниченный пул submit() - every(..., blocking=True). Пока
+# прошлый запуск такой задачи не закончился, новый пропускается, так что
+# очередь пула не растёт, даже если вызов ОС встал.
+#
+# С VirtualClock поток не запускается - время двигает run_until(),
+# выполняя таймеры по порядку и переставляя часы на каждый дедлайн.
+
+import heapq
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from .clock import Clock, SYSTEM_CLOCK
+
+
+class Timer:
+    __slots__ = ('deadline', 'callback', 'args', 'cancelled', '_scheduler')
+
+    def __init__(self, deadline: float, callback: Callable, args: tuple, scheduler: 'Scheduler' = None):
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+        self._scheduler = scheduler
+
+    def cancel(self):
+        if not self.cancelled:
+            self.cancelled = True
+            if self._scheduler:
+                self._scheduler._cancelled += 1
+
+
+class PeriodicTask:
+    # Повтор раз в interval. Дедлайны - от прошлого дедлайна, без дрейфа;
+    # после сна системы пропущенные запуски не догоняются пачкой
+
+    def __init__(self, scheduler: 'Scheduler', interval: float, callback: Callable, args: tuple,
+                 blocking: bool):
+        self.scheduler = scheduler
+        self.interval = interval
+        self.callback = callback
+        self.args = args
+        self.blocking = blocking
+        self.cancelled = False
+        # запусков пропущено, потому что прошлый ещё шёл
+        self.skipped = 0
+        self._timer: Optional[Timer] = None
+        self._idle = threading.Event()
+        self._idle.set()
+
+    def _schedule(self, deadline: float):
+        self._timer = self.scheduler.call_at(deadline, self._fire, deadline)
+
+    def _fire(self, deadline: float):
+        if self.cancelled:
+            return
+        now = self.scheduler.clock.monotonic()
+        next_deadline = deadline + self.interval
+        if next_deadline <= now:
+            next_deadline = now + self.interval
+        self._schedule(next_deadline)
+        if not self._idle.is_set():
+            self.skipped += 1
+            return
+        self._idle.clear()
+        if not self.blocking:
+            self._run()
+        elif not self.scheduler.submit(self._run):
+            # планировщик закрыт - запуска не будет
+            self._idle.set()
+
+    def _run(self):
+        try:
+            self.scheduler._run_callback(self.callback, self.args)
+        finally:
+            self._idle.set()
+
+    def cancel(self, wait: float = 0):
+        # wait - сколько ждать запуска, который уже идёт
+        self.cancelled = True
+        if self._timer:
+            self._timer.cancel()
+        if wait:
+            self._idle.wait(wait)
+
+
+class Scheduler:
+
+    # дольше не спим даже без таймеров: после сна системы ожидание
+    # может растянуться, а так дедлайн проверится не позже чем через MAX_WAIT
+    MAX_WAIT = 30.0
+    # меньше отменённых записей не стоит пересборки кучи
+    COMPACT_MIN = 64
+    # потоков для блокирующих вызовов ОС
+    EXECUTOR_WORKERS = 2
+
+    def __init__(self, clock: Clock = None, name: str = 'scheduler'):
+        self.clock = clock or SYSTEM_CLOCK
+        self.name = name
+        self._heap: List[tuple] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        # примерное число отменённых записей в куче (только для решения о пересборке)
+        self._cancelled = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def call_at(self, deadline: float, callback: Callable, *args) -> Timer:
+        # deadline - по clock.monotonic()
+        timer = Timer(deadline, callback, args, self)
+        with self._cond:
+            if self._cancelled > self.COMPACT_MIN and self._cancelled * 2 > len(self._heap):
+                self._compact()
+            heapq.heappush(self._heap, (deadline, next(self._seq), timer))
+            # разбудить поток, только если новый таймер стал ближайшим
+            if self._heap[0][2] is timer:
+                self._cond.notify()
+            if self._thread is None and self.clock.realtime and not self._closed:
+                self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+                self._thread.start()
+        return timer
+
+    def call_later(self, delay: float, callback: Callable, *args) -> Timer:
+        return self.call_at(self.clock.monotonic() + delay, callback, *args)
+
+    def every(self, interval: float, callback: Callable, *args, blocking: bool = False,
+              delay: float = 0.0) -> PeriodicTask:
+        # callback раз в interval, первый раз - через delay (по умолчанию сразу)
+        task = PeriodicTask(self, interval, callback, args, blocking)
+        task._schedule(self.clock.monotonic() + delay)
+        return task
+
+    def submit(self, callback: Callable, *args) -> bool:
+        # Выполнить в пуле для блокирующих вызовов. С виртуальными часами -
+        # сразу, в том же потоке: прогон остаётся детерминированным.
+        # False - планировщик закрыт, вызова не будет
+        if not self.clock.realtime:
+            self._run_callback(callback, args)
+            return True
+        with self._cond:
+            if self._closed:
+                return False
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.EXECUTOR_WORKERS,
+                                                    thread_name_prefix=self.name + '-io')
+            executor = self._executor
+        executor.submit(self._run_callback, callback, args)
+        return True
+
+    def _compact(self):
+        # (под self._cond) частые перепланирования оставляют в куче мусор
+        self._heap = [entry for entry in self._heap if not entry[2].cancelled]
+        heapq.heapify(self._heap)
+        self._cancelled = 0
+
+    def pending(self) -> int:
+        # сколько таймеров ждёт (без отменённых)
+        with self._cond:
+            return sum(1 for _, _, t in self._heap if not t.cancelled)
+
+    def _pop_due(self, now: float) -> Optional[Timer]:
+        # ближайший наступивший таймер (под self._cond)
+        while self._heap:
+            deadline, _, timer = self._heap[0]
+            if timer.cancelled:
+                heapq.heappop(self._heap)
+                self._cancelled = max(0, self._cancelled - 1)
+                continue
+            if deadline > now:
+                return None
+            heapq.heappop(self._heap)
+            return timer
+        return None
+
+    def _next_deadline(self) -> Optional[float]:
+        while self._heap and self._heap[0][2].cancelled:
+            heapq.heappop(self._heap)
+            self._cancelled = max(0, self._cancelled - 1)
+        return self._heap[0][0] if self._heap else None
+
+    def _run_callback(self, callback: Callable, args: tuple):
+        try:
+            callback(*args)
+        except Exception as e:
+            print(f"Scheduler callback error: {e}")
+
+    def _run(self, timer: Timer):
+        self._run_callback(timer.callback, timer.args)
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        return
+                    now = self.clock.monotonic()
+                    timer = self._pop_due(now)
+                    if timer:
+                        break
+                    deadline = self._next_deadline()
+                    wait = self.MAX_WAIT if deadline is None else min(deadline - now, self.MAX_WAIT)
+                    self._cond.wait(wait)
+            self._run(timer)
+
+    def run_until(self, deadline: float) -> int:
+        # Виртуальное время: выполнить всё до deadline по порядку.
+        # Таймеры, добавленные колбэками, тоже успевают выполниться
+        count = 0
+        while True:
+            with self._cond:
+                next_deadline = self._next_deadline()
+                if next_deadline is None or next_deadline > deadline:
+                    break
+                self.clock.advance_to(next_deadline)
+                timer = self._pop_due(next_deadline)
+            if timer:
+                self._run(timer)
+                count += 1
+        self.clock.advance_to(deadline)
+        return count
+
+    def advance(self, seconds: float) -> int:
+        return self.run_until(self.clock.monotonic() + seconds)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._heap.clear()
+            self._cancelled = 0
+            self._cond.notify_all()
+            executor, self._executor = self._executor, None
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+        if executor:
+            # stop() не ждёт зависший вызов ОС
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,226 @@
+# Схема конфига, собранная из dataclass'ов
+#
+# compile_schema(Config) один раз обходит аннотации и строит дерево узлов:
+# объект (dataclass), список, скаляр. Дальше по нему:
+#   - build(data) - собрать dataclass из JSON (загрузка config.json);
+#   - plan(patch) - проверить JSON merge-patch (RFC 7396) и вернуть список
+#     операций (путь, новое значение). Обходятся только ключи патча,
+#     так что проверка стоит O(размер патча), а не O(размер конфига).
+#
+# null в патче по RFC означает "удалить ключ" - у нас набор полей
+# фиксирован, поэтому поле возвращается к значению по умолчанию.
+
+import copy
+import dataclasses
+import typing
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+Path = Tuple[str, ...]
+# дополнительная проверка значения: вернуть текст ошибки или None
+Check = Callable[[Any], Optional[str]]
+
+
+def pointer(path: Path) -> str:
+    # путь в виде JSON Pointer (RFC 6901): ('reminders', 'water') -> /reminders/water
+    return ''.join('/' + str(p).replace('~', '~0').replace('/', '~1') for p in path)
+
+
+class SchemaError(ValueError):
+    # одно нарушение схемы с точным путём
+
+    def __init__(self, path: Path, message: str):
+        super().__init__(f"{pointer(path) or '/'}: {message}")
+        self.path = path
+        self.message = message
+
+    def to_dict(self) -> Dict:
+        return {'path': pointer(self.path), 'message': self.message}
+
+
+class ValidationError(ValueError):
+    # все ошибки патча разом, чтобы UI мог подсветить каждое поле
+
+    def __init__(self, errors: List[SchemaError]):
+        super().__init__('; '.join(str(e) for e in errors))
+        self.errors = errors
+
+
+# маркер "значение не подошло" - поле остаётся по умолчанию
+_INVALID = object()
+
+
+class Node:
+    check: Optional[Check] = None
+
+    def build(self, value: Any, path: Path, errors: List[SchemaError]) -> Any:
+        raise NotImplementedError
+
+    def _checked(self, value: Any, path: Path, errors: List[SchemaError]) -> Any:
+        if self.check and value is not _INVALID:
+            message = self.check(value)
+            if message:
+                errors.append(SchemaError(path, message))
+                return _INVALID
+        return value
+
+
+class Scalar(Node):
+    NAMES = {bool: 'boolean', int: 'integer', float: 'number', str: 'string'}
+
+    def __init__(self, kind: type, check: Check = None):
+        self.kind = kind
+        self.check = check
+
+    def build(self, value, path, errors):
+        kind = self.kind
+        # bool в Python - подкласс int, а в JSON это разные типы
+        if kind is float:
+            ok = isinstance(value, (int, float)) and not isinstance(value, bool)
+            if ok:
+                value = float(value)
+        elif kind is int:
+            ok = isinstance(value, int) and not isinstance(value, bool)
+        else:
+            ok = isinstance(value, kind)
+        if not ok:
+            errors.append(SchemaError(path, f"expected {self.NAMES[kind]}, got {json_type(value)}"))
+            return _INVALID
+        return self._checked(value, path, errors)
+
+
+class Array(Node):
+    def __init__(self, item: Node, check: Check = None):
+        self.item = item
+        self.check = check
+
+    def build(self, value, path, errors):
+        if not isinstance(value, list):
+            errors.append(SchemaError(path, f"expected array, got {json_type(value)}"))
+            return _INVALID
+        items = [self.item.build(v, path + (str(i),), errors) for i, v in enumerate(value)]
+        # при загрузке неверные элементы просто выпадают, патч с ошибками не применится
+        items = [item for item in items if item is not _INVALID]
+        return self._checked(items, path, errors)
+
+
+class Object(Node):
+    def __init__(self, cls: type, fields: Dict[str, Node]):
+        self.cls = cls
+        self.fields = fields
+        # значения по умолчанию - из экземпляра, __post_init__ их уже заполнил
+        self.defaults = {name: getattr(cls(), name) for name in fields}
+
+    def default(self, name: str) -> Any:
+        return copy.deepcopy(self.defaults[name])
+
+    def build(self, value, path, errors):
+        # dataclass из dict; отсутствующие и неверные поля - по умолчанию
+        if not isinstance(value, dict):
+            errors.append(SchemaError(path, f"expected object, got {json_type(value)}"))
+            return _INVALID
+        kwargs = {}
+        for name, item in value.items():
+            node = self.fields.get(name)
+            if node is None:
+                errors.append(SchemaError(path + (name,), "unknown field"))
+                continue
+            if item is None:
+                continue
+            built = node.build(item, path + (name,), errors)
+            if built is not _INVALID:
+                kwargs[name] = built
+        return self.cls(**kwargs)
+
+    def reset(self, value: Any, path: Path, ops: List[Tuple[Path, Any]]):
+        # сброс к value (экземпляр self.cls) операциями по листьям, объект остаётся тем же
+        for name, node in self.fields.items():
+            item = getattr(value, name)
+            if isinstance(node, Object) and item is not None:
+                node.reset(item, path + (name,), ops)
+            else:
+                ops.append((path + (name,), copy.deepcopy(item)))
+
+    def plan(self, patch: Any, path: Path, ops: List[Tuple[Path, Any]], errors: List[SchemaError]):
+        # merge-patch: объект - рекурсивно по ключам, остальное заменяется целиком
+        if not isinstance(patch, dict):
+            errors.append(SchemaError(path, f"expected object, got {json_type(patch)}"))
+            return
+        for name, value in patch.items():
+            node = self.fields.get(name)
+            field_path = path + (name,)
+            if node is None:
+                errors.append(SchemaError(field_path, "unknown field"))
+            elif value is None and isinstance(node, Object):
+                # секцию не подменяем: подсистемы держат ссылку на неё
+                node.reset(self.default(name), field_path, ops)
+            elif value is None:
+                ops.append((field_path, self.default(name)))
+            elif isinstance(node, Object):
+                node.plan(value, field_path, ops, errors)
+            else:
+                built = node.build(value, field_path, errors)
+                if built is not _INVALID:
+                    ops.append((field_path, built))
+
+
+def json_type(value: Any) -> str:
+    if value is None:
+        return 'null'
+    if isinstance(value, bool):
+        return 'boolean'
+    if isinstance(value, (int, float)):
+        return 'number'
+    if isinstance(value, str):
+        return 'string'
+    if isinstance(value, list):
+        return 'array'
+    if isinstance(value, dict):
+        return 'object'
+    return type(value).__name__
+
+
+def compile_schema(cls: type, checks: Dict[Path, Check] = None, _path: Path = ()) -> Object:
+    # Дерево узлов по аннотациям dataclass'а. checks - доп. проверки по пути поля
+    checks = checks or {}
+    hints = typing.get_type_hints(cls)
+    fields = {}
+    for f in dataclasses.fields(cls):
+        path = _path + (f.name,)
+        fields[f.name] = _compile_type(hints[f.name], checks, path)
+    return Object(cls, fields)
+
+
+def _compile_type(tp: Any, checks: Dict[Path, Check], path: Path) -> Node:
+    # Optional[X] -> X: null и так означает "по умолчанию"
+    if typing.get_origin(tp) is typing.Union:
+        args = [a for a in typing.get_args(tp) if a is not type(None)]
+        tp = args[0]
+    if dataclasses.is_dataclass(tp):
+        return compile_schema(tp, checks, path)
+    if typing.get_origin(tp) in (list, List):
+        (item,) = typing.get_args(tp)
+        # элементы - одной схемой, доп. проверки для них - по пути с '*' вместо индекса
+        return Array(_compile_type(item, checks, path + ('*',)), checks.get(path))
+    if tp in Scalar.NAMES:
+        return Scalar(tp, checks.get(path))
+    raise TypeError(f"{pointer(path)}: unsupported type {tp!r}")
+
+
+def plan_patch(schema: Object, patch: Any) -> List[Tuple[Path, Any]]:
+    # Проверить merge-patch целиком; ошибки - все сразу в ValidationError
+    ops: List[Tuple[Path, Any]] = []
+    errors: List[SchemaError] = []
+    schema.plan(patch, (), ops, errors)
+    if errors:
+        raise ValidationError(errors)
+    return ops
+
+
+def build(schema: Object, data: Any) -> Tuple[Any, List[SchemaError]]:
+    # Собрать объект из данных; то что не прошло проверку - по умолчанию
+    errors: List[SchemaError] = []
+    result = schema.build(data, (), errors)
+    if result is _INVALID:
+        result = schema.cls()
+    return result, errors
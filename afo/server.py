@@ -1,21 +1,63 @@
 # Веб-сервер и API
 
+import gzip
 import json
+import os
+import socket
+import struct
+import sys
 import threading
-import webbrowser
+import time
 from http.server import HTTPServer, SimpleHTTPRequestHandler
+from socketserver import ThreadingMixIn
+from dataclasses import asdict
+from datetime import datetime
+from email.utils import formatdate
 from pathlib import Path
 from urllib.parse import urlparse, parse_qs
-from typing import Dict, Any, Optional, Callable
+from typing import Dict, Any, List, Optional, Callable, Tuple
 
+from .backend import Backend, create_backend
+from .clock import Clock
 from .tracker import ActivityTracker, ActivityState
 from .analyzer import StateAnalyzer, AnalysisResult
 from .environment import EnvironmentController, AmbientSound
-from .config import ConfigManager
-from .reminders import ReminderManager
-from .pomodoro import PomodoroTimer, PomodoroPhase
+from .config import ConfigManager, ConfigChange, get_app_data_dir
+from .reminders import ReminderManager, ReminderStore
+from .pomodoro import PomodoroTimer, PomodoroPhase, PomodoroStore
+from .scheduler import PeriodicTask, Scheduler
 from .hotkeys import HotkeyManager
-from . import autostart
+from .events import EventHub
+from .notifications import NotificationQueue
+from .schema import ValidationError
+from .startup import PROFILE
+from .history import (Session, SessionStore, parse_time, EXPORT_FORMATS,
+                      export_ndjson, export_csv, chunks)
+from .static import StaticCache, StaticAsset, choose_encoding, parse_range, file_etag
+from . import metrics
+from . import websocket
+
+
+# JSON меньше этого отдаём без сжатия
+GZIP_MIN_SIZE = 1024
+
+# версии состояния начинаются заново при каждом запуске - ETag'и прошлого
+# процесса не должны совпасть с новыми
+BOOT_ID = os.urandom(4).hex()
+
+# долгие соединения - их длительность в гистограмму задержек не пишем
+STREAM_ROUTES = {'/api/events', '/api/ws', '/api/export'}
+
+# роуты, принимающие PATCH (JSON merge-patch)
+PATCH_ROUTES = {'/api/config'}
+
+# поля, которые POST /api/pomodoro и /api/procrastination передают в конфиг как есть
+POMODORO_FIELDS = ('work_minutes', 'short_break_minutes', 'long_break_minutes',
+                   'pomodoros_until_long_break', 'auto_start_breaks', 'auto_start_work')
+PROCRASTINATION_FIELDS = ('enabled', 'work_hours_start', 'work_hours_end',
+                          'warning_threshold_minutes', 'cooldown_minutes')
+# POST /api/reminders: параметр -> поле напоминания
+REMINDER_FIELDS = {'reminder_enabled': 'enabled', 'interval_minutes': 'interval_minutes', 'message': 'message'}
 
 
 class APIHandler(SimpleHTTPRequestHandler):
@@ -23,65 +65,262 @@ class APIHandler(SimpleHTTPRequestHandler):
     
     orchestrator: 'Orchestrator' = None
     static_dir: Path = None
+    static_cache: StaticCache = None
     
-    def __init__(self, *args, **kwargs):
-        self.routes = {
-            '/api/status': self.handle_status,
-            '/api/stats': self.handle_stats,
-            '/api/config': self.handle_config,
-            '/api/sound': self.handle_sound,
-            '/api/mode': self.handle_mode,
-            '/api/break': self.handle_break,
-            '/api/autostart': self.handle_autostart,
-            '/api/reminders': self.handle_reminders,
-            '/api/reminders/snooze': self.handle_reminder_snooze,
-            '/api/reminders/dismiss': self.handle_reminder_dismiss,
-            '/api/procrastination': self.handle_procrastination,
-            '/api/pomodoro': self.handle_pomodoro,
-            '/api/pomodoro/start': self.handle_pomodoro_start,
-            '/api/pomodoro/pause': self.handle_pomodoro_pause,
-            '/api/pomodoro/stop': self.handle_pomodoro_stop,
-            '/api/pomodoro/skip': self.handle_pomodoro_skip,
-            '/api/hotkeys': self.handle_hotkeys,
-        }
-        super().__init__(*args, **kwargs)
+    # HTTP/1.1 - браузер держит соединение открытым между запросами
+    protocol_version = 'HTTP/1.1'
+    # сколько ждать следующий запрос на keep-alive соединении
+    timeout = 10
+    # заголовки и тело уходят разными write - без этого Nagle даёт ~40 мс задержки
+    disable_nagle_algorithm = True
+    # WebSocket без сообщений дольше этого получает ping; не ответил на
+    # WS_MISSED_PINGS подряд - закрываем и освобождаем место потока
+    WS_PING_INTERVAL = 30.0
+    WS_MISSED_PINGS = 2
+    
+    _slot_held = False
+    
+    def handle_one_request(self):
+        # Слот пула запросов - только пока запрос обрабатывается: keep-alive
+        # соединение, которое ждёт следующий запрос, слот не держит
+        try:
+            if not self.rfile.peek(1):
+                self.close_connection = True
+                return
+        except OSError:
+            # таймаут keep-alive или клиент ушёл
+            self.close_connection = True
+            return
+        
+        if not self.server.acquire_slot():
+            self.close_connection = True
+            self.wfile.write(b'HTTP/1.1 503 Service Unavailable\r\n'
+                             b'Content-Length: 0\r\nConnection: close\r\n\r\n')
+            return
+        self._slot_held = True
+        try:
+            super().handle_one_request()
+        finally:
+            self._release_slot()
+    
+    def _release_slot(self):
+        if self._slot_held:
+            self._slot_held = False
+            self.server.release_slot()
+    
+    def begin_stream(self) -> bool:
+        # Запрос становится долгим потоком (SSE, WebSocket): вместо слота
+        # запросов - слот потоков. False - потоков слишком много, ответ 503 отправлен
+        if not self.server.acquire_stream():
+            self.send_json({'error': 'too many streams'}, 503)
+            return False
+        self._release_slot()
+        return True
     
     def log_message(self, format, *args):
         # Отключить логирование запросов
         pass
     
+    def send_response(self, code, message=None):
+        self._status = code
+        super().send_response(code, message)
+    
+    def _timed(self, method: str, handle: Callable):
+        # обработать запрос и записать метрики по роуту
+        self._route = 'other'
+        self._status = 0
+        started = time.perf_counter()
+        try:
+            handle()
+        finally:
+            if self._route not in STREAM_ROUTES:
+                metrics.HTTP_DURATION.observe(time.perf_counter() - started, self._route, method)
+            metrics.HTTP_REQUESTS.inc(self._route, method, str(self._status))
+    
     def send_json(self, data: Dict, status: int = 200):
         # Отправить JSON ответ
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_json_bytes(body, status)
+    
+    def send_json_bytes(self, body: bytes, status: int = 200, headers: Dict[str, str] = None,
+                        gzipped: bytes = None):
+        # Отправить уже сериализованный JSON, большие ответы - в gzip
+        headers = dict(headers or {})
+        if len(body) >= GZIP_MIN_SIZE:
+            headers['Vary'] = 'Accept-Encoding'
+            if choose_encoding(self.headers.get('Accept-Encoding'), ['gzip']) == 'gzip':
+                body = gzipped or gzip.compress(body, compresslevel=5)
+                headers['Content-Encoding'] = 'gzip'
+        
         self.send_response(status)
         self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
         self.send_header('Access-Control-Allow-Origin', '*')
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def send_bytes(self, body: bytes, content_type: str, headers: Dict[str, str] = None):
+        # Отправить готовое тело (статика, звуки)
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def send_chunked(self, content_type: str, blocks, headers: Dict[str, str] = None):
+        # Отдать поток блоков без Content-Length (chunked для HTTP/1.1).
+        # Следующий блок берётся только когда предыдущий ушёл в сокет -
+        # медленный клиент тормозит генератор, а не копит память
+        chunked = self.request_version != 'HTTP/1.0'
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        else:
+            self.close_connection = True
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
         self.end_headers()
-        self.wfile.write(json.dumps(data, ensure_ascii=False).encode('utf-8'))
+        
+        try:
+            for block in blocks:
+                if not block:
+                    continue
+                if chunked:
+                    self.wfile.write(b'%x\r\n' % len(block) + block + b'\r\n')
+                else:
+                    self.wfile.write(block)
+            if chunked:
+                self.wfile.write(b'0\r\n\r\n')
+        except (ConnectionError, TimeoutError):
+            # клиент ушёл посреди выгрузки
+            self.close_connection = True
+    
+    def send_asset(self, asset: StaticAsset, cache_control: str = 'no-cache'):
+        # Отдать файл из кэша: 304 если у браузера актуальная копия
+        encoding = choose_encoding(self.headers.get('Accept-Encoding'), list(asset.variants))
+        headers = {
+            'ETag': asset.etag_for(encoding),
+            'Last-Modified': asset.last_modified,
+            'Cache-Control': cache_control,
+            'Vary': 'Accept-Encoding',
+        }
+        
+        if asset.not_modified(encoding, self.headers.get('If-None-Match'),
+                              self.headers.get('If-Modified-Since')):
+            self.send_response(304)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            return
+        
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        self.send_bytes(asset.variants[encoding], asset.content_type, headers)
+    
+    def send_file(self, path: Path, content_type: str, cache_control: str):
+        # Отдать файл с диска потоком, с поддержкой Range (перемотка, зацикливание)
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            self.send_json({'error': 'Not found'}, 404)
+            return
+        
+        with f:
+            stat = os.fstat(f.fileno())
+            size = stat.st_size
+            etag = file_etag(stat)
+            last_modified = formatdate(stat.st_mtime, usegmt=True)
+            headers = {
+                'Accept-Ranges': 'bytes',
+                'ETag': etag,
+                'Last-Modified': last_modified,
+                'Cache-Control': cache_control,
+            }
+            
+            if_none_match = self.headers.get('If-None-Match')
+            if if_none_match and (etag in if_none_match or if_none_match.strip() == '*'):
+                self.send_response(304)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                return
+            
+            range_header = self.headers.get('Range')
+            if_range = self.headers.get('If-Range')
+            if range_header and if_range and if_range not in (etag, last_modified):
+                # файл поменялся с тех пор как клиент скачал кусок - отдаём целиком
+                range_header = None
+            
+            try:
+                byte_range = parse_range(range_header, size)
+            except ValueError:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            
+            if byte_range:
+                start, end = byte_range
+                self.send_response(206)
+                self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+            else:
+                start, end = 0, size - 1
+                self.send_response(200)
+            
+            count = end - start + 1 if size else 0
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(count))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            
+            # socket.sendfile - os.sendfile где есть, иначе чтение кусками;
+            # файл целиком в память не попадает
+            if count:
+                self.connection.sendfile(f, start, count)
     
     def do_OPTIONS(self):
         # Обработка CORS preflight
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, PATCH, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Content-Length', '0')
         self.end_headers()
     
     def do_GET(self):
+        self._timed('GET', self._do_get)
+    
+    def do_POST(self):
+        self._timed('POST', self._do_post)
+    
+    def do_PATCH(self):
+        self._timed('PATCH', self._do_post)
+    
+    def _do_get(self):
         # Обработка GET запросов
         parsed = urlparse(self.path)
         path = parsed.path
         
         # API роуты
         if path.startswith('/api/'):
-            handler = self.routes.get(path.split('?')[0])
+            handler = self.routes.get(path)
             if handler:
+                self._route = path
                 params = parse_qs(parsed.query)
-                handler('GET', params)
+                handler(self, 'GET', params)
             else:
                 self.send_json({'error': 'Not found'}, 404)
             return
         
         # Статические файлы
+        self._route = 'static'
         if path == '/':
             path = '/index.html'
         
@@ -92,66 +331,58 @@ class APIHandler(SimpleHTTPRequestHandler):
             if not icon_path.exists():
                 # Fallback - ищем рядом с afo/
                 icon_path = Path(__file__).parent.parent / 'icon.png'
-            if icon_path.exists():
-                self.send_response(200)
-                self.send_header('Content-Type', 'image/png')
-                self.send_header('Cache-Control', 'max-age=3600')
-                self.end_headers()
-                self.wfile.write(icon_path.read_bytes())
+            asset = self.static_cache.get(icon_path)
+            if asset:
+                self.send_asset(asset, 'max-age=3600')
                 return
         
         # Звуковые файлы из папки sounds
         if path.startswith('/sounds/'):
+            self._route = '/sounds'
             sound_file = path.split('/')[-1]
             sound_path = Path(__file__).parent / 'sounds' / sound_file
             if sound_path.exists() and sound_path.suffix == '.mp3':
-                self.send_response(200)
-                self.send_header('Content-Type', 'audio/mpeg')
-                self.send_header('Accept-Ranges', 'bytes')
-                self.send_header('Cache-Control', 'max-age=86400')
-                self.end_headers()
-                self.wfile.write(sound_path.read_bytes())
+                self.send_file(sound_path, 'audio/mpeg', 'max-age=86400')
                 return
         
-        file_path = self.static_dir / path.lstrip('/')
+        file_path = (self.static_dir / path.lstrip('/')).resolve()
         
-        if file_path.exists() and file_path.is_file():
-            self.send_response(200)
-            
-            content_types = {
-                '.html': 'text/html',
-                '.css': 'text/css',
-                '.js': 'application/javascript',
-                '.json': 'application/json',
-                '.png': 'image/png',
-                '.svg': 'image/svg+xml',
-                '.ico': 'image/x-icon',
-            }
-            content_type = content_types.get(file_path.suffix, 'application/octet-stream')
-            self.send_header('Content-Type', f'{content_type}; charset=utf-8')
-            self.end_headers()
-            
-            self.wfile.write(file_path.read_bytes())
+        # только файлы внутри web/, без выхода через ..
+        asset = None
+        if self.static_dir in file_path.parents:
+            asset = self.static_cache.get(file_path)
+        
+        if asset:
+            self.send_asset(asset)
         else:
             self.send_json({'error': 'Not found'}, 404)
     
-    def do_POST(self):
-        # Обработка POST запросов
+    def _do_post(self):
+        # Обработка POST и PATCH запросов
         parsed = urlparse(self.path)
         path = parsed.path
+        method = self.command
+        
+        # тело читаем всегда, иначе оно останется в keep-alive соединении
+        content_length = int(self.headers.get('Content-Length', 0))
+        raw_body = self.rfile.read(content_length) if content_length > 0 else b''
         
         if path.startswith('/api/'):
             handler = self.routes.get(path)
-            if handler:
-                content_length = int(self.headers.get('Content-Length', 0))
+            if handler and method == 'PATCH' and path not in PATCH_ROUTES:
+                self._route = path
+                self.send_json({'error': 'Method not allowed'}, 405)
+            elif handler:
+                self._route = path
                 body = {}
-                if content_length > 0:
-                    raw_body = self.rfile.read(content_length)
+                if raw_body:
                     try:
                         body = json.loads(raw_body.decode('utf-8'))
                     except Exception:
-                        pass
-                handler('POST', body)
+                        if method == 'PATCH':
+                            self.send_json({'error': 'Invalid JSON'}, 400)
+                            return
+                handler(self, method, body)
             else:
                 self.send_json({'error': 'Not found'}, 404)
         else:
@@ -161,49 +392,114 @@ class APIHandler(SimpleHTTPRequestHandler):
         # Получить текущий статус
         orch = self.orchestrator
         
-        status = {
-            'running': orch.running,
-            'activity': {
-                'current_app': orch.tracker.state.current_app,
-                'current_window': orch.tracker.state.current_window,
-                'is_idle': orch.tracker.state.is_idle,
-                'idle_seconds': orch.tracker.state.idle_seconds,
-                'activity_level': orch.tracker.state.activity_level,
-            },
-            'analysis': None,
-            'environment': {
-                'sound': orch.environment.state.sound.value,
-                'sound_volume': orch.environment.state.sound_volume,
-                'night_mode': orch.environment.state.night_mode_active,
-                'focus_mode': orch.environment.state.focus_mode,
-                'notifications_filtered': orch.environment.state.notifications_filtered,
-            },
-            # напоминания которые надо показать юзеру
-            'pending_reminders': orch._pending_reminders.copy()
-        }
+        # ?since=<seq> - последнее увиденное уведомление; очередь не очищается,
+        # каждая вкладка получает всё новее своего курсора
+        try:
+            cursor = int(params.get('since', ['0'])[0])
+        except ValueError:
+            cursor = 0
+        pending, seq = orch.notifications.since(cursor)
+        if pending:
+            # напоминания которые надо показать юзеру - такой ответ не кэшируем
+            status = orch.status_payload()
+            status['pending_reminders'] = pending
+            status['notifications_seq'] = seq
+            self.send_json(status)
+            return
         
-        # очищаем после отправки (юзер их увидел)
-        orch._pending_reminders.clear()
-        
-        if orch._last_analysis:
-            status['analysis'] = {
-                'mode': orch._last_analysis.mode.value,
-                'confidence': orch._last_analysis.confidence,
-                'time_of_day': orch._last_analysis.time_of_day.value,
-                'work_minutes': orch._last_analysis.work_session_minutes,
-                'should_break': orch._last_analysis.should_take_break,
-                'recommendations': orch._last_analysis.recommendations,
-                'procrastination': {
-                    'active': orch._last_analysis.procrastination.active,
-                    'entertainment_minutes': orch._last_analysis.procrastination.entertainment_minutes,
-                    'message': orch._last_analysis.procrastination.message,
-                }
-            }
+        # обычный опрос - готовые байты текущей версии состояния
+        snapshot = orch.status_snapshot()
+        headers = {'ETag': snapshot.etag, 'Cache-Control': 'no-cache'}
         
-        self.send_json(status)
+        if snapshot.etag in (self.headers.get('If-None-Match') or ''):
+            self.send_response(304)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            return
+        
+        self.send_json_bytes(snapshot.body, headers=headers, gzipped=snapshot.gzipped)
+    
+    def handle_events(self, method: str, params: Dict):
+        # SSE поток: activity, analysis, environment, pomodoro, reminder
+        hub = self.orchestrator.events
+        
+        last_id = self.headers.get('Last-Event-ID') or params.get('last_event_id', [None])[0]
+        try:
+            last_id = int(last_id) if last_id is not None else None
+        except ValueError:
+            last_id = None
+        
+        if not self.begin_stream():
+            return
+        try:
+            self._stream_events(hub, last_id)
+        finally:
+            self.server.release_stream()
+    
+    def _stream_events(self, hub: EventHub, last_id: Optional[int]):
+        # длина заранее неизвестна - поток заканчивается закрытием соединения
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        
+        try:
+            frames, cursor = hub.initial(last_id)
+            self.wfile.write(b'retry: 3000\n\n' + b''.join(frames))
+            
+            while self.orchestrator.running and not hub.closed:
+                frames, cursor = hub.wait(cursor, timeout=15)
+                if frames:
+                    self.wfile.write(b''.join(frames))
+                else:
+                    # комментарий-пинг, чтобы прокси и браузер не рвали соединение
+                    self.wfile.write(b': ping\n\n')
+        except (ConnectionError, TimeoutError):
+            pass
     
     def handle_stats(self, method: str, params: Dict):
-        # Получить статистику
+        # Получить статистику: без параметров - за сегодня,
+        # ?from=&to=&bucket=hour|day|week&group=app|mode|category - по истории
+        if not any(k in params for k in ('from', 'to', 'bucket', 'group')):
+            self.send_json(self.stats_payload())
+            return
+        
+        def param(name: str, default: str) -> str:
+            return params.get(name, [default])[0]
+        
+        try:
+            clock = self.orchestrator.clock
+            now = clock.time()
+            if 'from' in params:
+                start = parse_time(param('from', ''))
+            else:
+                start = clock.now().replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+            end = parse_time(param('to', '')) if 'to' in params else now
+            offset = int(param('offset', '0'))
+            limit = int(param('limit', '100'))
+        except ValueError:
+            self.send_json({'error': 'invalid from/to/offset/limit'}, 400)
+            return
+        
+        try:
+            result = self.orchestrator.history.aggregate(
+                start, end,
+                bucket=param('bucket', 'day'),
+                group=param('group', 'app'),
+                offset=offset,
+                limit=limit,
+                extra=self.orchestrator.open_sessions(now)
+            )
+        except ValueError as e:
+            self.send_json({'error': str(e)}, 400)
+            return
+        self.send_json(result)
+    
+    def stats_payload(self) -> Dict:
         orch = self.orchestrator
         today_stats = orch.tracker.get_today_stats()
         
@@ -221,10 +517,41 @@ class APIHandler(SimpleHTTPRequestHandler):
         work_time = orch.tracker.get_category_time(orch.config.config.work_apps)
         entertainment_time = orch.tracker.get_category_time(orch.config.config.entertainment_apps)
         
-        self.send_json({
+        return {
             'apps': formatted[:10],
             'work_seconds': work_time,
             'entertainment_seconds': entertainment_time,
+        }
+    
+    def handle_export(self, method: str, params: Dict):
+        # Выгрузка истории: ?format=ndjson|csv&from=&to=
+        if method != 'GET':
+            self.send_json({'error': 'GET only'}, 405)
+            return
+        
+        def param(name: str, default: str) -> str:
+            return params.get(name, [default])[0]
+        
+        fmt = param('format', 'ndjson')
+        if fmt not in EXPORT_FORMATS:
+            self.send_json({'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}"}, 400)
+            return
+        try:
+            start = parse_time(param('from', '')) if 'from' in params else None
+            end = parse_time(param('to', '')) if 'to' in params else None
+        except ValueError:
+            self.send_json({'error': 'invalid from/to'}, 400)
+            return
+        
+        sessions = self.orchestrator.history.iter_file(start, end)
+        if fmt == 'csv':
+            lines, content_type = export_csv(sessions), 'text/csv; charset=utf-8'
+        else:
+            lines, content_type = export_ndjson(sessions), 'application/x-ndjson; charset=utf-8'
+        
+        self.send_chunked(content_type, chunks(lines), {
+            'Content-Disposition': f'attachment; filename="afo-sessions.{fmt}"',
+            'Cache-Control': 'no-store',
         })
     
     def handle_config(self, method: str, params: Dict):
@@ -232,55 +559,57 @@ class APIHandler(SimpleHTTPRequestHandler):
         orch = self.orchestrator
         
         if method == 'GET':
-            config = orch.config.config
+            self.send_json(self.config_payload())
+        else:
+            # PATCH - JSON merge-patch (RFC 7396); POST {секция: {поле: значение}} -
+            # тот же патч, только без null
+            self.patch_config(params)
+    
+    def patch_config(self, patch: Dict):
+        # Применить патч конфига и ответить: неверный патч не применяется
+        # вовсе - 422 со всеми ошибками. Сохранение и перепланирование -
+        # через подписки на изменения конфига
+        try:
+            changes = self.orchestrator.config.patch(patch)
+        except ValidationError as e:
             self.send_json({
-                'sound': {
-                    'enabled': config.sound.enabled,
-                    'volume': config.sound.volume,
-                    'preferred_sounds': config.sound.preferred_sounds,
-                },
-                'display': {
-                    'night_mode_enabled': config.display.night_mode_enabled,
-                    'night_mode_start': config.display.night_mode_start,
-                    'night_mode_end': config.display.night_mode_end,
-                    'color_temperature': config.display.color_temperature,
-                },
-                'notifications': {
-                    'filter_enabled': config.notifications.filter_enabled,
-                },
-                'breaks': {
-                    'enabled': config.breaks.enabled,
-                    'work_duration': config.breaks.work_duration_minutes,
-                    'break_duration': config.breaks.break_duration_minutes,
-                },
-                'blocked_sites': config.blocked_sites,
-            })
-        elif method == 'POST':
-            # Обновить конфигурацию
-            for section, values in params.items():
-                if isinstance(values, dict):
-                    orch.config.update(section, **values)
-                else:
-                    orch.config.update(section, value=values)
-            self.send_json({'success': True})
+                'error': 'Invalid config',
+                'errors': [error.to_dict() for error in e.errors],
+            }, 422)
+            return
+        self.send_json({'success': True, 'changed': [c.key for c in changes]})
+    
+    def config_payload(self) -> Dict:
+        config = self.orchestrator.config.config
+        return {
+            'sound': {
+                'enabled': config.sound.enabled,
+                'volume': config.sound.volume,
+                'preferred_sounds': config.sound.preferred_sounds,
+            },
+            'display': {
+                'night_mode_enabled': config.display.night_mode_enabled,
+                'night_mode_start': config.display.night_mode_start,
+                'night_mode_end': config.display.night_mode_end,
+                'color_temperature': config.display.color_temperature,
+            },
+            'notifications': {
+                'filter_enabled': config.notifications.filter_enabled,
+            },
+            'breaks': {
+                'enabled': config.breaks.enabled,
+                'work_duration': config.breaks.work_duration_minutes,
+                'break_duration': config.breaks.break_duration_minutes,
+            },
+            'blocked_sites': config.blocked_sites,
+        }
     
     def handle_sound(self, method: str, params: Dict):
         # Управление звуком
         orch = self.orchestrator
         
         if method == 'POST':
-            sound_name = params.get('sound', 'none')
-            volume = params.get('volume')
-            
-            try:
-                sound = AmbientSound(sound_name)
-                if volume is not None:
-                    orch.environment.sound.play(sound, float(volume))
-                else:
-                    orch.environment.sound.play(sound)
-                self.send_json({'success': True, 'sound': sound.value})
-            except Exception as e:
-                self.send_json({'error': str(e)}, 400)
+            self.run_command('sound', params)
         else:
             self.send_json({
                 'current': orch.environment.state.sound.value,
@@ -293,10 +622,7 @@ class APIHandler(SimpleHTTPRequestHandler):
         orch = self.orchestrator
         
         if method == 'POST':
-            auto = params.get('auto')
-            if auto is not None:
-                orch.environment.set_auto_adjust(auto)
-            self.send_json({'success': True})
+            self.run_command('mode', params)
         else:
             self.send_json({
                 'auto_adjust': orch.environment._auto_adjust
@@ -307,8 +633,7 @@ class APIHandler(SimpleHTTPRequestHandler):
         orch = self.orchestrator
         
         if method == 'POST':
-            orch.start_break()
-            self.send_json({'success': True})
+            self.run_command('break', params)
         else:
             self.send_json({
                 'break_active': False,
@@ -319,111 +644,113 @@ class APIHandler(SimpleHTTPRequestHandler):
         # Управление автозагрузкой
         if method == 'POST':
             enabled = params.get('enabled', False)
-            success = autostart.set_autostart(enabled)
+            backend = self.orchestrator.backend
+            success = backend.set_autostart(enabled)
             self.send_json({
                 'success': success,
-                'enabled': autostart.is_autostart_enabled()
+                'enabled': backend.autostart_enabled()
             })
         else:
-            self.send_json({
-                'enabled': autostart.is_autostart_enabled(),
-                'available': bool(autostart.get_exe_path())
-            })
+            self.send_json(self.autostart_payload())
+    
+    def autostart_payload(self) -> Dict:
+        backend = self.orchestrator.backend
+        return {
+            'enabled': backend.autostart_enabled(),
+            'available': backend.autostart_available()
+        }
     
     def handle_reminders(self, method: str, params: Dict):
         # получить/обновить настройки напоминаний
         orch = self.orchestrator
         
         if method == 'GET':
-            # возвращаем статус + настройки
-            status = orch.reminders.get_status()
-            config = orch.config.config.reminders
-            
-            self.send_json({
-                **status,
-                'pause_when_idle': config.pause_when_idle
-            })
+            self.send_json(self.reminders_payload())
         else:
             # POST - обновляем настройки
             # можно передать enabled (общий флаг) или настройки конкретного напоминания
-            
-            if 'enabled' in params:
-                orch.config.config.reminders.enabled = params['enabled']
-            
-            if 'pause_when_idle' in params:
-                orch.config.config.reminders.pause_when_idle = params['pause_when_idle']
+            patch = {key: params[key] for key in ('enabled', 'pause_when_idle') if key in params}
+            settings = orch.config.config.reminders
+            custom = [asdict(r) for r in settings.custom]
             
             # обновление конкретного напоминания по id
             if 'reminder_id' in params:
                 rid = params['reminder_id']
-                settings = orch.config.config.reminders
+                fields = {field: params[key] for key, field in REMINDER_FIELDS.items() if key in params}
                 
-                # ищем напоминание
-                target = None
-                if settings.water and settings.water.id == rid:
-                    target = settings.water
-                elif settings.stretch and settings.stretch.id == rid:
-                    target = settings.stretch
-                elif settings.eyes and settings.eyes.id == rid:
-                    target = settings.eyes
+                # ищем напоминание: встроенное - своё поле секции, кастомное - элемент списка
+                builtin = next((name for name in ('water', 'stretch', 'eyes')
+                                if getattr(settings, name) and getattr(settings, name).id == rid), None)
+                if builtin:
+                    patch[builtin] = fields
                 else:
-                    for r in settings.custom:
-                        if r.id == rid:
-                            target = r
+                    for item in custom:
+                        if item['id'] == rid:
+                            item.update(fields)
+                            patch['custom'] = custom
                             break
-                
-                if target:
-                    if 'reminder_enabled' in params:
-                        target.enabled = params['reminder_enabled']
-                    if 'interval_minutes' in params:
-                        target.interval_minutes = params['interval_minutes']
-                    if 'message' in params:
-                        target.message = params['message']
             
             # добавление кастомного напоминания
             if 'add_custom' in params:
-                custom = params['add_custom']
-                orch.reminders.add_custom_reminder(
-                    name=custom.get('name', 'Напоминание'),
-                    interval_minutes=custom.get('interval_minutes', 30),
-                    message=custom.get('message', ''),
-                    icon=custom.get('icon', 'bell')
-                )
+                new = params['add_custom']
+                if not isinstance(new, dict):
+                    self.send_json({'error': 'add_custom must be an object'}, 400)
+                    return
+                custom.append({
+                    'id': orch.reminders.new_custom_id(),
+                    'name': new.get('name', 'Напоминание'),
+                    'enabled': True,
+                    'interval_minutes': new.get('interval_minutes', 30),
+                    'message': new.get('message', ''),
+                    'icon': new.get('icon', 'bell'),
+                })
+                patch['custom'] = custom
             
             # удаление кастомного
             if 'remove_custom' in params:
-                orch.reminders.remove_custom_reminder(params['remove_custom'])
+                rid = params['remove_custom']
+                patch['custom'] = custom = [item for item in custom if item['id'] != rid]
             
-            # сохраняем и обновляем менеджер
-            orch.config.save()
-            orch.reminders.update_settings(orch.config.config.reminders)
-            
-            self.send_json({'success': True})
+            self.patch_config({'reminders': patch})
+    
+    def reminders_payload(self) -> Dict:
+        # возвращаем статус + настройки
+        orch = self.orchestrator
+        status = orch.reminders.get_status()
+        config = orch.config.config.reminders
+        return {
+            **status,
+            'pause_when_idle': config.pause_when_idle
+        }
     
     def handle_reminder_snooze(self, method: str, params: Dict):
         # отложить напоминание
         if method == 'POST':
-            reminder_id = params.get('id')
-            minutes = params.get('minutes', 10)
-            
-            if reminder_id:
-                self.orchestrator.reminders.snooze(reminder_id, minutes)
-                self.send_json({'success': True})
-            else:
-                self.send_json({'error': 'id required'}, 400)
+            self.run_command('reminders.snooze', params)
         else:
             self.send_json({'error': 'POST only'}, 405)
     
     def handle_reminder_dismiss(self, method: str, params: Dict):
         # сбросить напоминание (типа выполнил)
         if method == 'POST':
-            reminder_id = params.get('id')
-            
-            if reminder_id:
-                self.orchestrator.reminders.dismiss(reminder_id)
-                self.send_json({'success': True})
-            else:
-                self.send_json({'error': 'id required'}, 400)
+            self.run_command('reminders.dismiss', params)
+        else:
+            self.send_json({'error': 'POST only'}, 405)
+    
+    def handle_notifications(self, method: str, params: Dict):
+        # GET ?since=<seq> - уведомления новее курсора
+        try:
+            cursor = int(params.get('since', ['0'])[0])
+        except ValueError:
+            self.send_json({'error': 'invalid since'}, 400)
+            return
+        items, seq = self.orchestrator.notifications.since(cursor)
+        self.send_json({'items': items, 'seq': seq})
+    
+    def handle_notifications_ack(self, method: str, params: Dict):
+        # подтвердить уведомление: {"seq": N} - больше не показывается ни одной вкладке
+        if method == 'POST':
+            self.run_command('notifications.ack', params)
         else:
             self.send_json({'error': 'POST only'}, 405)
     
@@ -431,101 +758,61 @@ class APIHandler(SimpleHTTPRequestHandler):
         orch = self.orchestrator
         
         if method == 'GET':
-            p = orch.config.config.procrastination
-            self.send_json({
-                'enabled': p.enabled,
-                'work_hours_start': p.work_hours_start,
-                'work_hours_end': p.work_hours_end,
-                'warning_threshold_minutes': p.warning_threshold_minutes,
-                'cooldown_minutes': p.cooldown_minutes
-            })
+            self.send_json(self.procrastination_payload())
         else:
-            p = orch.config.config.procrastination
-            
-            if 'enabled' in params:
-                p.enabled = params['enabled']
-            if 'work_hours_start' in params:
-                p.work_hours_start = params['work_hours_start']
-            if 'work_hours_end' in params:
-                p.work_hours_end = params['work_hours_end']
-            if 'warning_threshold_minutes' in params:
-                p.warning_threshold_minutes = params['warning_threshold_minutes']
-            if 'cooldown_minutes' in params:
-                p.cooldown_minutes = params['cooldown_minutes']
-            
-            orch.config.save()
-            
-            orch.analyzer.set_procrastination_settings(
-                enabled=p.enabled,
-                work_start=p.work_hours_start,
-                work_end=p.work_hours_end,
-                threshold_minutes=p.warning_threshold_minutes,
-                cooldown_minutes=p.cooldown_minutes
-            )
-            
-            self.send_json({'success': True})
+            # анализатор обновится через подписку на изменения конфига
+            self.patch_config({'procrastination': {
+                key: params[key] for key in PROCRASTINATION_FIELDS if key in params
+            }})
+    
+    def procrastination_payload(self) -> Dict:
+        p = self.orchestrator.config.config.procrastination
+        return {
+            'enabled': p.enabled,
+            'work_hours_start': p.work_hours_start,
+            'work_hours_end': p.work_hours_end,
+            'warning_threshold_minutes': p.warning_threshold_minutes,
+            'cooldown_minutes': p.cooldown_minutes
+        }
     
     def handle_pomodoro(self, method: str, params: Dict):
         orch = self.orchestrator
         
         if method == 'GET':
-            status = orch.pomodoro.get_status()
-            status['history'] = orch.pomodoro.get_history(7)
-            self.send_json(status)
+            self.send_json(self.pomodoro_payload())
         else:
-            # обновить настройки
-            p = orch.config.config.pomodoro
-            
-            if 'work_minutes' in params:
-                p.work_minutes = params['work_minutes']
-            if 'short_break_minutes' in params:
-                p.short_break_minutes = params['short_break_minutes']
-            if 'long_break_minutes' in params:
-                p.long_break_minutes = params['long_break_minutes']
-            if 'pomodoros_until_long_break' in params:
-                p.pomodoros_until_long_break = params['pomodoros_until_long_break']
-            if 'auto_start_breaks' in params:
-                p.auto_start_breaks = params['auto_start_breaks']
-            if 'auto_start_work' in params:
-                p.auto_start_work = params['auto_start_work']
-            
-            orch.config.save()
-            orch.pomodoro.update_settings(p)
-            
-            self.send_json({'success': True})
+            # обновить настройки; таймер подхватит их через подписку
+            self.patch_config({'pomodoro': {
+                key: params[key] for key in POMODORO_FIELDS if key in params
+            }})
+    
+    def pomodoro_payload(self) -> Dict:
+        pomodoro = self.orchestrator.pomodoro
+        status = pomodoro.get_status()
+        status['history'] = pomodoro.get_history(7)
+        return status
     
     def handle_pomodoro_start(self, method: str, params: Dict):
         if method == 'POST':
-            phase = params.get('phase')
-            if phase:
-                phase = PomodoroPhase(phase)
-            self.orchestrator.pomodoro.start(phase)
-            self.send_json({'success': True})
+            self.run_command('pomodoro.start', params)
         else:
             self.send_json({'error': 'POST only'}, 405)
     
     def handle_pomodoro_pause(self, method: str, params: Dict):
         if method == 'POST':
-            pom = self.orchestrator.pomodoro
-            if pom.state.running:
-                pom.pause()
-            else:
-                pom.resume()
-            self.send_json({'success': True, 'running': pom.state.running})
+            self.run_command('pomodoro.pause', params)
         else:
             self.send_json({'error': 'POST only'}, 405)
     
     def handle_pomodoro_stop(self, method: str, params: Dict):
         if method == 'POST':
-            self.orchestrator.pomodoro.stop()
-            self.send_json({'success': True})
+            self.run_command('pomodoro.stop', params)
         else:
             self.send_json({'error': 'POST only'}, 405)
     
     def handle_pomodoro_skip(self, method: str, params: Dict):
         if method == 'POST':
-            self.orchestrator.pomodoro.skip()
-            self.send_json({'success': True})
+            self.run_command('pomodoro.skip', params)
         else:
             self.send_json({'error': 'POST only'}, 405)
     
@@ -533,10 +820,7 @@ class APIHandler(SimpleHTTPRequestHandler):
         orch = self.orchestrator
         
         if method == 'GET':
-            self.send_json({
-                'available': orch.hotkeys.is_available(),
-                'hotkeys': orch.hotkeys.get_hotkeys()
-            })
+            self.send_json(self.hotkeys_payload())
         else:
             # обновить горячую клавишу
             action = params.get('action')
@@ -547,102 +831,673 @@ class APIHandler(SimpleHTTPRequestHandler):
                 self.send_json({'success': True})
             else:
                 self.send_json({'error': 'action and hotkey required'}, 400)
+    
+    def hotkeys_payload(self) -> Dict:
+        hotkeys = self.orchestrator.hotkeys
+        return {
+            'available': hotkeys.is_available(),
+            'hotkeys': hotkeys.get_hotkeys()
+        }
+    
+    # Команды UI - общие для POST роутов и WebSocket канала
+    
+    def run_command(self, name: str, params: Dict):
+        # выполнить команду и ответить на HTTP запрос
+        try:
+            result = self.commands[name](self, params)
+        except CommandError as e:
+            self.send_json({'error': str(e)}, 400)
+            return
+        self.send_json({'success': True, **result})
+    
+    def cmd_sound(self, params: Dict) -> Dict:
+        orch = self.orchestrator
+        volume = params.get('volume')
+        try:
+            sound = AmbientSound(params.get('sound', 'none'))
+            if volume is not None:
+                orch.environment.sound.play(sound, float(volume))
+            else:
+                orch.environment.sound.play(sound)
+        except Exception as e:
+            raise CommandError(str(e))
+        orch.publish_environment()
+        return {'sound': sound.value}
+    
+    def cmd_mode(self, params: Dict) -> Dict:
+        orch = self.orchestrator
+        auto = params.get('auto')
+        if auto is not None:
+            orch.environment.set_auto_adjust(auto)
+        orch.publish_environment()
+        return {}
+    
+    def cmd_break(self, params: Dict) -> Dict:
+        self.orchestrator.start_break()
+        return {}
+    
+    def cmd_reminder_snooze(self, params: Dict) -> Dict:
+        reminder_id = params.get('id')
+        if not reminder_id:
+            raise CommandError('id required')
+        self.orchestrator.reminders.snooze(reminder_id, params.get('minutes', 10))
+        self.orchestrator.ack_notification(key=reminder_id)
+        return {}
+    
+    def cmd_reminder_dismiss(self, params: Dict) -> Dict:
+        reminder_id = params.get('id')
+        if not reminder_id:
+            raise CommandError('id required')
+        self.orchestrator.reminders.dismiss(reminder_id)
+        self.orchestrator.ack_notification(key=reminder_id)
+        return {}
+    
+    def cmd_notifications_ack(self, params: Dict) -> Dict:
+        seq = params.get('seq')
+        if not isinstance(seq, int) or isinstance(seq, bool):
+            raise CommandError('seq (integer) required')
+        return {'acked': self.orchestrator.ack_notification(seq=seq)}
+    
+    def cmd_pomodoro_start(self, params: Dict) -> Dict:
+        phase = params.get('phase')
+        if phase:
+            try:
+                phase = PomodoroPhase(phase)
+            except ValueError as e:
+                raise CommandError(str(e))
+        self.orchestrator.pomodoro.start(phase)
+        return {}
+    
+    def cmd_pomodoro_pause(self, params: Dict) -> Dict:
+        pom = self.orchestrator.pomodoro
+        if pom.state.running:
+            pom.pause()
+        else:
+            pom.resume()
+        return {'running': pom.state.running}
+    
+    def cmd_pomodoro_stop(self, params: Dict) -> Dict:
+        self.orchestrator.pomodoro.stop()
+        return {}
+    
+    def cmd_pomodoro_skip(self, params: Dict) -> Dict:
+        self.orchestrator.pomodoro.skip()
+        return {}
+    
+    commands = {
+        'sound': cmd_sound,
+        'mode': cmd_mode,
+        'break': cmd_break,
+        'reminders.snooze': cmd_reminder_snooze,
+        'reminders.dismiss': cmd_reminder_dismiss,
+        'notifications.ack': cmd_notifications_ack,
+        'pomodoro.start': cmd_pomodoro_start,
+        'pomodoro.pause': cmd_pomodoro_pause,
+        'pomodoro.stop': cmd_pomodoro_stop,
+        'pomodoro.skip': cmd_pomodoro_skip,
+    }
+    
+    def handle_ws(self, method: str, params: Dict):
+        # WebSocket канал команд: {"id", "cmd", "params"} ->
+        # {"type": "ack", "id", "ok", "result" | "error", "changes": [...]}
+        # changes - изменения состояния, которые успели случиться пока выполнялась команда
+        key = self.headers.get('Sec-WebSocket-Key')
+        upgrade = (self.headers.get('Upgrade') or '').lower()
+        if upgrade != 'websocket' or not key or self.headers.get('Sec-WebSocket-Version') != '13':
+            self.send_json({'error': 'websocket upgrade required'}, 426)
+            return
+        
+        # браузер пускает WebSocket с любого сайта - принимаем только свои страницы
+        origin = self.headers.get('Origin')
+        if origin and urlparse(origin).hostname not in ('localhost', '127.0.0.1'):
+            self.send_json({'error': 'forbidden origin'}, 403)
+            return
+        
+        if not self.begin_stream():
+            return
+        try:
+            self._serve_websocket(key)
+        finally:
+            self.server.release_stream()
+    
+    def _serve_websocket(self, key: str):
+        self.close_connection = True
+        self.send_response(101)
+        self.send_header('Upgrade', 'websocket')
+        self.send_header('Connection', 'Upgrade')
+        self.send_header('Sec-WebSocket-Accept', websocket.accept_key(key))
+        self.end_headers()
+        
+        # соединение живёт пока открыта вкладка: ждём без таймаута чтения,
+        # но с ping раз в WS_PING_INTERVAL, и пока оркестратор работает
+        self.wfile.flush()
+        reader = websocket.SocketReader(self.connection, self._take_buffered())
+        send = self.wfile.write
+        hub = self.orchestrator.events
+        self.server.track_websocket(self.connection)
+        try:
+            code = self._websocket_loop(reader, send, hub)
+            if code is not None:
+                send(websocket.encode_frame(websocket.OP_CLOSE, struct.pack('!H', code)))
+        except OSError:
+            pass
+        finally:
+            self.server.untrack_websocket(self.connection)
+    
+    def _websocket_loop(self, reader: websocket.SocketReader, send: Callable, hub: EventHub) -> Optional[int]:
+        # сообщения до закрытия; -> код для кадра close, None - соединение уже оборвано
+        try:
+            missed = 0
+            while self.orchestrator.running:
+                if not reader.wait(self.WS_PING_INTERVAL):
+                    if missed >= self.WS_MISSED_PINGS:
+                        break
+                    send(websocket.encode_frame(websocket.OP_PING, b''))
+                    missed += 1
+                    continue
+                missed = 0
+                
+                message = websocket.read_message(reader, send)
+                if message is None:
+                    break
+                
+                opcode, payload = message
+                if opcode != websocket.OP_TEXT:
+                    continue
+                
+                body = json.dumps(self._ws_reply(payload, hub), ensure_ascii=False).encode('utf-8')
+                send(websocket.encode_frame(websocket.OP_TEXT, body))
+        except websocket.WebSocketError as e:
+            # немаскированный кадр, мусор, слишком большое сообщение
+            return e.code
+        except (ConnectionError, TimeoutError, OSError):
+            return None
+        return websocket.CLOSE_NORMAL
+    
+    def _take_buffered(self) -> bytes:
+        # кадры, которые клиент прислал сразу за запросом, уже в буфере rfile -
+        # забираем их без блокировки, дальше читаем из сокета сами
+        self.connection.setblocking(False)
+        try:
+            return self.rfile.read1(websocket.MAX_MESSAGE_SIZE) or b''
+        except (BlockingIOError, OSError):
+            return b''
+        finally:
+            # внутри кадра клиент не должен застревать
+            self.connection.settimeout(self.timeout)
+    
+    def _ws_reply(self, payload: bytes, hub: EventHub) -> Dict:
+        # выполнить одну команду; любая ошибка - ответ ok=false, соединение живёт
+        reply = {'type': 'ack', 'id': None, 'ok': False}
+        try:
+            request = json.loads(payload.decode('utf-8'))
+            reply['id'] = request.get('id')
+            command = self.commands.get(request.get('cmd'))
+            if command is None:
+                raise CommandError(f"unknown command: {request.get('cmd')}")
+            
+            cursor = hub.last_id
+            reply['result'] = command(self, request.get('params') or {})
+            reply['ok'] = True
+            reply['changes'], _ = hub.changes_since(cursor)
+        except CommandError as e:
+            reply['error'] = str(e)
+        except (ValueError, TypeError, KeyError, AttributeError):
+            reply['error'] = 'bad request'
+        except Exception as e:
+            print(f"WebSocket command error: {e}")
+            reply['error'] = 'internal error'
+        return reply
+    
+    def handle_metrics(self, method: str, params: Dict):
+        # метрики в текстовом формате Prometheus
+        body = metrics.render().encode('utf-8')
+        self.send_bytes(body, 'text/plain; version=0.0.4; charset=utf-8',
+                        {'Cache-Control': 'no-store'})
+    
+    def handle_ready(self, method: str, params: Dict):
+        # готовность после запуска: 503 пока не прошли все этапы
+        payload = self.orchestrator.ready_payload()
+        self.send_json(payload, 200 if payload['ready'] else 503)
+    
+    def handle_dashboard(self, method: str, params: Dict):
+        # всё для первой отрисовки UI одним запросом: ?fields=status,pomodoro,...
+        fields = params.get('fields', [''])[0]
+        names = [f for f in fields.split(',') if f] if fields else list(self.dashboard_sections)
+        
+        unknown = [n for n in names if n not in self.dashboard_sections]
+        if unknown:
+            self.send_json({'error': f"unknown fields: {', '.join(unknown)}"}, 400)
+            return
+        
+        self.send_json({name: self.dashboard_sections[name](self) for name in names})
+    
+    def status_section(self) -> Dict:
+        # без pending_reminders - они придут по SSE или в /api/status?since=
+        return self.orchestrator.status_payload()
+    
+    # секции /api/dashboard - те же данные что у отдельных GET роутов
+    dashboard_sections = {
+        'status': status_section,
+        'stats': stats_payload,
+        'config': config_payload,
+        'reminders': reminders_payload,
+        'procrastination': procrastination_payload,
+        'pomodoro': pomodoro_payload,
+        'autostart': autostart_payload,
+        'hotkeys': hotkeys_payload,
+    }
+    
+    # таблица роутов - одна на класс, а не на каждый запрос
+    routes = {
+        '/api/status': handle_status,
+        '/api/events': handle_events,
+        '/api/dashboard': handle_dashboard,
+        '/api/ws': handle_ws,
+        '/api/metrics': handle_metrics,
+        '/api/ready': handle_ready,
+        '/api/stats': handle_stats,
+        '/api/export': handle_export,
+        '/api/config': handle_config,
+        '/api/sound': handle_sound,
+        '/api/mode': handle_mode,
+        '/api/break': handle_break,
+        '/api/autostart': handle_autostart,
+        '/api/reminders': handle_reminders,
+        '/api/reminders/snooze': handle_reminder_snooze,
+        '/api/reminders/dismiss': handle_reminder_dismiss,
+        '/api/notifications': handle_notifications,
+        '/api/notifications/ack': handle_notifications_ack,
+        '/api/procrastination': handle_procrastination,
+        '/api/pomodoro': handle_pomodoro,
+        '/api/pomodoro/start': handle_pomodoro_start,
+        '/api/pomodoro/pause': handle_pomodoro_pause,
+        '/api/pomodoro/stop': handle_pomodoro_stop,
+        '/api/pomodoro/skip': handle_pomodoro_skip,
+        '/api/hotkeys': handle_hotkeys,
+    }
+
+
+class CommandError(Exception):
+    # неверные параметры команды -> 400 / ok: false
+    pass
+
+
+class JsonSnapshot:
+    # JSON ответ, сериализованный один раз на версию состояния
+    
+    def __init__(self, version: Tuple, data: Dict):
+        self.version = version
+        self.body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.gzipped = gzip.compress(self.body, compresslevel=5) if len(self.body) >= GZIP_MIN_SIZE else None
+        self.etag = f'"{BOOT_ID}-' + '-'.join(str(v) for v in version) + '"'
+
+
+class ThreadedHTTPServer(ThreadingMixIn, HTTPServer):
+    # Поток на соединение. Ограничения раздельные:
+    #   max_workers     - запросов в обработке одновременно (слот берёт
+    #                     APIHandler.handle_one_request на время запроса);
+    #   max_streams     - открытых SSE и WebSocket, слот запросов они не держат;
+    #   max_connections - соединений всего, включая ждущие keep-alive.
+    # Так вкладки с SSE, WS и пулом keep-alive не забивают пул запросов,
+    # и accept не встаёт в ожидание
+    
+    daemon_threads = True
+    block_on_close = False
+    request_queue_size = 64
+    max_workers = 32
+    max_streams = 64
+    max_connections = 256
+    # сколько запрос ждёт слот, прежде чем получить 503
+    slot_timeout = 5.0
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._slots = threading.BoundedSemaphore(self.max_workers)
+        self._streams = threading.BoundedSemaphore(self.max_streams)
+        self._connections = threading.BoundedSemaphore(self.max_connections)
+        # открытые WebSocket - закрыть при остановке, не дожидаясь ping
+        self._websockets = set()
+        self._websockets_lock = threading.Lock()
+    
+    def track_websocket(self, sock: socket.socket):
+        with self._websockets_lock:
+            self._websockets.add(sock)
+    
+    def untrack_websocket(self, sock: socket.socket):
+        with self._websockets_lock:
+            self._websockets.discard(sock)
+    
+    def close_websockets(self):
+        with self._websockets_lock:
+            sockets = list(self._websockets)
+        for sock in sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+    
+    def acquire_slot(self) -> bool:
+        return self._slots.acquire(timeout=self.slot_timeout)
+    
+    def release_slot(self):
+        self._slots.release()
+    
+    def acquire_stream(self) -> bool:
+        return self._streams.acquire(blocking=False)
+    
+    def release_stream(self):
+        self._streams.release()
+    
+    def process_request(self, request, client_address):
+        # соединений слишком много - закрываем сразу, accept не ждёт
+        if not self._connections.acquire(blocking=False):
+            self.shutdown_request(request)
+            return
+        try:
+            super().process_request(request, client_address)
+        except Exception:
+            self._connections.release()
+            raise
+    
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            self._connections.release()
+    
+    def handle_error(self, request, client_address):
+        # вкладку закрыли посреди ответа - это не ошибка
+        exc = sys.exc_info()[1]
+        if isinstance(exc, (ConnectionError, TimeoutError)):
+            return
+        super().handle_error(request, client_address)
 
 
 class WebServer:
     # Веб-сервер
     
+    # serve_forever проверяет флаг остановки раз в poll_interval. Будить его
+    # каждые полсекунды (по умолчанию) незачем: stop() сам стучится в сокет
+    POLL_INTERVAL = 60.0
+    
     def __init__(self, orchestrator: 'Orchestrator', port: int = 8420):
         self.orchestrator = orchestrator
         self.port = port
-        self.server: Optional[HTTPServer] = None
+        self.server: Optional[ThreadedHTTPServer] = None
         self._thread: Optional[threading.Thread] = None
     
     def start(self):
         # Запустить сервер
         APIHandler.orchestrator = self.orchestrator
-        APIHandler.static_dir = Path(__file__).parent / 'web'
+        APIHandler.static_dir = (Path(__file__).parent / 'web').resolve()
+        
+        # статика читается и сжимается один раз при старте
+        APIHandler.static_cache = StaticCache()
+        APIHandler.static_cache.preload(APIHandler.static_dir)
         
-        self.server = HTTPServer(('127.0.0.1', self.port), APIHandler)
-        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.server = ThreadedHTTPServer(('127.0.0.1', self.port), APIHandler)
+        self._thread = threading.Thread(target=self.server.serve_forever, args=(self.POLL_INTERVAL,),
+                                        name='http', daemon=True)
         self._thread.start()
     
     def stop(self):
         # Остановить сервер
-        if self.server:
-            self.server.shutdown()
+        if not self.server:
+            return
+        stopper = threading.Thread(target=self.server.shutdown, daemon=True)
+        stopper.start()
+        # пустое соединение будит select в serve_forever, тот видит флаг остановки
+        for _ in range(20):
+            try:
+                socket.create_connection(('127.0.0.1', self.port), timeout=1).close()
+            except OSError:
+                pass
+            stopper.join(timeout=0.1)
+            if not stopper.is_alive():
+                break
+        self.server.close_websockets()
     
     def open_browser(self):
         # Открыть браузер
+        import webbrowser
         webbrowser.open(f'http://localhost:{self.port}')
 
 
 class Orchestrator:
     # Главный оркестратор
     
-    def __init__(self):
+    # раз в сколько секунд анализировать режим работы
+    ANALYSIS_INTERVAL = 5.0
+    
+    def __init__(self, backend: Backend = None, clock: Clock = None):
         self.config = ConfigManager()
+        
+        # всё, что трогает ОС: Windows, headless или симуляция (bench)
+        self.backend = backend or create_backend()
+        
+        # общий планировщик: таймеры и периодические задачи в одном потоке,
+        # блокирующие вызовы ОС - в его ограниченном пуле. Его часы - единое
+        # время всех подсистем; с VirtualClock потока нет, время двигает
+        # scheduler.run_until (симуляция недели за секунды)
+        self.scheduler = Scheduler(clock)
+        self.clock = self.scheduler.clock
+        
         self.tracker = ActivityTracker(
-            idle_threshold=self.config.config.tracking.idle_threshold_seconds
+            idle_threshold=self.config.config.tracking.idle_threshold_seconds,
+            scheduler=self.scheduler,
+            backend=self.backend
         )
         self.analyzer = StateAnalyzer(
             work_apps=self.config.config.work_apps,
-            entertainment_apps=self.config.config.entertainment_apps
+            entertainment_apps=self.config.config.entertainment_apps,
+            clock=self.clock
         )
-        self.environment = EnvironmentController(self.config.config)
+        self.environment = EnvironmentController(self.config.config, self.backend)
         self.server = WebServer(self)
         
-        # напоминалки - проверяем idle через трекер
+        # изменения состояния для SSE (/api/events)
+        self.events = EventHub()
+        self.tracker.add_listener(self._on_activity)
+        
+        # напоминалки - таймеры в общем планировщике, idle сообщает _on_activity,
+        # состояние переживает перезапуск
         self.reminders = ReminderManager(
             settings=self.config.config.reminders,
-            is_idle_callback=lambda: self.tracker.state.is_idle
+            scheduler=self.scheduler,
+            store=ReminderStore(get_app_data_dir())
         )
         
-        # очередь напоминаний для UI (SSE можно будет потом прикрутить)
-        self._pending_reminders = []
+        # история сессий для /api/stats по диапазону
+        self.history = SessionStore(get_app_data_dir() / 'sessions.jsonl')
+        self.tracker.add_session_listener(self._on_session)
+        
+        # уведомления для UI: поллинг читает их из /api/status по курсору,
+        # SSE клиенты получают событием reminder
+        self.notifications = NotificationQueue(clock=self.clock)
         self.reminders.add_listener(self._on_reminder)
         
         # настройки прокрастинации
-        p = self.config.config.procrastination
-        self.analyzer.set_procrastination_settings(
-            enabled=p.enabled,
-            work_start=p.work_hours_start,
-            work_end=p.work_hours_end,
-            threshold_minutes=p.warning_threshold_minutes,
-            cooldown_minutes=p.cooldown_minutes
-        )
+        self._apply_procrastination()
         self.analyzer.set_warning_callback(self._on_procrastination_warning)
         
         # pomodoro таймер
-        self.pomodoro = PomodoroTimer(self.config.config.pomodoro)
+        self.pomodoro = PomodoroTimer(self.config.config.pomodoro, scheduler=self.scheduler,
+                                      store=PomodoroStore(get_app_data_dir()))
         self.pomodoro.set_callbacks(
             on_phase_complete=self._on_pomodoro_phase_complete,
             on_pomodoro_complete=self._on_pomodoro_complete
         )
+        self.pomodoro.add_listener(self._on_pomodoro_change)
         
         # горячие клавиши
-        self.hotkeys = HotkeyManager()
+        self.hotkeys = HotkeyManager(self.backend)
         self.hotkeys.set_callback('toggle_sound', self._hotkey_toggle_sound)
         self.hotkeys.set_callback('start_break', self._hotkey_start_break)
         self.hotkeys.set_callback('toggle_pomodoro', self._hotkey_toggle_pomodoro)
         self.hotkeys.set_callback('skip_pomodoro', self._hotkey_skip_pomodoro)
         
+        # подсистемы применяют только изменившиеся настройки
+        self.config.subscribe(self.reminders.apply_changes, 'reminders')
+        self.config.subscribe(self._apply_app_lists, 'work_apps', 'entertainment_apps')
+        self.config.subscribe(self._apply_tracking, 'tracking')
+        self.config.subscribe(self._apply_procrastination, 'procrastination')
+        self.config.subscribe(self._apply_pomodoro, 'pomodoro')
+        
         self.running = False
         self._last_analysis: Optional[AnalysisResult] = None
-        self._analysis_thread: Optional[threading.Thread] = None
+        self._status_snapshot: Optional[JsonSnapshot] = None
+        self._analysis_task: Optional[PeriodicTask] = None
+        
+        # этапы запуска: имя -> мс от начала запуска процесса
+        self._stages: Dict[str, float] = {}
+        self._ready = threading.Event()
+        self._startup_thread: Optional[threading.Thread] = None
+    
+    def activity_payload(self) -> Dict:
+        # idle_seconds растёт каждую секунду - в снимке статуса с ETag он был бы
+        # устаревшим (304 до следующего изменения), а с ним в версии кэш бесполезен.
+        # Простой виден по is_idle и activity_level, они меняют версию
+        state = self.tracker.state
+        return {
+            'current_app': state.current_app,
+            'current_window': state.current_window,
+            'is_idle': state.is_idle,
+            'activity_level': state.activity_level,
+        }
+    
+    def analysis_payload(self) -> Optional[Dict]:
+        analysis = self._last_analysis
+        if not analysis:
+            return None
+        return {
+            'mode': analysis.mode.value,
+            'confidence': analysis.confidence,
+            'time_of_day': analysis.time_of_day.value,
+            'work_minutes': analysis.work_session_minutes,
+            'should_break': analysis.should_take_break,
+            'recommendations': analysis.recommendations,
+            'procrastination': {
+                'active': analysis.procrastination.active,
+                'entertainment_minutes': analysis.procrastination.entertainment_minutes,
+                'message': analysis.procrastination.message,
+            }
+        }
+    
+    def environment_payload(self) -> Dict:
+        state = self.environment.state
+        return {
+            'sound': state.sound.value,
+            'sound_volume': state.sound_volume,
+            'night_mode': state.night_mode_active,
+            'focus_mode': state.focus_mode,
+            'notifications_filtered': state.notifications_filtered,
+        }
+    
+    def _status_state(self) -> Tuple[Tuple, Dict]:
+        # статус из последних опубликованных значений - они же определяют версию
+        versions, (activity, analysis, environment) = self.events.latest_many(
+            'activity', 'analysis', 'environment')
+        status = {
+            'running': self.running,
+            'activity': activity or self.activity_payload(),
+            'analysis': analysis,
+            'environment': environment or self.environment_payload(),
+            'pending_reminders': [],
+        }
+        return (int(self.running),) + versions, status
+    
+    def status_payload(self) -> Dict:
+        return self._status_state()[1]
+    
+    def status_snapshot(self) -> JsonSnapshot:
+        # версия меняется только когда реально поменялось состояние,
+        # поэтому json.dumps зависит от частоты изменений, а не запросов
+        version = (int(self.running),) + self.events.versions('activity', 'analysis', 'environment')
+        snapshot = self._status_snapshot
+        if snapshot is None or snapshot.version != version:
+            version, status = self._status_state()
+            snapshot = JsonSnapshot(version, status)
+            self._status_snapshot = snapshot
+        return snapshot
+    
+    def publish_environment(self):
+        self.events.publish('environment', self.environment_payload())
+    
+    def _apply_app_lists(self, changes: List[ConfigChange] = None):
+        config = self.config.config
+        self.analyzer.set_app_lists(config.work_apps, config.entertainment_apps)
+    
+    def _apply_tracking(self, changes: List[ConfigChange]):
+        for change in changes:
+            if change.path == ('tracking', 'idle_threshold_seconds'):
+                self.tracker.idle_threshold = change.new
+    
+    def _apply_procrastination(self, changes: List[ConfigChange] = None):
+        p = self.config.config.procrastination
+        self.analyzer.set_procrastination_settings(
+            enabled=p.enabled,
+            work_start=p.work_hours_start,
+            work_end=p.work_hours_end,
+            threshold_minutes=p.warning_threshold_minutes,
+            cooldown_minutes=p.cooldown_minutes
+        )
+    
+    def _apply_pomodoro(self, changes: List[ConfigChange]):
+        self.pomodoro.update_settings(self.config.config.pomodoro)
+    
+    def _on_activity(self, state: ActivityState):
+        # трекер дёргает каждую секунду - в UI уходят только реальные изменения
+        self.reminders.set_idle(state.is_idle)
+        self.events.publish('activity', self.activity_payload())
+    
+    def _make_session(self, app: str, window: str, start: datetime, end: datetime) -> Session:
+        return Session(
+            start=round(start.timestamp(), 3),
+            end=round(end.timestamp(), 3),
+            app=app,
+            mode=self.analyzer.classify(app, window).value,
+            category=self.analyzer.categorize(app)
+        )
+    
+    def _on_session(self, app: str, window: str, start: datetime, end: datetime):
+        # трекер закрыл сессию - в историю
+        if end > start:
+            self.history.append(self._make_session(app, window, start, end))
+    
+    def open_sessions(self, now: float) -> List[Session]:
+        # текущая сессия, которая ещё не попала в файл
+        current = self.tracker.current_session()
+        if current is None:
+            return []
+        app, window, start = current
+        return [self._make_session(app, window, start, datetime.fromtimestamp(now))]
+    
+    def _on_pomodoro_change(self, timer: PomodoroTimer):
+        self.events.publish('pomodoro', timer.get_status())
+    
+    def _push_notification(self, item: Dict):
+        # дубль, пока прошлый не подтверждён, склеивается в очереди: в item будет count
+        item = self.notifications.push(item['id'], item)
+        self.events.publish('reminder', item, state=False)
+    
+    def ack_notification(self, seq: int = None, key: str = None) -> Optional[int]:
+        # остальные вкладки закрывают этот тост по событию notification_ack
+        acked = self.notifications.ack(seq=seq, key=key)
+        if acked is not None:
+            self.events.publish('notification_ack', {'seq': acked}, state=False)
+        return acked
     
     def _on_procrastination_warning(self, message: str, minutes: int):
-        self._pending_reminders.append({
+        self._push_notification({
             'id': 'procrastination',
             'name': 'Прокрастинация',
             'message': message,
             'icon': 'exclamation-triangle',
-            'timestamp': __import__('time').time(),
+            'timestamp': self.clock.time(),
             'type': 'procrastination',
             'entertainment_minutes': minutes
         })
-        if len(self._pending_reminders) > 5:
-            self._pending_reminders.pop(0)
     
     def _on_pomodoro_phase_complete(self, prev_phase: PomodoroPhase, next_phase: PomodoroPhase):
         phase_names = {
@@ -658,16 +1513,14 @@ class Orchestrator:
         
         msg = f"Время {phase_names.get(prev_phase, '')} закончилось. {next_names.get(next_phase, '')}"
         
-        self._pending_reminders.append({
+        self._push_notification({
             'id': 'pomodoro',
             'name': 'Pomodoro',
             'message': msg,
             'icon': 'clock',
-            'timestamp': __import__('time').time(),
+            'timestamp': self.clock.time(),
             'type': 'pomodoro'
         })
-        if len(self._pending_reminders) > 5:
-            self._pending_reminders.pop(0)
     
     def _on_pomodoro_complete(self, total_today: int):
         messages = [
@@ -680,22 +1533,20 @@ class Orchestrator:
     
     def _on_reminder(self, reminder):
         # колбэк когда пора показать напоминание
-        # пока просто складываем в очередь, UI будет поллить
-        self._pending_reminders.append({
+        self._push_notification({
             'id': reminder.id,
             'name': reminder.name,
             'message': reminder.message,
             'icon': reminder.icon,
-            'timestamp': __import__('time').time()
+            'timestamp': self.clock.time()
         })
-        # держим макс 5 штук в очереди
-        if len(self._pending_reminders) > 5:
-            self._pending_reminders.pop(0)
     
-    def _analysis_loop(self):
-        # Цикл анализа
-        while self.running:
-            try:
+    def _analyze(self):
+        # Один проход анализа (в пуле планировщика: гамма дисплея и прочие вызовы ОС)
+        if not self.running:
+            return
+        try:
+            with metrics.ANALYSIS_DURATION.time():
                 analysis = self.analyzer.analyze(
                     self.tracker.state,
                     self.config.config.breaks.work_duration_minutes
@@ -705,10 +1556,11 @@ class Orchestrator:
                 # Применить настройки окружения
                 self.environment.apply_for_mode(analysis)
                 
-            except Exception:
-                pass
+                self.events.publish('analysis', self.analysis_payload())
+                self.publish_environment()
             
-            threading.Event().wait(5)  # Анализ каждые 5 секунд
+        except Exception:
+            pass
     
     def start(self):
         """Запустить оркестратор"""
@@ -717,28 +1569,79 @@ class Orchestrator:
         
         self.running = True
         
-        # Запустить компоненты
-        self.tracker.start()
-        self.server.start()
-        self.reminders.start()
-        self.hotkeys.start()
+        # начальное состояние для первых подписчиков SSE
+        self.publish_environment()
+        self._on_pomodoro_change(self.pomodoro)
+        
+        # Сначала то, без чего UI пуст: сервер и трекер
+        self._run_stage('server', self.server.start)
+        self._run_stage('tracker', self.tracker.start)
         
-        # Запустить цикл анализа
-        self._analysis_thread = threading.Thread(target=self._analysis_loop, daemon=True)
-        self._analysis_thread.start()
+        # остальное - в фоне, сервер уже отвечает
+        self._startup_thread = threading.Thread(target=self._start_deferred, name='startup', daemon=True)
+        self._startup_thread.start()
+    
+    def _start_deferred(self):
+        # анализ дёргает дисплей (гамму), audio - импорт COM, hotkeys - хук клавиатуры
+        stages = [
+            ('reminders', self.reminders.start),
+            ('analysis', self._start_analysis),
+            ('audio', self.environment.sound.warm_up),
+            ('hotkeys', self.hotkeys.start),
+            ('config-watch', lambda: self.config.start_watching(self.scheduler)),
+        ]
+        for name, start in stages:
+            if not self.running:
+                return
+            try:
+                self._run_stage(name, start)
+            except Exception as e:
+                print(f"Startup stage {name} failed: {e}")
+        self._ready.set()
+    
+    def _run_stage(self, name: str, start: Callable):
+        with PROFILE.phase('init', name):
+            start()
+        self._stages[name] = round(PROFILE.elapsed() * 1000, 1)
+    
+    def _start_analysis(self):
+        # первый проход через секунду: у трекера уже есть данные, и фаза не
+        # совпадает с опросом config.json - пулу хватает одного потока
+        self._analysis_task = self.scheduler.every(self.ANALYSIS_INTERVAL, self._analyze,
+                                                   blocking=True, delay=1.0)
+    
+    def wait_ready(self, timeout: float = None) -> bool:
+        return self._ready.wait(timeout)
+    
+    def ready_payload(self) -> Dict:
+        return {
+            'ready': self._ready.is_set(),
+            'backend': self.backend.name,
+            'stages': dict(self._stages),
+        }
     
     def stop(self):
         # Остановить оркестратор
         self.running = False
+        self.events.close()
+        
+        # не останавливать то, что фоновый запуск ещё заводит
+        if self._startup_thread:
+            self._startup_thread.join(timeout=5)
         
         self.tracker.stop()
+        # анализ, который уже идёт, не должен вернуть гамму после reset()
+        if self._analysis_task:
+            self._analysis_task.cancel(wait=2)
         self.server.stop()
         self.reminders.stop()
         self.environment.reset()
+        self.environment.sound.close()
         self.hotkeys.stop()
-        
-        if self._analysis_thread:
-            self._analysis_thread.join(timeout=2)
+        self.scheduler.close()
+        self.pomodoro.close()
+        self.reminders.close()
+        self.config.close()
     
     def _hotkey_toggle_sound(self):
         if self.environment.state.sound == AmbientSound.NONE:
@@ -746,6 +1649,7 @@ class Orchestrator:
             self.environment.sound.play(AmbientSound.RAIN)
         else:
             self.environment.sound.stop()
+        self.publish_environment()
     
     def _hotkey_start_break(self):
         self.start_break()
@@ -770,3 +1674,4 @@ class Orchestrator:
             time_of_day = self.analyzer.get_time_of_day()
         
         self.environment.apply_for_mode(FakeAnalysis())
+        self.publish_environment()
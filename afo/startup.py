@@ -0,0 +1,81 @@
+# Запуск: ленивые импорты и замеры фаз
+#
+# AFO стартует вместе с Windows, поэтому тяжёлые модули (pywin32, psutil,
+# keyboard, COM) импортируются не при загрузке afo, а при первом
+# обращении через lazy_import. Время каждого такого импорта и каждой
+# фазы запуска пишется в PROFILE - `--profile-startup` печатает таблицу.
+
+import importlib
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from types import ModuleType
+from typing import Dict, List, NamedTuple, Optional
+
+
+class Phase(NamedTuple):
+    kind: str  # import / init
+    name: str
+    started: float  # секунды от начала запуска
+    seconds: float
+    thread: str
+
+
+class StartupProfile:
+    # Фазы запуска; пишется из разных потоков, append в list атомарен
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.phases: List[Phase] = []
+
+    @contextmanager
+    def phase(self, kind: str, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append(Phase(
+                kind, name, started - self.origin, time.perf_counter() - started,
+                threading.current_thread().name
+            ))
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.origin
+
+    def report(self) -> str:
+        lines = [f"{'phase':34} {'kind':6} {'start ms':>9} {'took ms':>9}  thread"]
+        for p in sorted(self.phases, key=lambda p: p.started):
+            lines.append(f"{p.name:34} {p.kind:6} {p.started * 1000:>9.1f} {p.seconds * 1000:>9.1f}  {p.thread}")
+        imports = sum(p.seconds for p in self.phases if p.kind == 'import')
+        lines.append(f"imports: {imports * 1000:.1f} ms total")
+        return '\n'.join(lines)
+
+
+PROFILE = StartupProfile()
+
+# уже загруженные и отсутствующие модули - второй вызов ничего не стоит
+_loaded: Dict[str, ModuleType] = {}
+_missing: Dict[str, bool] = {}
+_import_lock = threading.Lock()
+
+
+def lazy_import(name: str) -> Optional[ModuleType]:
+    # Модуль или None, если не установлен. Первый импорт замеряется
+    module = _loaded.get(name)
+    if module is not None or name in _missing:
+        return module
+    with _import_lock:
+        if name in _loaded or name in _missing:
+            return _loaded.get(name)
+        # импортирован раньше кем-то другим - не считаем как фазу
+        module = sys.modules.get(name)
+        if module is None:
+            with PROFILE.phase('import', name):
+                try:
+                    module = importlib.import_module(name)
+                except ImportError:
+                    _missing[name] = True
+                    return None
+        _loaded[name] = module
+        return module
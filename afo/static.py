@@ -0,0 +1,205 @@
+# Кэш статики в памяти
+#
+# Файлы интерфейса читаются с диска один раз (и заново - только если
+# поменялся mtime/размер), сжатые варианты готовятся заранее, а
+# повторные загрузки отвечают 304 по ETag / Last-Modified.
+
+import gzip
+import hashlib
+import os
+import threading
+from dataclasses import dataclass, field
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+
+CONTENT_TYPES = {
+    '.html': 'text/html; charset=utf-8',
+    '.css': 'text/css; charset=utf-8',
+    '.js': 'application/javascript; charset=utf-8',
+    '.json': 'application/json; charset=utf-8',
+    '.png': 'image/png',
+    '.svg': 'image/svg+xml; charset=utf-8',
+    '.ico': 'image/x-icon',
+    '.mp3': 'audio/mpeg',
+}
+
+# картинки и так сжаты, жать имеет смысл только текст
+COMPRESSIBLE = {'.html', '.css', '.js', '.json', '.svg'}
+
+# мелочь сжимать нет смысла
+MIN_COMPRESS_SIZE = 512
+
+
+@dataclass
+class StaticAsset:
+    path: Path
+    mtime_ns: int
+    size: int
+    content_type: str
+    etag: str
+    last_modified: str
+    # кодировка ('identity', 'gzip', 'br') -> тело
+    variants: Dict[str, bytes] = field(default_factory=dict)
+
+    def etag_for(self, encoding: str) -> str:
+        # у каждого варианта свой сильный ETag
+        if encoding == 'identity':
+            return f'"{self.etag}"'
+        return f'"{self.etag}-{encoding}"'
+
+    def not_modified(self, encoding: str, if_none_match: Optional[str],
+                     if_modified_since: Optional[str]) -> bool:
+        # If-None-Match важнее If-Modified-Since (RFC 9110)
+        if if_none_match:
+            tags = [t.strip() for t in if_none_match.split(',')]
+            return '*' in tags or self.etag_for(encoding) in tags
+
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(self.mtime_ns // 1_000_000_000) <= since
+
+        return False
+
+
+def compress_variants(data: bytes) -> Dict[str, bytes]:
+    # сжатые варианты, только если они реально меньше
+    variants = {}
+    if len(data) < MIN_COMPRESS_SIZE:
+        return variants
+
+    gz = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(gz) < len(data):
+        variants['gzip'] = gz
+
+    if BROTLI_AVAILABLE:
+        br = brotli.compress(data, quality=11)
+        if len(br) < len(data):
+            variants['br'] = br
+
+    return variants
+
+
+def choose_encoding(accept_encoding: Optional[str], available: List[str]) -> str:
+    # выбрать лучшую кодировку из Accept-Encoding (br > gzip > identity)
+    if not accept_encoding:
+        return 'identity'
+
+    accepted = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+
+    for encoding in ('br', 'gzip'):
+        if encoding in available and accepted.get(encoding, accepted.get('*', 0)) > 0:
+            return encoding
+    return 'identity'
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    # Разобрать Range: bytes=... -> (начало, конец включительно)
+    # None - отдать файл целиком (заголовка нет, несколько диапазонов, мусор);
+    # ValueError - диапазон за пределами файла (416)
+    if not header:
+        return None
+    unit, _, spec = header.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in spec:
+        return None
+
+    first, sep, last = spec.strip().partition('-')
+    if not sep:
+        return None
+    if not (first.isdigit() or first == '') or not (last.isdigit() or last == ''):
+        return None
+
+    if first == '':
+        # bytes=-N - последние N байт
+        if not last:
+            return None
+        if int(last) == 0 or size == 0:
+            raise ValueError("range not satisfiable")
+        return max(0, size - int(last)), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if last and start > end:
+        return None
+    if start >= size:
+        raise ValueError("range not satisfiable")
+    return start, min(end, size - 1)
+
+
+def file_etag(stat: os.stat_result) -> str:
+    # дешёвый ETag для больших файлов - без хэширования содержимого
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+class StaticCache:
+    # Кэш файлов по абсолютному пути
+
+    def __init__(self):
+        self._assets: Dict[Path, StaticAsset] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, path: Path, stat: os.stat_result) -> StaticAsset:
+        data = path.read_bytes()
+        variants = {'identity': data}
+        if path.suffix in COMPRESSIBLE:
+            variants.update(compress_variants(data))
+
+        return StaticAsset(
+            path=path,
+            mtime_ns=stat.st_mtime_ns,
+            size=stat.st_size,
+            content_type=CONTENT_TYPES.get(path.suffix, 'application/octet-stream'),
+            etag=hashlib.sha1(data).hexdigest()[:20],
+            last_modified=formatdate(stat.st_mtime, usegmt=True),
+            variants=variants
+        )
+
+    def get(self, path: Path) -> Optional[StaticAsset]:
+        # файл из кэша; перечитывается если изменился на диске
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        if not path.is_file():
+            return None
+
+        asset = self._assets.get(path)
+        if asset and asset.mtime_ns == stat.st_mtime_ns and asset.size == stat.st_size:
+            return asset
+
+        with self._lock:
+            asset = self._load(path, stat)
+            self._assets[path] = asset
+        return asset
+
+    def preload(self, directory: Path):
+        # прогреть кэш при старте
+        for path in directory.iterdir():
+            if path.is_file() and path.suffix in CONTENT_TYPES:
+                self.get(path)
+
+    def stats(self) -> Dict:
+        return {
+            'files': len(self._assets),
+            'bytes': sum(len(b) for a in self._assets.values() for b in a.variants.values()),
+        }
@@ -0,0 +1,180 @@
+# Запись файлов данных: атомарно и без лишних повторов
+#
+# atomic_write пишет во временный файл рядом, делает fsync и подменяет
+# им оригинал через os.replace - при падении на диске остаётся либо
+# старая, либо новая версия, но не обрезанный файл.
+#
+# DebouncedWriter склеивает частые сохранения: save() только помечает
+# данные изменёнными, а фоновый поток пишет их, когда изменения
+# затихнут на delay секунд (но не реже чем раз в max_delay).
+# Если запись падает (диск полон, файл заблокирован), повторы идут всё
+# реже - от delay до max_retry_delay, а ошибка печатается раз за серию.
+
+import atexit
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional, Union
+
+from . import metrics
+
+
+def atomic_write(path: Path, data: Union[str, bytes]) -> os.stat_result:
+    # возвращает stat записанного файла - переименование его не меняет,
+    # так что это подпись нашей версии (см. FileWatcher.mark_seen)
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=path.name + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+            written = os.fstat(f.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+    # на POSIX переименование надёжно только после fsync папки
+    if hasattr(os, 'O_DIRECTORY'):
+        try:
+            dir_fd = os.open(path.parent, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+        except OSError:
+            pass
+    return written
+
+
+class DebouncedWriter:
+    # Отложенная запись в фоновом потоке
+
+    def __init__(self, write: Callable[[], None], delay: float = 0.5, max_delay: float = 2.0,
+                 name: str = 'writer', max_retry_delay: float = 60.0):
+        self._write = write
+        self.delay = delay
+        self.max_delay = max_delay
+        self.max_retry_delay = max_retry_delay
+        self.name = name
+
+        self._cond = threading.Condition()
+        # пишущий поток держит _write_lock, чтобы flush() не писал параллельно
+        self._write_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._dirty_since: Optional[float] = None
+        self._last_change = 0.0
+        self._closed = False
+        # серия неудачных записей подряд и когда пробовать снова
+        self._failures = 0
+        self._retry_at: Optional[float] = None
+
+        self.requested = 0
+        self.written = 0
+        self.failed = 0
+
+        atexit.register(self.flush)
+
+    def save(self):
+        # пометить изменения; запись - позже в фоне
+        with self._cond:
+            now = time.monotonic()
+            self.requested += 1
+            metrics.FILE_WRITES.inc(self.name, 'requested')
+            self._last_change = now
+            if self._dirty_since is None:
+                self._dirty_since = now
+            closed = self._closed
+            if not closed:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+                    self._thread.start()
+                else:
+                    self._cond.notify()
+
+        if closed:
+            # после close() фонового потока нет - пишем сразу
+            self.flush()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._closed:
+                    if self._dirty_since is None:
+                        self._cond.wait()
+                        continue
+                    now = time.monotonic()
+                    due = min(self._last_change + self.delay, self._dirty_since + self.max_delay)
+                    if self._retry_at is not None:
+                        # после ошибки новые save() не ускоряют повтор
+                        due = max(due, self._retry_at)
+                    if now >= due:
+                        break
+                    self._cond.wait(due - now)
+                if self._closed:
+                    return
+            self.flush()
+
+    def flush(self):
+        # записать сейчас, если есть что
+        with self._write_lock:
+            with self._cond:
+                if self._dirty_since is None:
+                    return
+                self._dirty_since = None
+            try:
+                self._write()
+            except Exception as e:
+                self.failed += 1
+                metrics.FILE_WRITES.inc(self.name, 'failed')
+                # не потерять изменения - повтор через delay, 2*delay, ... max_retry_delay
+                with self._cond:
+                    now = time.monotonic()
+                    if self._dirty_since is None:
+                        self._dirty_since = self._last_change = now
+                    self._failures += 1
+                    backoff = self.delay * 2 ** min(self._failures - 1, 32)
+                    self._retry_at = now + min(backoff, self.max_retry_delay)
+                    first = self._failures == 1
+                if first:
+                    print(f"Write error ({self.name}): {e}, retrying with backoff")
+                return
+            self.written += 1
+            metrics.FILE_WRITES.inc(self.name, 'written')
+            with self._cond:
+                failures, self._failures, self._retry_at = self._failures, 0, None
+            if failures:
+                print(f"Write recovered ({self.name}) after {failures} failed attempts")
+
+    def discard(self):
+        # отменить отложенную запись: данные уже совпадают с файлом
+        with self._cond:
+            self._dirty_since = None
+            self._failures, self._retry_at = 0, None
+
+    def close(self):
+        # дописать всё и остановить поток
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=2)
+        self.flush()
+        # после close() писать при выходе нечего, а ссылка держала бы писателя живым
+        atexit.unregister(self.flush)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'requested': self.requested,
+            'written': self.written,
+            'coalesced': max(0, self.requested - self.written),
+            'failed': self.failed,
+        }
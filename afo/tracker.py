@@ -1,17 +1,14 @@
 # Модуль отслеживания активности пользователя
 
-import ctypes
 import time
-import threading
 from collections import defaultdict
 from datetime import datetime, timedelta
 from dataclasses import dataclass, field
 from typing import Dict, List, Optional, Callable
-from ctypes import wintypes
 
-import win32gui
-import win32process
-import psutil
+from . import metrics
+from .backend import Backend, get_backend
+from .scheduler import PeriodicTask, Scheduler
 
 
 @dataclass
@@ -33,66 +30,43 @@ class ActivityState:
     activity_level: str = "normal"  # idle, low, normal, high
 
 
-class InputTracker:
-    # Отслеживание ввода (клавиатура/мышь)
-    
-    class LASTINPUTINFO(ctypes.Structure):
-        _fields_ = [
-            ('cbSize', wintypes.UINT),
-            ('dwTime', wintypes.DWORD),
-        ]
-    
-    def __init__(self):
-        self._last_input = self.LASTINPUTINFO()
-        self._last_input.cbSize = ctypes.sizeof(self._last_input)
-    
-    def get_idle_duration(self) -> int:
-        # Получить время простоя в секундах
-        ctypes.windll.user32.GetLastInputInfo(ctypes.byref(self._last_input))
-        millis = ctypes.windll.kernel32.GetTickCount() - self._last_input.dwTime
-        return millis // 1000
-
-
-class WindowTracker:
-    # Отслеживание активного окна
-    
-    @staticmethod
-    def get_active_window() -> tuple:
-        # Получить информацию об активном окне
-        try:
-            hwnd = win32gui.GetForegroundWindow()
-            if hwnd:
-                _, pid = win32process.GetWindowThreadProcessId(hwnd)
-                process = psutil.Process(pid)
-                window_title = win32gui.GetWindowText(hwnd)
-                return process.name().lower().replace('.exe', ''), window_title
-        except Exception:
-            pass
-        return "", ""
-
-
 class ActivityTracker:
     # Основной трекер активности
     
-    def __init__(self, idle_threshold: int = 180):
+    # раз в сколько секунд опрашивать окно и ввод
+    TICK_INTERVAL = 1.0
+    
+    def __init__(self, idle_threshold: int = 180, scheduler: Scheduler = None, backend: Backend = None):
         self.idle_threshold = idle_threshold
-        self.input_tracker = InputTracker()
-        self.window_tracker = WindowTracker()
+        # окно и простой - от платформенного бэкенда
+        self.backend = backend or get_backend()
+        # тик - задача общего планировщика, время сессий - по его часам
+        self.scheduler = scheduler or Scheduler(name='tracker')
+        self.clock = self.scheduler.clock
         
         self.state = ActivityState()
         self.app_usage: Dict[str, AppUsage] = defaultdict(lambda: AppUsage(name=""))
         
         self._running = False
-        self._thread: Optional[threading.Thread] = None
+        self._task: Optional[PeriodicTask] = None
+        # тики с ошибкой подряд - в лог пишется только первый
+        self._tick_failures = 0
         self._listeners: List[Callable] = []
         
         self._current_session_start: Optional[datetime] = None
         self._last_app: str = ""
+        self._session_window: str = ""
+        # слушатели завершённых сессий: callback(app, window, start, end)
+        self._session_listeners: List[Callable] = []
     
     def add_listener(self, callback: Callable):
         # Добавить слушателя изменений состояния
         self._listeners.append(callback)
     
+    def add_session_listener(self, callback: Callable):
+        # Добавить слушателя завершённых сессий (для истории)
+        self._session_listeners.append(callback)
+    
     def _notify_listeners(self):
         # Уведомить слушателей
         for listener in self._listeners:
@@ -101,21 +75,42 @@ class ActivityTracker:
             except Exception:
                 pass
     
-    def _update_app_usage(self, app_name: str):
+    def _close_session(self, now: datetime):
+        # Завершить текущую сессию (смена приложения, простой, остановка)
+        if self._last_app and self._current_session_start:
+            start = self._current_session_start
+            duration = (now - start).total_seconds()
+            usage = self.app_usage[self._last_app]
+            usage.total_seconds += int(duration)
+            usage.sessions.append((start, now))
+            
+            for listener in self._session_listeners:
+                try:
+                    listener(self._last_app, self._session_window, start, now)
+                except Exception as e:
+                    print(f"Session listener error: {e}")
+        
+        self._current_session_start = None
+        self._last_app = ""
+    
+    def current_session(self) -> Optional[tuple]:
+        # (app, window, start) незавершённой сессии
+        if self._last_app and self._current_session_start:
+            return self._last_app, self._session_window, self._current_session_start
+        return None
+    
+    def _update_app_usage(self, app_name: str, window_title: str = ""):
         # Обновить статистику использования приложения
-        now = datetime.now()
+        now = self.clock.now()
         
         if app_name != self._last_app:
             # Завершить предыдущую сессию
-            if self._last_app and self._current_session_start:
-                duration = (now - self._current_session_start).total_seconds()
-                usage = self.app_usage[self._last_app]
-                usage.total_seconds += int(duration)
-                usage.sessions.append((self._current_session_start, now))
+            self._close_session(now)
             
             # Начать новую сессию
             self._current_session_start = now
             self._last_app = app_name
+            self._session_window = window_title
             
             if app_name:
                 usage = self.app_usage[app_name]
@@ -134,37 +129,51 @@ class ActivityTracker:
             return "high"
         return "normal"
     
-    def _track_loop(self):
-        # Основной цикл отслеживания
-        while self._running:
-            try:
-                # Получить idle время
-                idle_seconds = self.input_tracker.get_idle_duration()
-                self.state.idle_seconds = idle_seconds
-                self.state.is_idle = idle_seconds > self.idle_threshold
-                
-                # Активность ввода
-                self.state.keyboard_active = idle_seconds < 2
-                self.state.mouse_active = idle_seconds < 5
-                
-                # Активное окно
-                app_name, window_title = self.window_tracker.get_active_window()
-                self.state.current_app = app_name
-                self.state.current_window = window_title
-                
-                # Уровень активности
-                self.state.activity_level = self._calculate_activity_level()
-                
-                # Обновить статистику
-                if not self.state.is_idle:
-                    self._update_app_usage(app_name)
-                
-                self._notify_listeners()
-                
-            except Exception:
-                pass
+    def _tick(self):
+        # Один опрос окна и ввода раз в TICK_INTERVAL - в пуле планировщика:
+        # psutil по чужому процессу или зависшее окно могут встать, а поток
+        # планировщика ведёт все таймеры. Пока тик идёт, следующий пропускается
+        if not self._running:
+            return
+        started = time.perf_counter()
+        try:
+            # Получить idle время
+            idle_seconds = self.backend.idle_seconds()
+            self.state.idle_seconds = idle_seconds
+            self.state.is_idle = idle_seconds > self.idle_threshold
             
-            time.sleep(1)
+            # Активность ввода
+            self.state.keyboard_active = idle_seconds < 2
+            self.state.mouse_active = idle_seconds < 5
+            
+            # Активное окно
+            app_name, window_title = self.backend.foreground_window()
+            self.state.current_app = app_name
+            self.state.current_window = window_title
+            
+            # Уровень активности
+            self.state.activity_level = self._calculate_activity_level()
+            
+            # Обновить статистику
+            if not self.state.is_idle:
+                self._update_app_usage(app_name, window_title)
+            else:
+                # простой в сессию приложения не засчитываем
+                self._close_session(self.clock.now())
+            
+            self._notify_listeners()
+            
+        except Exception as e:
+            metrics.TRACKER_TICK_ERRORS.inc()
+            self._tick_failures += 1
+            if self._tick_failures == 1:
+                print(f"Tracker tick error: {e}")
+        else:
+            if self._tick_failures:
+                print(f"Tracker recovered after {self._tick_failures} failed ticks")
+                self._tick_failures = 0
+        
+        metrics.TRACKER_TICK_DURATION.observe(time.perf_counter() - started)
     
     def start(self):
         # Запустить отслеживание
@@ -172,18 +181,19 @@ class ActivityTracker:
             return
         
         self._running = True
-        self._thread = threading.Thread(target=self._track_loop, daemon=True)
-        self._thread.start()
+        self._task = self.scheduler.every(self.TICK_INTERVAL, self._tick, blocking=True)
     
     def stop(self):
-        # Остановить отслеживание
+        # Остановить отслеживание; тик, который уже идёт, дожидаемся
         self._running = False
-        if self._thread:
-            self._thread.join(timeout=2)
+        if self._task:
+            self._task.cancel(wait=2)
+            self._task = None
+        self._close_session(self.clock.now())
     
     def get_today_stats(self) -> Dict[str, int]:
         # Получить статистику за сегодня
-        today = datetime.now().date()
+        today = self.clock.today()
         stats = {}
         
         for app_name, usage in self.app_usage.items():
@@ -0,0 +1,222 @@
+# Слежение за файлом (config.json, который могут подменить снаружи)
+#
+# Бэкенд только будит поток, когда файл мог поменяться; решает сравнение
+# подписи файла (mtime, размер, inode). Опрос - os.stat раз в interval,
+# на Windows - уведомление об изменениях в папке (FindFirstChangeNotification),
+# опрос остаётся как страховка. Опрос при общем планировщике - его
+# периодическая задача, без своего потока.
+#
+# Изменение применяется, когда файл перестал меняться на debounce секунд -
+# чтобы не читать наполовину скопированный файл. Свои записи помечаются
+# через mark_seen() и не считаются изменением.
+
+import ctypes
+import os
+import sys
+import threading
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+from .scheduler import PeriodicTask, Scheduler
+
+
+Signature = Optional[Tuple[int, int, int]]
+
+
+def stat_signature(st: os.stat_result) -> Signature:
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+def file_signature(path: Path) -> Signature:
+    try:
+        return stat_signature(os.stat(path))
+    except OSError:
+        return None
+
+
+class PollingBackend:
+    # Просто ждать interval секунд
+
+    def __init__(self, interval: float = 5.0):
+        self.interval = interval
+
+    def wait(self, stop: threading.Event):
+        stop.wait(self.interval)
+
+    def wake(self):
+        # stop.wait() и так просыпается по stop.set()
+        pass
+
+    def close(self):
+        pass
+
+
+class Win32ChangeBackend:
+    # Ждать уведомления Windows об изменениях в папке файла
+
+    FILE_NOTIFY_CHANGE_FILE_NAME = 0x01
+    FILE_NOTIFY_CHANGE_SIZE = 0x08
+    FILE_NOTIFY_CHANGE_LAST_WRITE = 0x10
+    WAIT_OBJECT_0 = 0
+
+    def __init__(self, directory: Path, interval: float = 60.0):
+        self.interval = interval
+        self._kernel32 = ctypes.windll.kernel32
+        self._kernel32.FindFirstChangeNotificationW.restype = ctypes.c_void_p
+        self._kernel32.FindNextChangeNotification.argtypes = [ctypes.c_void_p]
+        self._kernel32.FindCloseChangeNotification.argtypes = [ctypes.c_void_p]
+        self._kernel32.WaitForMultipleObjects.argtypes = [
+            ctypes.c_uint32, ctypes.POINTER(ctypes.c_void_p), ctypes.c_bool, ctypes.c_uint32]
+        self._kernel32.CreateEventW.restype = ctypes.c_void_p
+        self._kernel32.SetEvent.argtypes = [ctypes.c_void_p]
+        self._kernel32.CloseHandle.argtypes = [ctypes.c_void_p]
+        flags = (self.FILE_NOTIFY_CHANGE_FILE_NAME | self.FILE_NOTIFY_CHANGE_SIZE
+                 | self.FILE_NOTIFY_CHANGE_LAST_WRITE)
+        handle = self._kernel32.FindFirstChangeNotificationW(str(directory), False, flags)
+        # INVALID_HANDLE_VALUE = -1
+        if not handle or handle == ctypes.c_void_p(-1).value:
+            raise OSError(f"FindFirstChangeNotification failed for {directory}")
+        self._handle = handle
+        # событие для wake(): stop будит ожидание сразу, без опроса каждые полсекунды
+        self._wake = self._kernel32.CreateEventW(None, True, False, None)
+        if not self._wake:
+            self._kernel32.FindCloseChangeNotification(handle)
+            raise OSError("CreateEvent failed")
+
+    def wait(self, stop: threading.Event):
+        # до уведомления, wake() или interval (страховочный опрос)
+        handles = (ctypes.c_void_p * 2)(self._handle, self._wake)
+        result = self._kernel32.WaitForMultipleObjects(2, handles, False, int(self.interval * 1000))
+        if result == self.WAIT_OBJECT_0:
+            self._kernel32.FindNextChangeNotification(self._handle)
+
+    def wake(self):
+        if self._wake:
+            self._kernel32.SetEvent(self._wake)
+
+    def close(self):
+        if self._handle:
+            self._kernel32.FindCloseChangeNotification(self._handle)
+            self._handle = None
+        if self._wake:
+            self._kernel32.CloseHandle(self._wake)
+            self._wake = None
+
+
+def default_backend(path: Path, interval: float):
+    # уведомления ОС где есть, иначе опрос
+    if sys.platform == 'win32':
+        try:
+            return Win32ChangeBackend(path.parent, interval=max(interval, 60.0))
+        except (OSError, AttributeError) as e:
+            print(f"File change notifications unavailable, polling: {e}")
+    return PollingBackend(interval)
+
+
+class FileWatcher:
+    # Фоновый поток: on_change() после устоявшегося изменения файла
+
+    def __init__(self, path: Path, on_change: Callable[[], None], backend=None,
+                 interval: float = 5.0, debounce: float = 1.0, name: str = 'watcher'):
+        self.path = path
+        self.on_change = on_change
+        self.interval = interval
+        self.debounce = debounce
+        self.name = name
+        self._backend = backend
+
+        self._lock = threading.Lock()
+        self._seen: Signature = file_signature(path)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # опрос задачей планировщика вместо потока
+        self._scheduler: Optional[Scheduler] = None
+        self._task: Optional[PeriodicTask] = None
+        self._settling = False
+
+    def mark_seen(self, st: os.stat_result = None):
+        # файл записали мы сами - это не изменение.
+        # st - stat нашей записи (atomic_write), иначе берём текущий файл
+        with self._lock:
+            self._seen = stat_signature(st) if st else file_signature(self.path)
+
+    def start(self, scheduler: Scheduler = None):
+        # с планировщиком опрос - его задача; уведомлениям ОС нужен свой поток
+        if self._thread or self._task:
+            return
+        if self._backend is None:
+            self._backend = default_backend(self.path, self.interval)
+        self._stop.clear()
+        if scheduler and isinstance(self._backend, PollingBackend):
+            self._scheduler = scheduler
+            self._task = scheduler.every(self.interval, self._poll, blocking=True, delay=self.interval)
+            return
+        self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel(wait=2)
+            self._task = None
+        if self._backend:
+            self._backend.wake()
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+        if self._backend:
+            self._backend.close()
+
+    def changed(self) -> bool:
+        with self._lock:
+            return file_signature(self.path) != self._seen
+
+    def check(self) -> bool:
+        # Один проход без ожиданий: если файл поменялся - on_change()
+        with self._lock:
+            current = file_signature(self.path)
+            if current == self._seen:
+                return False
+            self._seen = current
+        try:
+            self.on_change()
+        except Exception as e:
+            print(f"Watcher {self.name} error: {e}")
+        return True
+
+    def _poll(self):
+        # задача планировщика (в его пуле): то же, что _loop, без своего потока
+        if self._settling or not self.changed():
+            return
+        self._settling = True
+        self._settle_later(file_signature(self.path))
+
+    def _settle_later(self, last: Signature):
+        self._scheduler.call_later(self.debounce, self._scheduler.submit, self._settle, last)
+
+    def _settle(self, last: Signature):
+        # ждём, пока файл перестанет меняться
+        if self._stop.is_set():
+            self._settling = False
+            return
+        current = file_signature(self.path)
+        if current != last:
+            self._settle_later(current)
+            return
+        self._settling = False
+        self.check()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._backend.wait(self._stop)
+            if self._stop.is_set() or not self.changed():
+                continue
+            # ждём, пока файл перестанет меняться (копирование, запись по частям)
+            last = file_signature(self.path)
+            while not self._stop.wait(self.debounce):
+                current = file_signature(self.path)
+                if current == last:
+                    break
+                last = current
+            if not self._stop.is_set():
+                self.check()
@@ -8,6 +8,21 @@
 
     const API_BASE = '';
     const UPDATE_INTERVAL = 2000;
+    const EVENTS_URL = '/api/events';
+    const WS_URL = '/api/ws';
+    // команды и их HTTP роуты - на случай если WebSocket недоступен
+    const COMMAND_ROUTES = {
+        'pomodoro.start': '/api/pomodoro/start',
+        'pomodoro.pause': '/api/pomodoro/pause',
+        'pomodoro.stop': '/api/pomodoro/stop',
+        'pomodoro.skip': '/api/pomodoro/skip',
+        'reminders.snooze': '/api/reminders/snooze',
+        'reminders.dismiss': '/api/reminders/dismiss',
+        'notifications.ack': '/api/notifications/ack',
+        'break': '/api/break',
+        'mode': '/api/mode'
+    };
+    const DASHBOARD_FIELDS = ['status', 'stats', 'config', 'reminders', 'procrastination', 'pomodoro', 'autostart'];
 
     // Audio player для фоновых звуков
     let audioPlayer = null;
@@ -21,6 +36,9 @@
         remindersConfig: null,
         procrastinationConfig: null,
         pomodoroData: null,
+        pomodoroReceivedAt: 0,
+        // seq последнего показанного уведомления - курсор для /api/status
+        notificationSeq: 0,
         currentSound: 'none',
         breakActive: false,
         breakTimer: null,
@@ -74,8 +92,9 @@
         loadTheme();
         cacheElements();
         bindEvents();
-        startPolling();
-        loadConfig();
+        startEventStream();
+        connectCommandSocket();
+        loadDashboard();
     }
 
     function cacheElements() {
@@ -173,7 +192,7 @@
         const workDuration = document.getElementById('settingWorkDuration');
         if (workDuration) {
             workDuration.addEventListener('change', (e) => {
-                updateConfig('breaks', { work_duration: parseInt(e.target.value) });
+                updateConfig('breaks', { work_duration_minutes: parseInt(e.target.value) });
             });
         }
 
@@ -206,15 +225,6 @@
             });
         });
         
-        // Загрузить статус автозагрузки
-        loadAutostartStatus();
-        
-        // загрузить настройки напоминаний
-        loadRemindersConfig();
-        
-        // загрузить настройки прокрастинации
-        loadProcrastinationConfig();
-        
         // обработчики для прокрастинации
         const procrastEnabled = document.getElementById('settingProcrastEnabled');
         if (procrastEnabled) {
@@ -320,7 +330,7 @@
     }
 
     async function fetchStatus() {
-        const data = await fetchAPI('/api/status');
+        const data = await fetchAPI('/api/status?since=' + state.notificationSeq);
         if (data) {
             setConnected(true);
             state.status = data;
@@ -328,6 +338,38 @@
         }
     }
 
+    // Всё для первой отрисовки одним запросом
+    async function loadDashboard() {
+        const data = await fetchAPI('/api/dashboard?fields=' + DASHBOARD_FIELDS.join(','));
+        if (!data) return;
+        
+        setConnected(true);
+        
+        // статус мог уже прийти по SSE - он свежее
+        if (!state.status) {
+            state.status = data.status;
+            updateUI();
+        }
+        
+        state.stats = data.stats;
+        updateStatsUI();
+        
+        state.config = data.config;
+        updateSettingsUI();
+        
+        state.remindersConfig = data.reminders;
+        updateRemindersUI();
+        
+        state.procrastinationConfig = data.procrastination;
+        updateProcrastinationUI();
+        
+        state.pomodoroData = data.pomodoro;
+        state.pomodoroReceivedAt = Date.now();
+        updatePomodoroUI();
+        
+        applyAutostartStatus(data.autostart);
+    }
+
     async function loadStats() {
         const data = await fetchAPI('/api/stats');
         if (data) {
@@ -336,26 +378,16 @@
         }
     }
 
-    async function loadConfig() {
-        const data = await fetchAPI('/api/config');
-        if (data) {
-            state.config = data;
-            updateSettingsUI();
-        }
-    }
-
     async function updateConfig(section, values) {
         await fetchAPI('/api/config', {
-            method: 'POST',
+            method: 'PATCH',
+            headers: { 'Content-Type': 'application/merge-patch+json' },
             body: JSON.stringify({ [section]: values })
         });
     }
 
     async function setAutoMode(enabled) {
-        await fetchAPI('/api/mode', {
-            method: 'POST',
-            body: JSON.stringify({ auto: enabled })
-        });
+        await sendCommand('mode', { auto: enabled });
     }
 
     function playSound(sound) {
@@ -404,7 +436,7 @@
     }
 
     async function startBreak() {
-        await fetchAPI('/api/break', { method: 'POST' });
+        await sendCommand('break');
     }
 
     // =============================
@@ -473,16 +505,17 @@
         const data = await fetchAPI('/api/pomodoro');
         if (data) {
             state.pomodoroData = data;
+            state.pomodoroReceivedAt = Date.now();
             updatePomodoroUI();
         }
     }
     
     async function pomodoroAction(action, params = {}) {
-        await fetchAPI('/api/pomodoro/' + action, {
-            method: 'POST',
-            body: JSON.stringify(params)
-        });
-        loadPomodoroData();
+        const reply = await sendCommand('pomodoro.' + action, params);
+        // по WebSocket новое состояние приходит вместе с ответом
+        if (!reply || !reply.changes) {
+            loadPomodoroData();
+        }
     }
     
     async function updatePomodoroSettings(params) {
@@ -493,9 +526,17 @@
         loadPomodoroData();
     }
     
+    function pomodoroSecondsLeft(data) {
+        // сервер шлёт состояние только при переходах - идущий таймер досчитываем сами
+        if (!data.running || !state.pomodoroReceivedAt) return data.seconds_left;
+        const elapsed = Math.floor((Date.now() - state.pomodoroReceivedAt) / 1000);
+        return Math.max(0, data.seconds_left - elapsed);
+    }
+    
     function updatePomodoroUI() {
         const data = state.pomodoroData;
         if (!data) return;
+        const secondsLeft = pomodoroSecondsLeft(data);
         
         const phaseEl = document.getElementById('pomodoroPhase');
         const timeEl = document.getElementById('pomodoroTime');
@@ -526,8 +567,8 @@
         
         // время
         if (timeEl) {
-            const mins = Math.floor(data.seconds_left / 60);
-            const secs = data.seconds_left % 60;
+            const mins = Math.floor(secondsLeft / 60);
+            const secs = secondsLeft % 60;
             timeEl.textContent = `${mins}:${secs.toString().padStart(2, '0')}`;
         }
         
@@ -538,7 +579,7 @@
             if (data.phase === 'long_break') totalSeconds = data.settings.long_break_minutes * 60;
             
             const circumference = 2 * Math.PI * 90;
-            const progress = totalSeconds > 0 ? (totalSeconds - data.seconds_left) / totalSeconds : 0;
+            const progress = totalSeconds > 0 ? (totalSeconds - secondsLeft) / totalSeconds : 0;
             ringEl.style.strokeDasharray = circumference;
             ringEl.style.strokeDashoffset = circumference * (1 - progress);
         }
@@ -616,7 +657,32 @@
         }, 1000);
     }
     
+    function stopPomodoroPolling() {
+        if (pomodoroPolling) {
+            clearInterval(pomodoroPolling);
+            pomodoroPolling = null;
+        }
+    }
+    
+    function applyPomodoroEvent(data) {
+        // в событии нет истории - берём её из прошлых данных,
+        // а после завершённого помидора перезапрашиваем
+        const prev = state.pomodoroData;
+        state.pomodoroData = { history: prev?.history, ...data };
+        state.pomodoroReceivedAt = Date.now();
+        updatePomodoroUI();
+        
+        if (prev && prev.completed_today !== data.completed_today) {
+            loadPomodoroData();
+        }
+    }
+    
     function bindPomodoroEvents() {
+        // обратный отсчёт на клиенте
+        setInterval(() => {
+            if (state.pomodoroData?.running) updatePomodoroUI();
+        }, 1000);
+        
         const startBtn = document.getElementById('pomodoroStartBtn');
         const stopBtn = document.getElementById('pomodoroStopBtn');
         const skipBtn = document.getElementById('pomodoroSkipBtn');
@@ -683,21 +749,14 @@
             });
         }
         
-        startPomodoroPolling();
     }
     
     async function snoozeReminder(reminderId, minutes = 10) {
-        await fetchAPI('/api/reminders/snooze', {
-            method: 'POST',
-            body: JSON.stringify({ id: reminderId, minutes })
-        });
+        await sendCommand('reminders.snooze', { id: reminderId, minutes });
     }
     
     async function dismissReminder(reminderId) {
-        await fetchAPI('/api/reminders/dismiss', {
-            method: 'POST',
-            body: JSON.stringify({ id: reminderId })
-        });
+        await sendCommand('reminders.dismiss', { id: reminderId });
     }
     
     function updateRemindersUI() {
@@ -726,9 +785,21 @@
         const container = document.getElementById('toastContainer');
         if (!container) return;
         
+        // одно и то же может прийти и по SSE, и опросом
+        if (reminder.seq) {
+            if (reminder.seq <= state.notificationSeq) return;
+            state.notificationSeq = reminder.seq;
+        }
+        
+        // повтор (count > 1) заменяет прошлый тост того же напоминания
+        container.querySelectorAll('.toast').forEach(old => {
+            if (old.dataset.reminderId === reminder.id) old.remove();
+        });
+        
         const toast = document.createElement('div');
         toast.className = 'toast';
         toast.dataset.reminderId = reminder.id;
+        if (reminder.seq) toast.dataset.seq = reminder.seq;
         
         // иконки для разных типов
         const iconMap = {
@@ -744,7 +815,7 @@
                 <i class="bi ${iconClass}"></i>
             </div>
             <div class="toast-content">
-                <div class="toast-title">${reminder.name}</div>
+                <div class="toast-title">${reminder.name}${reminder.count > 1 ? ` ×${reminder.count}` : ''}</div>
                 <div class="toast-message">${reminder.message}</div>
                 <div class="toast-actions">
                     <button class="toast-btn toast-btn-done" data-id="${reminder.id}">Готово</button>
@@ -768,6 +839,8 @@
         });
         
         toast.querySelector('.toast-close').addEventListener('click', () => {
+            // закрыл - подтверждаем, чтобы не всплыло в других вкладках
+            if (reminder.seq) sendCommand('notifications.ack', { seq: reminder.seq });
             closeToast(toast);
         });
         
@@ -802,6 +875,11 @@
             showReminderToast(reminder);
         });
     }
+    
+    function handleNotificationAck(seq) {
+        // подтвердили в другой вкладке (или командой) - убрать тост здесь
+        document.querySelectorAll(`.toast[data-seq="${seq}"]`).forEach(closeToast);
+    }
 
     function startBreakMode() {
         const breakDuration = state.config?.breaks?.break_duration || 10;
@@ -882,20 +960,17 @@
         });
     }
 
-    async function loadAutostartStatus() {
-        const data = await fetchAPI('/api/autostart');
-        if (data) {
-            const el = document.getElementById('settingAutostart');
-            const desc = document.getElementById('autostartDesc');
+    function applyAutostartStatus(data) {
+        const el = document.getElementById('settingAutostart');
+        const desc = document.getElementById('autostartDesc');
+        
+        if (el) {
+            el.checked = data.enabled;
             
-            if (el) {
-                el.checked = data.enabled;
-                
-                if (!data.available) {
-                    el.disabled = true;
-                    if (desc) {
-                        desc.textContent = 'Доступно только в exe версии';
-                    }
+            if (!data.available) {
+                el.disabled = true;
+                if (desc) {
+                    desc.textContent = 'Доступно только в exe версии';
                 }
             }
         }
@@ -985,9 +1060,16 @@
         }
         
         // обработка входящих напоминаний
+        if (status.notifications_seq < state.notificationSeq) {
+            // сервер перезапустился - seq начались заново
+            state.notificationSeq = 0;
+        }
         if (status.pending_reminders && status.pending_reminders.length > 0) {
             handlePendingReminders(status.pending_reminders);
         }
+        if (status.notifications_seq > state.notificationSeq) {
+            state.notificationSeq = status.notifications_seq;
+        }
     }
 
     function toggleEnvItem(el, active, text) {
@@ -1071,10 +1153,130 @@
         return `${hours}ч ${mins}м`;
     }
 
-    // Polling
+    // Push через SSE, поллинг только как запасной вариант
+    let statusPolling = null;
+    let eventSource = null;
+    
     function startPolling() {
+        if (statusPolling) return;
         fetchStatus();
-        setInterval(fetchStatus, UPDATE_INTERVAL);
+        statusPolling = setInterval(fetchStatus, UPDATE_INTERVAL);
+        startPomodoroPolling();
+    }
+    
+    function stopPolling() {
+        if (statusPolling) {
+            clearInterval(statusPolling);
+            statusPolling = null;
+        }
+        stopPomodoroPolling();
+    }
+    
+    function applyStatusEvent(part, data) {
+        state.status = { ...(state.status || {}), [part]: data };
+        updateUI();
+    }
+    
+    function startEventStream() {
+        if (!window.EventSource) {
+            startPolling();
+            return;
+        }
+        
+        // EventSource сам переподключается и шлёт Last-Event-ID,
+        // пока соединения нет - опрашиваем по старинке
+        eventSource = new EventSource(API_BASE + EVENTS_URL);
+        
+        eventSource.onopen = () => {
+            setConnected(true);
+            stopPolling();
+        };
+        
+        eventSource.onerror = () => {
+            setConnected(false);
+            startPolling();
+        };
+        
+        ['activity', 'analysis', 'environment'].forEach(part => {
+            eventSource.addEventListener(part, (e) => {
+                applyStatusEvent(part, JSON.parse(e.data));
+            });
+        });
+        
+        eventSource.addEventListener('pomodoro', (e) => {
+            applyPomodoroEvent(JSON.parse(e.data));
+        });
+        
+        eventSource.addEventListener('reminder', (e) => {
+            showReminderToast(JSON.parse(e.data));
+        });
+        
+        eventSource.addEventListener('notification_ack', (e) => {
+            handleNotificationAck(JSON.parse(e.data).seq);
+        });
+    }
+
+    // Канал команд через WebSocket: одно соединение на вкладку,
+    // ответ сразу содержит изменения состояния. Без него - обычный POST
+    let commandSocket = null;
+    let commandSeq = 0;
+    const pendingCommands = new Map();
+    
+    function connectCommandSocket() {
+        if (!window.WebSocket) return;
+        
+        const proto = location.protocol === 'https:' ? 'wss://' : 'ws://';
+        const socket = new WebSocket(proto + location.host + WS_URL);
+        
+        socket.onopen = () => {
+            commandSocket = socket;
+        };
+        
+        socket.onmessage = (e) => {
+            const reply = JSON.parse(e.data);
+            const pending = pendingCommands.get(reply.id);
+            if (!pending) return;
+            pendingCommands.delete(reply.id);
+            applyChanges(reply.changes || []);
+            pending.resolve(reply);
+        };
+        
+        socket.onclose = () => {
+            commandSocket = null;
+            // незавершённые команды - ответа уже не будет
+            pendingCommands.forEach(p => p.resolve(null));
+            pendingCommands.clear();
+            setTimeout(connectCommandSocket, 5000);
+        };
+    }
+    
+    function applyChanges(changes) {
+        changes.forEach(change => {
+            if (change.event === 'pomodoro') {
+                applyPomodoroEvent(change.data);
+            } else if (['activity', 'analysis', 'environment'].includes(change.event)) {
+                applyStatusEvent(change.event, change.data);
+            }
+        });
+    }
+    
+    async function sendCommand(cmd, params = {}) {
+        if (commandSocket && commandSocket.readyState === WebSocket.OPEN) {
+            const id = ++commandSeq;
+            const reply = await new Promise(resolve => {
+                pendingCommands.set(id, { resolve });
+                commandSocket.send(JSON.stringify({ id, cmd, params }));
+            });
+            if (reply) {
+                if (!reply.ok) console.error('Command error:', reply.error);
+                return reply;
+            }
+        }
+        
+        return await fetchAPI(COMMAND_ROUTES[cmd], {
+            method: 'POST',
+            body: JSON.stringify(params)
+        });
     }
 
     // Start
@@ -0,0 +1,246 @@
+# Минимальный WebSocket (RFC 6455) поверх http.server
+#
+# Нужен только для канала команд UI: текстовые JSON сообщения,
+# ping/pong и close. Расширения и бинарные сообщения не поддерживаются.
+
+import base64
+import hashlib
+import json
+import os
+import select
+import socket
+import struct
+from typing import Any, BinaryIO, Optional, Tuple
+
+
+GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+# команды маленькие - всё что больше считаем мусором
+MAX_MESSAGE_SIZE = 1024 * 1024
+
+
+# коды закрытия (RFC 6455, 7.4.1)
+CLOSE_NORMAL = 1000
+CLOSE_PROTOCOL_ERROR = 1002
+CLOSE_TOO_BIG = 1009
+
+
+class WebSocketError(Exception):
+    # нарушение протокола; code - с каким кодом закрыть соединение
+
+    def __init__(self, message: str, code: int = CLOSE_PROTOCOL_ERROR):
+        super().__init__(message)
+        self.code = code
+
+
+def accept_key(key: str) -> str:
+    # Sec-WebSocket-Accept для ключа клиента
+    digest = hashlib.sha1((key + GUID).encode('ascii')).digest()
+    return base64.b64encode(digest).decode('ascii')
+
+
+def encode_frame(opcode: int, payload: bytes, mask: bool = False) -> bytes:
+    # сервер шлёт без маски, клиент обязан маскировать
+    header = bytearray([0x80 | opcode])
+    mask_bit = 0x80 if mask else 0
+    length = len(payload)
+
+    if length < 126:
+        header.append(mask_bit | length)
+    elif length < 65536:
+        header.append(mask_bit | 126)
+        header += struct.pack('!H', length)
+    else:
+        header.append(mask_bit | 127)
+        header += struct.pack('!Q', length)
+
+    if mask:
+        key = os.urandom(4)
+        header += key
+        payload = _apply_mask(payload, key)
+
+    return bytes(header) + payload
+
+
+def _apply_mask(payload: bytes, key: bytes) -> bytes:
+    # XOR через int быстрее побайтового цикла
+    if not payload:
+        return payload
+    repeated = (key * (len(payload) // 4 + 1))[:len(payload)]
+    masked = int.from_bytes(payload, 'big') ^ int.from_bytes(repeated, 'big')
+    return masked.to_bytes(len(payload), 'big')
+
+
+class SocketReader:
+    # Чтение кадров прямо из сокета со своим буфером. У makefile() после
+    # таймаута чтение ломается насовсем, а здесь ожидание (wait) с таймаутом
+    # ничего не портит: не пришло ничего - шлём ping и ждём дальше
+
+    def __init__(self, sock: socket.socket, pending: bytes = b''):
+        self.sock = sock
+        self._buffer = bytearray(pending)
+
+    def wait(self, timeout: float) -> bool:
+        # есть что читать (или соединение закрыто) за timeout секунд
+        if self._buffer:
+            return True
+        ready, _, _ = select.select([self.sock], [], [], timeout)
+        return bool(ready)
+
+    def read(self, n: int) -> bytes:
+        # n байт или меньше, если клиент закрыл соединение; внутри кадра
+        # действует таймаут сокета
+        while len(self._buffer) < n:
+            chunk = self.sock.recv(max(n - len(self._buffer), 4096))
+            if not chunk:
+                break
+            self._buffer += chunk
+        data = bytes(self._buffer[:n])
+        del self._buffer[:n]
+        return data
+
+
+def _read_exact(stream: BinaryIO, n: int) -> bytes:
+    data = stream.read(n)
+    if data is None or len(data) < n:
+        raise ConnectionError("websocket closed")
+    return data
+
+
+def read_frame(stream: BinaryIO, masked: Optional[bool] = None) -> Tuple[bool, int, bytes]:
+    # -> (fin, opcode, payload)
+    # masked - каким должен быть кадр: от клиента всегда с маской, от
+    # сервера без (RFC 6455, 5.1); не такой - ошибка протокола, 1002
+    b1, b2 = _read_exact(stream, 2)
+    fin = bool(b1 & 0x80)
+    opcode = b1 & 0x0F
+    is_masked = bool(b2 & 0x80)
+    length = b2 & 0x7F
+    if masked is not None and is_masked != masked:
+        raise WebSocketError("masked frame expected" if masked else "unexpected masked frame")
+
+    if length == 126:
+        length = struct.unpack('!H', _read_exact(stream, 2))[0]
+    elif length == 127:
+        length = struct.unpack('!Q', _read_exact(stream, 8))[0]
+
+    if length > MAX_MESSAGE_SIZE:
+        raise WebSocketError("message too big", CLOSE_TOO_BIG)
+
+    key = _read_exact(stream, 4) if is_masked else None
+    payload = _read_exact(stream, length) if length else b''
+    if key:
+        payload = _apply_mask(payload, key)
+    return fin, opcode, payload
+
+
+def read_message(stream: BinaryIO, send, mask: bool = False) -> Optional[Tuple[int, bytes]]:
+    # Прочитать сообщение целиком (с учётом фрагментов).
+    # На ping сразу отвечает pong через send(bytes), mask - если читает клиент:
+    # он шлёт кадры с маской и ждёт от сервера без неё, сервер - наоборот.
+    # Pong возвращается как сообщение (OP_PONG) - ответ на наш keepalive,
+    # дальше не ждём. None - клиент закрыл
+    message_opcode = None
+    parts = []
+    size = 0
+
+    while True:
+        fin, opcode, payload = read_frame(stream, masked=not mask)
+
+        if opcode == OP_PING:
+            send(encode_frame(OP_PONG, payload, mask=mask))
+            continue
+        if opcode == OP_PONG:
+            if message_opcode is None:
+                return OP_PONG, payload
+            continue
+        if opcode == OP_CLOSE:
+            return None
+
+        if opcode != OP_CONTINUATION:
+            message_opcode = opcode
+            parts = []
+            size = 0
+        elif message_opcode is None:
+            raise WebSocketError("unexpected continuation frame")
+
+        parts.append(payload)
+        size += len(payload)
+        if size > MAX_MESSAGE_SIZE:
+            raise WebSocketError("message too big", CLOSE_TOO_BIG)
+
+        if fin:
+            return message_opcode, b''.join(parts)
+
+
+class WebSocketClient:
+    # Простой клиент: для проверки протокола и замеров из Python
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8420, path: str = '/api/ws',
+                 timeout: float = 10.0):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.stream = self.sock.makefile('rb')
+
+        key = base64.b64encode(os.urandom(16)).decode('ascii')
+        request = (
+            f"GET {path} HTTP/1.1\r\n"
+            f"Host: {host}:{port}\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\n"
+            "Sec-WebSocket-Version: 13\r\n\r\n"
+        )
+        self.sock.sendall(request.encode('ascii'))
+
+        status = self.stream.readline().decode('latin-1')
+        headers = {}
+        while True:
+            line = self.stream.readline().decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if ' 101 ' not in status or headers.get('sec-websocket-accept') != accept_key(key):
+            self.sock.close()
+            raise WebSocketError(f"handshake failed: {status.strip()}")
+
+        self._next_id = 0
+
+    def send_json(self, data: Any):
+        payload = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.sock.sendall(encode_frame(OP_TEXT, payload, mask=True))
+
+    def recv_json(self) -> Any:
+        # keepalive сервера (ping) отвечается внутри read_message
+        while True:
+            message = read_message(self.stream, self.sock.sendall, mask=True)
+            if message is None:
+                raise ConnectionError("websocket closed")
+            opcode, payload = message
+            if opcode == OP_TEXT:
+                return json.loads(payload.decode('utf-8'))
+
+    def command(self, cmd: str, **params) -> Any:
+        # отправить команду и дождаться подтверждения
+        self._next_id += 1
+        self.send_json({'id': self._next_id, 'cmd': cmd, 'params': params})
+        while True:
+            reply = self.recv_json()
+            if reply.get('type') == 'ack' and reply.get('id') == self._next_id:
+                return reply
+
+    def close(self):
+        try:
+            self.sock.sendall(encode_frame(OP_CLOSE, struct.pack('!H', CLOSE_NORMAL), mask=True))
+        except OSError:
+            pass
+        self.sock.close()
@@ -0,0 +1,173 @@
+# Бэкенд Windows
+#
+# Импортируется только через backend.create_backend('windows'). pywin32,
+# psutil, COM и keyboard по-прежнему грузятся лениво - при первом
+# обращении, а не при старте.
+
+import ctypes
+from ctypes import wintypes
+from typing import Callable, Tuple
+
+from . import autostart
+from .audiohost import AudioHost
+from .backend import AudioOutput, Backend
+from .startup import lazy_import
+
+
+class LASTINPUTINFO(ctypes.Structure):
+    _fields_ = [
+        ('cbSize', wintypes.UINT),
+        ('dwTime', wintypes.DWORD),
+    ]
+
+
+class WindowsAudio(AudioOutput):
+    # Windows Media Player через COM, без pywin32 - постоянный PowerShell хелпер
+
+    def __init__(self):
+        self._pythoncom = None
+        self._player = None
+        # общий процесс-хелпер для fallback без COM, создаётся при первом звуке
+        self._audio_host = None
+
+    def open(self):
+        self._pythoncom = lazy_import('pythoncom')
+        if self._pythoncom:
+            self._pythoncom.CoInitialize()
+
+    def play(self, file_path: str, volume: float):
+        client = lazy_import('win32com.client')
+        if client is None:
+            self._play_powershell(file_path, volume)
+            return
+        self._player = client.Dispatch("WMPlayer.OCX")
+        self._player.settings.autoStart = True
+        self._player.settings.setMode("loop", True)
+        self._player.settings.volume = int(volume * 100)
+        self._player.URL = file_path
+
+    def _play_powershell(self, file_path: str, volume: float):
+        try:
+            if self._audio_host is None:
+                self._audio_host = AudioHost()
+            self._audio_host.play(file_path, volume)
+            self._player = self._audio_host
+        except Exception as e:
+            print(f"PowerShell fallback error: {e}")
+
+    def stop(self):
+        if not self._player:
+            return
+        try:
+            if self._player is self._audio_host:
+                self._audio_host.stop()
+            else:
+                self._player.controls.stop()
+                self._player.close()
+        except Exception:
+            pass
+        self._player = None
+
+    def set_volume(self, volume: float):
+        if not self._player:
+            return
+        try:
+            if self._player is self._audio_host:
+                self._audio_host.set_volume(volume)
+            else:
+                self._player.settings.volume = int(volume * 100)
+        except Exception:
+            pass
+
+    def close(self):
+        self.stop()
+        if self._audio_host:
+            self._audio_host.close()
+            self._audio_host = None
+        if self._pythoncom:
+            self._pythoncom.CoUninitialize()
+
+
+class WindowsBackend(Backend):
+
+    name = 'windows'
+
+    def __init__(self):
+        self._last_input = LASTINPUTINFO()
+        self._last_input.cbSize = ctypes.sizeof(self._last_input)
+
+    def foreground_window(self) -> Tuple[str, str]:
+        # pywin32 и psutil грузятся при первом тике, а не при старте
+        win32gui = lazy_import('win32gui')
+        win32process = lazy_import('win32process')
+        psutil = lazy_import('psutil')
+        if not (win32gui and win32process and psutil):
+            return "", ""
+        try:
+            hwnd = win32gui.GetForegroundWindow()
+            if hwnd:
+                _, pid = win32process.GetWindowThreadProcessId(hwnd)
+                process = psutil.Process(pid)
+                window_title = win32gui.GetWindowText(hwnd)
+                return process.name().lower().replace('.exe', ''), window_title
+        except Exception:
+            pass
+        return "", ""
+
+    def idle_seconds(self) -> int:
+        ctypes.windll.user32.GetLastInputInfo(ctypes.byref(self._last_input))
+        millis = ctypes.windll.kernel32.GetTickCount() - self._last_input.dwTime
+        return millis // 1000
+
+    def set_gamma(self, r_factor: float, g_factor: float, b_factor: float):
+        try:
+            ramp = (ctypes.c_ushort * 256 * 3)()
+            for i in range(256):
+                ramp[0][i] = int(min(65535, i * 256 * r_factor))
+                ramp[1][i] = int(min(65535, i * 256 * g_factor))
+                ramp[2][i] = int(min(65535, i * 256 * b_factor))
+
+            # DC экрана
+            hdc = ctypes.windll.user32.GetDC(0)
+            ctypes.windll.gdi32.SetDeviceGammaRamp(hdc, ctypes.byref(ramp))
+            ctypes.windll.user32.ReleaseDC(0, hdc)
+        except Exception:
+            pass
+
+    def audio_output(self) -> AudioOutput:
+        return WindowsAudio()
+
+    def warm_up_audio(self):
+        # COM-стек грузится в фоне при запуске
+        if lazy_import('pythoncom'):
+            lazy_import('win32com.client')
+
+    def set_focus_assist(self, enabled: bool) -> bool:
+        if not enabled:
+            return True
+        # Focus Assist хранится в CloudStore реестра:
+        # HKCU\SOFTWARE\Microsoft\Windows\CurrentVersion\CloudStore\Store\DefaultAccount\Current\
+        #   default$windows.data.notifications.quiethourssettings\windows.data.notifications.quiethourssettings
+        # В реальной реализации здесь будет код для включения Focus Assist
+        return lazy_import('winreg') is not None
+
+    def autostart_available(self) -> bool:
+        return bool(autostart.get_exe_path())
+
+    def autostart_enabled(self) -> bool:
+        return autostart.is_autostart_enabled()
+
+    def set_autostart(self, enabled: bool) -> bool:
+        return autostart.set_autostart(enabled)
+
+    def hotkeys_available(self) -> bool:
+        # keyboard ставит хук на клавиатуру - грузим только когда нужен
+        return lazy_import('keyboard') is not None
+
+    def add_hotkey(self, hotkey: str, callback: Callable):
+        lazy_import('keyboard').add_hotkey(hotkey, callback, suppress=False)
+
+    def remove_hotkey(self, hotkey: str):
+        keyboard = lazy_import('keyboard')
+        if keyboard:
+            keyboard.remove_hotkey(hotkey)
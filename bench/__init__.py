@@ -0,0 +1 @@
+# Бенчмарки (python -m bench.http_bench)
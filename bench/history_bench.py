@@ -0,0 +1,147 @@
+# Бенчмарк истории сессий (/api/stats по диапазону)
+#
+# Генерирует год синтетических сессий (рабочие дни, переключения между
+# приложениями каждые несколько минут), пишет их в sessions.jsonl и
+# сравнивает запросы через индекс с полным проходом по всем сессиям.
+#
+#   python -m bench.history_bench --days 365 --json history.json
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List
+
+from afo.analyzer import StateAnalyzer
+from afo.history import Session, SessionStore
+
+
+APPS = [
+    ('code', 'main.py - Visual Studio Code', 30),
+    ('chrome', 'docs - Google Chrome', 12),
+    ('slack', 'Slack', 8),
+    ('figma', 'Figma', 6),
+    ('youtube', 'YouTube', 5),
+    ('telegram', 'Telegram', 4),
+    ('excel', 'report.xlsx - Excel', 5),
+]
+
+
+def generate(path: Path, days: int, seed: int = 42) -> int:
+    # год рабочих дней: 9:00-19:00 с обедом, сессии от 10 секунд до 40 минут
+    rng = random.Random(seed)
+    analyzer = StateAnalyzer()
+    weights = [w for _, _, w in APPS]
+    start_day = (datetime.now() - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for d in range(days):
+            day = start_day + timedelta(days=d)
+            if day.weekday() >= 5 and rng.random() < 0.8:
+                continue
+            moment = day.replace(hour=9).timestamp() + rng.uniform(0, 1800)
+            day_end = day.replace(hour=19).timestamp()
+            while moment < day_end:
+                app, window, _ = rng.choices(APPS, weights)[0]
+                length = min(rng.expovariate(1 / 180) + 10, 2400)
+                session = Session(
+                    start=round(moment, 3),
+                    end=round(moment + length, 3),
+                    app=app,
+                    mode=analyzer.classify(app, window).value,
+                    category=analyzer.categorize(app)
+                )
+                f.write(session.to_json() + '\n')
+                count += 1
+                # паузы между сессиями: простой, обед
+                moment += length + (rng.expovariate(1 / 30) if rng.random() < 0.9 else rng.uniform(600, 3600))
+    return count
+
+
+def full_scan(path: Path, start: float, end: float, group: str) -> Dict[str, float]:
+    # как было бы без индекса: прочитать всё и отфильтровать
+    totals: Dict[str, float] = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            s = json.loads(line)
+            part = min(s['end'], end) - max(s['start'], start)
+            if part > 0:
+                totals[s[group]] = totals.get(s[group], 0) + part
+    return totals
+
+
+def timed(fn, repeat: int) -> float:
+    # лучшее время из repeat, мс
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def run(days: int, repeat: int) -> Dict:
+    workdir = Path(tempfile.mkdtemp(prefix='afo-history-'))
+    path = workdir / 'sessions.jsonl'
+    count = generate(path, days)
+
+    store = SessionStore(path)
+    started = time.perf_counter()
+    len(store)  # построить индекс
+    load_ms = (time.perf_counter() - started) * 1000
+
+    now = time.time()
+    day = 86400
+    cases = [
+        ('today by hour', now - day, now, 'hour', 'app'),
+        ('week by day', now - 7 * day, now, 'day', 'category'),
+        ('month by day', now - 30 * day, now, 'day', 'mode'),
+        ('year by week', now - days * day, now, 'week', 'app'),
+    ]
+
+    results: List[Dict] = []
+    for name, start, end, bucket, group in cases:
+        result = store.aggregate(start, end, bucket, group, limit=1000)
+        index_ms = timed(lambda: store.aggregate(start, end, bucket, group, limit=1000), repeat)
+        scan_ms = timed(lambda: full_scan(path, start, end, group), max(1, repeat // 5))
+
+        # проверка: сумма по бакетам = полный проход с обрезкой по диапазону
+        indexed_total = sum(b['total_seconds'] for b in result['buckets'])
+        scan_total = sum(full_scan(path, start, end, group).values())
+        results.append({
+            'case': name,
+            'buckets': result['total_buckets'],
+            'index_ms': round(index_ms, 3),
+            'full_scan_ms': round(scan_ms, 3),
+            'total_matches': abs(indexed_total - scan_total) <= len(result['buckets']) * 2,
+        })
+
+    return {'sessions': count, 'days': days, 'load_ms': round(load_ms, 1), 'queries': results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='AFO session history benchmark')
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--json', type=Path, help='save results to file')
+    args = parser.parse_args(argv)
+
+    result = run(args.days, args.repeat)
+    print(f"{result['sessions']} sessions over {result['days']} days, index built in {result['load_ms']} ms")
+    print(f"{'query':16} {'buckets':>8} {'index ms':>10} {'scan ms':>10}  ok")
+    for q in result['queries']:
+        print(f"{q['case']:16} {q['buckets']:>8} {q['index_ms']:>10.3f} {q['full_scan_ms']:>10.3f}  "
+              f"{'yes' if q['total_matches'] else 'NO'}")
+
+    if args.json:
+        args.json.write_text(json.dumps(result, indent=2), encoding='utf-8')
+    return 0 if all(q['total_matches'] for q in result['queries']) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
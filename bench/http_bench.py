@@ -0,0 +1,252 @@
+# Нагрузочный тест HTTP API
+#
+# Поднимает WebServer на Orchestrator с симулированными бэкендами
+# (bench/sim.py) и гоняет по нему:
+#   - клиентов-опросчиков: каждый держит keep-alive соединение и по кругу
+#     запрашивает GET роуты, как открытая вкладка UI;
+#   - пачки POST команд (pomodoro, звук, напоминания) раз в интервал.
+#
+# Печатает пропускную способность и p50/p95/p99 по каждому роуту,
+# --json сохраняет результат для сравнения версий (--baseline).
+#
+#   python -m bench.http_bench --clients 16 --duration 10 --json out.json
+#   python -m bench.http_bench --baseline out.json
+
+import argparse
+import http.client
+import json
+import math
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from afo import __version__
+from bench.sim import build_orchestrator
+
+
+# что опрашивает вкладка UI
+POLL_ROUTES = ['/api/status', '/api/pomodoro', '/api/stats', '/api/dashboard']
+
+# (путь, тело) - пачка команд как от пользователя, жмущего кнопки
+POST_BURST: List[Tuple[str, Dict]] = [
+    ('/api/pomodoro/start', {}),
+    ('/api/pomodoro/pause', {}),
+    ('/api/pomodoro/pause', {}),
+    ('/api/sound', {'sound': 'rain', 'volume': 0.3}),
+    ('/api/sound', {'sound': 'none'}),
+    ('/api/reminders/snooze', {'id': 'water', 'minutes': 10}),
+    ('/api/pomodoro/stop', {}),
+]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    # nearest-rank
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Recorder:
+    # Замеры одного потока - без общих блокировок, сводятся в конце
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def request(self, conn: http.client.HTTPConnection, method: str, path: str,
+                body: bytes = None) -> Optional[http.client.HTTPConnection]:
+        # один запрос; при обрыве возвращает новое соединение
+        key = f"{method} {path}"
+        headers = {'Accept-Encoding': 'gzip'}
+        if body is not None:
+            headers['Content-Type'] = 'application/json'
+        started = time.perf_counter()
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            ok = response.status < 400
+        except (OSError, http.client.HTTPException):
+            ok = False
+            conn.close()
+            conn = http.client.HTTPConnection(conn.host, conn.port, timeout=conn.timeout)
+        elapsed = time.perf_counter() - started
+
+        if ok:
+            self.latencies.setdefault(key, []).append(elapsed)
+        else:
+            self.errors[key] = self.errors.get(key, 0) + 1
+        return conn
+
+
+def poll_client(port: int, stop_at: float, interval: float, recorder: Recorder):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    i = 0
+    while time.perf_counter() < stop_at:
+        path = POLL_ROUTES[i % len(POLL_ROUTES)]
+        i += 1
+        conn = recorder.request(conn, 'GET', path)
+        if interval:
+            time.sleep(interval)
+    conn.close()
+
+
+def burst_client(port: int, stop_at: float, interval: float, recorder: Recorder):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    while time.perf_counter() < stop_at:
+        for path, body in POST_BURST:
+            conn = recorder.request(conn, 'POST', path, json.dumps(body).encode('utf-8'))
+        time.sleep(interval)
+    conn.close()
+
+
+def summarize(recorders: List[Recorder], duration: float) -> Dict:
+    latencies: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    for r in recorders:
+        for key, values in r.latencies.items():
+            latencies.setdefault(key, []).extend(values)
+        for key, count in r.errors.items():
+            errors[key] = errors.get(key, 0) + count
+
+    routes = {}
+    for key in sorted(set(latencies) | set(errors)):
+        values = sorted(latencies.get(key, []))
+        routes[key] = {
+            'requests': len(values),
+            'errors': errors.get(key, 0),
+            'rps': round(len(values) / duration, 1),
+            'p50_ms': round(percentile(values, 50) * 1000, 3),
+            'p95_ms': round(percentile(values, 95) * 1000, 3),
+            'p99_ms': round(percentile(values, 99) * 1000, 3),
+            'max_ms': round((values[-1] if values else 0) * 1000, 3),
+        }
+
+    total = sum(r['requests'] for r in routes.values())
+    return {
+        'total_requests': total,
+        'total_errors': sum(r['errors'] for r in routes.values()),
+        'rps': round(total / duration, 1),
+        'routes': routes,
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, timeout=5,
+            cwd=Path(__file__).resolve().parent
+        ).stdout.strip()
+    except Exception:
+        return ''
+
+
+def run(clients: int, duration: float, poll_interval: float, burst_clients: int,
+        burst_interval: float, warmup: float) -> Dict:
+    port = free_port()
+    orch = build_orchestrator(port)
+    orch.start()
+
+    try:
+        # прогрев: трекер и анализ успевают сделать первые тики
+        time.sleep(warmup)
+
+        recorders = []
+        threads = []
+        stop_at = time.perf_counter() + duration
+        for _ in range(clients):
+            r = Recorder()
+            recorders.append(r)
+            threads.append(threading.Thread(target=poll_client, args=(port, stop_at, poll_interval, r)))
+        for _ in range(burst_clients):
+            r = Recorder()
+            recorders.append(r)
+            threads.append(threading.Thread(target=burst_client, args=(port, stop_at, burst_interval, r)))
+
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        orch.stop()
+
+    result = summarize(recorders, elapsed)
+    result['meta'] = {
+        'version': __version__,
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'params': {
+            'clients': clients,
+            'duration': duration,
+            'poll_interval': poll_interval,
+            'burst_clients': burst_clients,
+            'burst_interval': burst_interval,
+        },
+    }
+    return result
+
+
+def print_table(result: Dict, baseline: Dict = None):
+    base_routes = (baseline or {}).get('routes', {})
+    print(f"{'route':32} {'reqs':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}"
+          + ('  p99 vs base' if baseline else ''))
+    for key, r in result['routes'].items():
+        line = (f"{key:32} {r['requests']:>7} {r['errors']:>5} {r['rps']:>8} "
+                f"{r['p50_ms']:>8.3f} {r['p95_ms']:>8.3f} {r['p99_ms']:>8.3f}")
+        base = base_routes.get(key)
+        if base and base['p99_ms']:
+            change = (r['p99_ms'] - base['p99_ms']) / base['p99_ms'] * 100
+            line += f"  {change:+.1f}%"
+        print(line)
+    print(f"total: {result['total_requests']} requests, {result['total_errors']} errors, "
+          f"{result['rps']} rps")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='AFO HTTP API benchmark')
+    parser.add_argument('--clients', type=int, default=8, help='polling clients')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds')
+    parser.add_argument('--poll-interval', type=float, default=0.0,
+                        help='pause between polls, 0 = as fast as possible')
+    parser.add_argument('--burst-clients', type=int, default=2, help='POST burst clients')
+    parser.add_argument('--burst-interval', type=float, default=0.5,
+                        help='pause between POST bursts')
+    parser.add_argument('--warmup', type=float, default=1.5, help='seconds before measuring')
+    parser.add_argument('--json', type=Path, help='save results to file')
+    parser.add_argument('--baseline', type=Path, help='compare with saved results')
+    args = parser.parse_args(argv)
+
+    result = run(args.clients, args.duration, args.poll_interval,
+                 args.burst_clients, args.burst_interval, args.warmup)
+
+    baseline = None
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+    print_table(result, baseline)
+
+    if args.json:
+        args.json.write_text(json.dumps(result, indent=2), encoding='utf-8')
+        print(f"saved to {args.json}")
+
+    return 1 if result['total_errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,103 @@
+# Фоновая нагрузка простаивающего AFO
+#
+# Orchestrator с симулированными бэкендами (bench/sim.py) запускается,
+# включает звук и pomodoro и дальше просто работает: ни запросов, ни
+# вкладок. За --duration секунд меряется:
+#   - сколько живых потоков и какие;
+#   - переключения контекста (Linux - /proc/self/task/*/status,
+#     иначе psutil, если установлен);
+#   - процессорное время процесса - % одного ядра.
+#
+#   python -m bench.idle_bench --duration 20 --json out.json
+
+import argparse
+import json
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Optional
+
+from afo.environment import AmbientSound
+from bench.http_bench import free_port
+from bench.sim import build_orchestrator
+
+
+def context_switches() -> Optional[int]:
+    # добровольные + вынужденные по всем потокам процесса
+    task_dir = Path('/proc/self/task')
+    if task_dir.exists():
+        total = 0
+        for status in task_dir.glob('*/status'):
+            try:
+                for line in status.read_text().splitlines():
+                    if 'ctxt_switches:' in line:
+                        total += int(line.split(':')[1])
+            except (OSError, ValueError):
+                continue
+        return total
+    try:
+        import psutil
+    except ImportError:
+        return None
+    switches = psutil.Process().num_ctx_switches()
+    return switches.voluntary + switches.involuntary
+
+
+def thread_names() -> Dict[str, int]:
+    # имена без номеров: Thread-7 (serve_forever) -> Thread (serve_forever)
+    names = Counter()
+    for t in threading.enumerate():
+        name = t.name.split('-')[0] if t.name.startswith('Thread-') else t.name
+        names[name] += 1
+    return dict(names)
+
+
+def measure(duration: float) -> Dict:
+    orch = build_orchestrator(free_port())
+    orch.start()
+    orch.wait_ready(timeout=10)
+    orch.environment.sound.play(AmbientSound.RAIN)
+    orch.pomodoro.start()
+    # дать разойтись всему, что стартует лениво
+    time.sleep(1.0)
+
+    cpu_before = time.process_time()
+    switches_before = context_switches()
+    started = time.perf_counter()
+    time.sleep(duration)
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_before
+    switches_after = context_switches()
+
+    result = {
+        'duration': round(elapsed, 2),
+        'threads': threading.active_count(),
+        'thread_names': thread_names(),
+        'cpu_percent': round(cpu / elapsed * 100, 3),
+        'context_switches_per_sec': (round((switches_after - switches_before) / elapsed, 1)
+                                     if switches_before is not None else None),
+    }
+    orch.stop()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='AFO idle overhead benchmark')
+    parser.add_argument('--duration', type=float, default=20.0, help='seconds')
+    parser.add_argument('--json', type=Path, help='save results to file')
+    args = parser.parse_args(argv)
+
+    result = measure(args.duration)
+    print(f"threads:            {result['threads']}")
+    for name, count in sorted(result['thread_names'].items()):
+        print(f"  {name:28} {count}")
+    print(f"cpu:                {result['cpu_percent']:.3f} % of one core")
+    if result['context_switches_per_sec'] is not None:
+        print(f"context switches/s: {result['context_switches_per_sec']}")
+    if args.json:
+        args.json.write_text(json.dumps(result, indent=2), encoding='utf-8')
+
+
+if __name__ == '__main__':
+    main()
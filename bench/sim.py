@@ -0,0 +1,34 @@
+# Симуляция Windows-части для бенчмарков
+#
+# Orchestrator собирается как обычно, но с SimulatedBackend: окна и простой
+# по сценарию, гамма/звук/фокус/хоткеи только записываются - одни и те же
+# входные данные на любой машине, без win32/COM/реестра.
+
+import os
+import tempfile
+from pathlib import Path
+
+from afo.backend import SimulatedBackend
+from afo.clock import Clock
+
+
+def build_orchestrator(port: int, data_dir: Path = None, script=None, clock: Clock = None):
+    # Orchestrator с симулированным бэкендом и отдельной папкой данных;
+    # clock=VirtualClock - время двигает orch.scheduler.run_until
+    data_dir = data_dir or Path(tempfile.mkdtemp(prefix='afo-bench-'))
+    # config.json и прочее - во временную папку, не в профиль пользователя
+    os.environ['LOCALAPPDATA'] = str(data_dir)
+
+    from afo.server import Orchestrator
+
+    orch = Orchestrator(SimulatedBackend(script), clock=clock)
+    orch.server.port = port
+
+    # бэкенд файлы не читает - хватает пустых
+    sound = orch.environment.sound
+    sounds_dir = data_dir / 'sounds'
+    sounds_dir.mkdir(exist_ok=True)
+    for name in sound.sound_files.values():
+        (sounds_dir / name).touch()
+    sound.sounds_dir = sounds_dir
+    return orch
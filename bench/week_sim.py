@@ -0,0 +1,147 @@
+# Рабочая неделя за секунды
+#
+# Orchestrator целиком (трекер, анализ, окружение, напоминания, pomodoro,
+# уведомления, HTTP) на SimulatedBackend и VirtualClock: потока
+# планировщика нет, время двигает run_until, и каждый тик трекера,
+# проход анализа и таймер выполняются по порядку, как в реальности,
+# только без ожидания.
+#
+# Сценарий: 5 рабочих дней (код, доки, ютуб посреди работы, обед, вечер
+# за кодом) и 2 выходных без компьютера. Pomodoro запускается в 9:00 и
+# останавливается в 18:00, фазы идут автостартом.
+#
+# Печатает, сколько виртуального времени прошло за сколько реального,
+# и что за неделю случилось: напоминания, помидоры, прокрастинация,
+# ночной режим, уведомления. Таймеров в куче к концу не должно стать
+# больше, чем в начале, - иначе что-то течёт (меньше - нормально:
+# напоминания на время простоя снимаются).
+#
+#   python -m bench.week_sim --days 7 --json week.json
+
+import argparse
+import json
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from afo.clock import VirtualClock
+from bench.http_bench import free_port
+from bench.sim import build_orchestrator
+
+DAY = 86400
+HOUR = 3600
+MINUTE = 60
+
+# понедельник, 07:00 - начало сценария
+START = datetime(2024, 1, 1, 7, 0)
+
+# (приложение, заголовок окна, секунд); сумма - ровно сутки с 07:00
+WORKDAY: List[Tuple[str, str, int]] = [
+    ('', '', 2 * HOUR),  # утро без компьютера
+    ('code', 'server.py - AFO - Visual Studio Code', 50 * MINUTE),
+    ('chrome', 'Python docs - Google Chrome', 15 * MINUTE),
+    ('youtube', 'YouTube', 25 * MINUTE),
+    ('code', 'app.js - AFO - Visual Studio Code', 90 * MINUTE),
+    ('', '', HOUR),  # обед
+    ('figma', 'Dashboard - Figma', HOUR),
+    ('telegram', 'Telegram', 20 * MINUTE),
+    ('code', 'history.py - AFO - Visual Studio Code', 150 * MINUTE),
+    ('youtube', 'YouTube', 40 * MINUTE),
+    ('code', 'README.md - AFO - Visual Studio Code', 2 * HOUR),  # вечер
+]
+WORKDAY.append(('', '', DAY - sum(seconds for _, _, seconds in WORKDAY)))
+
+WEEKEND: List[Tuple[str, str, int]] = [('', '', DAY)]
+
+
+def week_script(days: int) -> List[Tuple[str, str, int]]:
+    # шаги сценария в тиках трекера (тик - секунда)
+    script = []
+    for day in range(days):
+        script.extend(WORKDAY if day % 7 < 5 else WEEKEND)
+    return script
+
+
+class Observer:
+    # Раз в виртуальную минуту читает то же, что видит UI
+
+    def __init__(self, orch):
+        self.orch = orch
+        self.cursor = 0
+        self.notifications = Counter()
+        self.night_mode_on = 0
+        self._night = False
+
+    def poll(self):
+        items, self.cursor = self.orch.notifications.since(self.cursor)
+        for item in items:
+            self.notifications[item.get('type', item['id'])] += 1
+        night = self.orch.environment.state.night_mode_active
+        if night and not self._night:
+            self.night_mode_on += 1
+        self._night = night
+
+
+def simulate(days: int) -> Dict:
+    clock = VirtualClock(start=START.timestamp())
+    orch = build_orchestrator(free_port(), script=week_script(days), clock=clock)
+    scheduler = orch.scheduler
+    orch.start()
+    orch.wait_ready(timeout=10)
+    orch.config.patch({'pomodoro': {'auto_start_breaks': True, 'auto_start_work': True}})
+
+    for day in range(days):
+        if day % 7 < 5:
+            scheduler.call_at(day * DAY + 2 * HOUR, orch.pomodoro.start)
+            scheduler.call_at(day * DAY + 11 * HOUR, orch.pomodoro.stop)
+
+    observer = Observer(orch)
+    scheduler.every(MINUTE, observer.poll, delay=MINUTE)
+    pending_before = scheduler.pending()
+
+    started = time.perf_counter()
+    timers = scheduler.run_until(days * DAY)
+    elapsed = time.perf_counter() - started
+
+    backend = orch.backend
+    result = {
+        'days': days,
+        'wall_seconds': round(elapsed, 2),
+        'speedup': round(days * DAY / elapsed),
+        'timers': timers,
+        'timers_per_sec': round(timers / elapsed),
+        'pending_timers': {'start': pending_before, 'end': scheduler.pending()},
+        'pomodoros': {day['date']: day['pomodoros'] for day in orch.pomodoro.get_history(days)},
+        'notifications': dict(observer.notifications),
+        'night_mode_on': observer.night_mode_on,
+        'gamma_changes': len(backend.gamma),
+        'audio_commands': len(backend.audio),
+        'sessions': len(orch.history),
+    }
+    orch.stop()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='AFO simulated work week')
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--json', type=Path, help='save results to file')
+    args = parser.parse_args(argv)
+
+    result = simulate(args.days)
+    print(f"{result['days']} days in {result['wall_seconds']} s "
+          f"(x{result['speedup']}), {result['timers']} timers, {result['timers_per_sec']}/s")
+    print(f"pending timers:     {result['pending_timers']['start']} -> {result['pending_timers']['end']}")
+    print(f"pomodoros:          {result['pomodoros']}")
+    print(f"notifications:      {result['notifications']}")
+    print(f"night mode on:      {result['night_mode_on']} times, gamma changes {result['gamma_changes']}")
+    print(f"audio commands:     {result['audio_commands']}")
+    print(f"sessions:           {result['sessions']}")
+    if args.json:
+        args.json.write_text(json.dumps(result, indent=2), encoding='utf-8')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+# Задержка команд: WebSocket против POST
+#
+# Одна и та же пачка команд (pomodoro, звук, напоминания) гоняется по
+# кругу двумя путями к одному Orchestrator на симулированных бэкендах:
+#   - POST /api/... по keep-alive соединению, как fetch из UI без WS;
+#   - сообщения {"cmd": ...} по /api/ws, ответ - ack.
+# Клиенты идут по очереди, каждый со своим соединением; печатаются
+# p50/p95/p99 по каждой команде и для каждого пути, плюс отношение WS/POST.
+#
+#   python -m bench.ws_bench --rounds 500 --json ws.json
+
+import argparse
+import http.client
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from afo.websocket import WebSocketClient
+from bench.http_bench import free_port, percentile
+from bench.sim import build_orchestrator
+
+
+# (команда WS, роут POST, параметры)
+COMMANDS: List[Tuple[str, str, Dict]] = [
+    ('pomodoro.start', '/api/pomodoro/start', {}),
+    ('pomodoro.pause', '/api/pomodoro/pause', {}),
+    ('pomodoro.pause', '/api/pomodoro/pause', {}),
+    ('sound', '/api/sound', {'sound': 'rain', 'volume': 0.3}),
+    ('sound', '/api/sound', {'sound': 'none'}),
+    ('reminders.snooze', '/api/reminders/snooze', {'id': 'water', 'minutes': 10}),
+    ('pomodoro.stop', '/api/pomodoro/stop', {}),
+]
+
+
+def run_post(port: int, rounds: int) -> Tuple[Dict[str, List[float]], int]:
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    latencies: Dict[str, List[float]] = {}
+    errors = 0
+    for _ in range(rounds):
+        for cmd, path, params in COMMANDS:
+            body = json.dumps(params).encode('utf-8')
+            started = time.perf_counter()
+            conn.request('POST', path, body=body, headers={'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            response.read()
+            elapsed = time.perf_counter() - started
+            if response.status >= 400:
+                errors += 1
+            else:
+                latencies.setdefault(cmd, []).append(elapsed)
+    conn.close()
+    return latencies, errors
+
+
+def run_ws(port: int, rounds: int) -> Tuple[Dict[str, List[float]], int]:
+    client = WebSocketClient(port=port)
+    latencies: Dict[str, List[float]] = {}
+    errors = 0
+    for _ in range(rounds):
+        for cmd, _, params in COMMANDS:
+            started = time.perf_counter()
+            reply = client.command(cmd, **params)
+            elapsed = time.perf_counter() - started
+            if not reply.get('ok'):
+                errors += 1
+            else:
+                latencies.setdefault(cmd, []).append(elapsed)
+    client.close()
+    return latencies, errors
+
+
+def stats(values: List[float]) -> Dict:
+    values = sorted(values)
+    return {
+        'requests': len(values),
+        'p50_ms': round(percentile(values, 50) * 1000, 3),
+        'p95_ms': round(percentile(values, 95) * 1000, 3),
+        'p99_ms': round(percentile(values, 99) * 1000, 3),
+    }
+
+
+def run(rounds: int, warmup: int) -> Dict:
+    port = free_port()
+    orch = build_orchestrator(port)
+    orch.start()
+    orch.wait_ready(timeout=10)
+    try:
+        run_post(port, warmup)
+        run_ws(port, warmup)
+        post, post_errors = run_post(port, rounds)
+        ws, ws_errors = run_ws(port, rounds)
+    finally:
+        orch.stop()
+
+    result = {'rounds': rounds, 'errors': {'post': post_errors, 'ws': ws_errors}, 'commands': {}}
+    for cmd in dict.fromkeys(cmd for cmd, _, _ in COMMANDS):
+        result['commands'][cmd] = {'post': stats(post.get(cmd, [])), 'ws': stats(ws.get(cmd, []))}
+    result['total'] = {
+        'post': stats([v for values in post.values() for v in values]),
+        'ws': stats([v for values in ws.values() for v in values]),
+    }
+    return result
+
+
+def print_table(result: Dict):
+    print(f"{'command':20} {'post p50':>9} {'ws p50':>9} {'post p99':>9} {'ws p99':>9} {'ws/post p50':>12}")
+    rows = list(result['commands'].items()) + [('total', result['total'])]
+    for cmd, r in rows:
+        post, ws = r['post'], r['ws']
+        ratio = ws['p50_ms'] / post['p50_ms'] if post['p50_ms'] else 0
+        print(f"{cmd:20} {post['p50_ms']:>9.3f} {ws['p50_ms']:>9.3f} "
+              f"{post['p99_ms']:>9.3f} {ws['p99_ms']:>9.3f} {ratio:>12.2f}")
+    errors = result['errors']
+    print(f"errors: post {errors['post']}, ws {errors['ws']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='AFO command latency: WebSocket vs POST')
+    parser.add_argument('--rounds', type=int, default=300, help='command bursts per transport')
+    parser.add_argument('--warmup', type=int, default=20, help='bursts before measuring')
+    parser.add_argument('--json', type=Path, help='save results to file')
+    args = parser.parse_args(argv)
+
+    result = run(args.rounds, args.warmup)
+    print_table(result)
+    if args.json:
+        args.json.write_text(json.dumps(result, indent=2), encoding='utf-8')
+    return 1 if result['errors']['post'] or result['errors']['ws'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
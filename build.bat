@@ -23,6 +23,10 @@ pyinstaller --noconfirm ^
     --hidden-import=win32gui ^
     --hidden-import=win32process ^
     --hidden-import=psutil ^
+    --hidden-import=keyboard ^
+    --hidden-import=pythoncom ^
+    --hidden-import=win32com.client ^
+    --hidden-import=afo.win32 ^
     afo/main.py
 
 if exist "dist\AFO.exe" (
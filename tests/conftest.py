@@ -0,0 +1,51 @@
+# Общие фикстуры: временная папка данных и виртуальное время
+
+import socket
+from datetime import datetime
+
+import pytest
+
+from afo.clock import VirtualClock
+from afo.scheduler import Scheduler
+
+# понедельник, 09:00
+START = datetime(2024, 1, 1, 9, 0).timestamp()
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    # config.json и прочие файлы - во временную папку, не в профиль
+    monkeypatch.setenv('LOCALAPPDATA', str(tmp_path))
+    return tmp_path / 'AmbientFlowOrchestrator'
+
+
+@pytest.fixture
+def clock():
+    return VirtualClock(start=START)
+
+
+@pytest.fixture
+def scheduler(clock):
+    scheduler = Scheduler(clock)
+    yield scheduler
+    scheduler.close()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def orchestrator(data_dir):
+    # Orchestrator целиком на симулированном бэкенде, HTTP на свободном порту
+    from afo.backend import SimulatedBackend
+    from afo.server import Orchestrator
+
+    orch = Orchestrator(SimulatedBackend())
+    orch.server.port = free_port()
+    orch.start()
+    orch.wait_ready(timeout=10)
+    yield orch
+    orch.stop()
@@ -0,0 +1,62 @@
+import pytest
+
+from afo.analyzer import StateAnalyzer, UserMode
+from afo.config import Config
+
+
+def test_modes_by_default_lists():
+    analyzer = StateAnalyzer()
+    assert analyzer.classify('code') == UserMode.DEEP_WORK
+    assert analyzer.classify('telegram') == UserMode.COMMUNICATION
+    assert analyzer.classify('spotify') == UserMode.ENTERTAINMENT
+    assert analyzer.classify('audacity') == UserMode.CREATIVE
+    assert analyzer.classify('chrome', 'Issue #1 - GitHub') == UserMode.RESEARCH
+    assert analyzer.classify('chrome', 'YouTube') == UserMode.ENTERTAINMENT
+    assert analyzer.classify('unknown') == UserMode.IDLE
+
+
+def test_app_lists_from_settings_extend_detection():
+    analyzer = StateAnalyzer()
+    analyzer.set_app_lists(work_apps=['xcode'], entertainment_apps=['solitaire'])
+    assert analyzer.classify('xcode') == UserMode.DEEP_WORK
+    assert analyzer.classify('solitaire') == UserMode.ENTERTAINMENT
+    # встроенные списки для режима остаются, категория - только по настройкам
+    assert analyzer.classify('vlc') == UserMode.ENTERTAINMENT
+    assert analyzer.categorize('vlc') == 'other'
+    assert analyzer.categorize('xcode') == 'work'
+
+
+@pytest.fixture
+def configured():
+    # как в Orchestrator: списки из Config по умолчанию
+    config = Config()
+    return StateAnalyzer(config.work_apps, config.entertainment_apps)
+
+
+@pytest.mark.parametrize('app, window, mode', [
+    # браузеры и мессенджеры есть в work_apps, но режим по заголовку/типу
+    ('chrome', 'YouTube - Google Chrome', UserMode.ENTERTAINMENT),
+    ('msedge', 'Reddit - Microsoft Edge', UserMode.ENTERTAINMENT),
+    ('chrome', 'Issue #1 - GitHub', UserMode.RESEARCH),
+    ('firefox', 'Новая вкладка', UserMode.RESEARCH),
+    ('chrome', 'Video editor', UserMode.CREATIVE),
+    ('slack', '', UserMode.COMMUNICATION),
+    ('teams', '', UserMode.COMMUNICATION),
+    ('zoom', '', UserMode.COMMUNICATION),
+    # audacity есть в entertainment_apps
+    ('audacity', '', UserMode.CREATIVE),
+    ('code', 'server.py', UserMode.DEEP_WORK),
+    ('pycharm', 'edit video.py', UserMode.DEEP_WORK),
+    ('spotify', '', UserMode.ENTERTAINMENT),
+    # в настройках по умолчанию нет - режим по встроенным спискам
+    ('unity', '', UserMode.DEEP_WORK),
+    ('youtube', '', UserMode.ENTERTAINMENT),
+])
+def test_modes_with_config_lists(configured, app, window, mode):
+    assert configured.classify(app, window) == mode
+
+
+def test_categories_with_config_lists(configured):
+    assert configured.categorize('chrome') == 'work'
+    assert configured.categorize('slack') == 'work'
+    assert configured.categorize('spotify') == 'entertainment'
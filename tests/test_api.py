@@ -0,0 +1,158 @@
+import http.client
+import json
+import socket
+import time
+
+import pytest
+
+from afo import websocket
+
+
+@pytest.fixture
+def api(orchestrator):
+    conn = http.client.HTTPConnection('127.0.0.1', orchestrator.server.port, timeout=5)
+
+    def request(method, path, body=None):
+        conn.request(method, path, body=json.dumps(body) if body is not None else None,
+                     headers={'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        return response.status, json.loads(response.read() or b'null')
+
+    yield request
+    conn.close()
+
+
+def test_pomodoro_settings_validated(api, orchestrator):
+    status, body = api('POST', '/api/pomodoro', {'work_minutes': 'abc', 'auto_start_work': True})
+    assert status == 422
+    assert [e['path'] for e in body['errors']] == ['/pomodoro/work_minutes']
+    # неверный патч не применяется целиком
+    assert orchestrator.config.config.pomodoro.work_minutes == 25
+    assert orchestrator.config.config.pomodoro.auto_start_work is False
+
+    # таймер по-прежнему запускается
+    status, _ = api('POST', '/api/pomodoro/start', {})
+    assert status == 200
+
+    status, body = api('POST', '/api/pomodoro', {'work_minutes': 50})
+    assert status == 200
+    assert body['changed'] == ['pomodoro.work_minutes']
+    assert orchestrator.pomodoro.settings.work_minutes == 50
+
+
+def test_procrastination_settings_validated(api, orchestrator):
+    status, body = api('POST', '/api/procrastination', {'work_hours_start': '25:99', 'warning_threshold_minutes': 0})
+    assert status == 422
+    assert {e['path'] for e in body['errors']} == {'/procrastination/work_hours_start',
+                                                  '/procrastination/warning_threshold_minutes'}
+
+    status, _ = api('POST', '/api/procrastination', {'work_hours_start': '08:30'})
+    assert status == 200
+    assert api('GET', '/api/procrastination')[1]['work_hours_start'] == '08:30'
+
+
+def test_reminder_by_id_validated(api, orchestrator):
+    status, body = api('POST', '/api/reminders', {'reminder_id': 'water', 'interval_minutes': 'soon'})
+    assert status == 422
+    assert body['errors'][0]['path'] == '/reminders/water/interval_minutes'
+
+    status, _ = api('POST', '/api/reminders', {'reminder_id': 'water', 'interval_minutes': 5,
+                                               'reminder_enabled': True})
+    assert status == 200
+    water = next(r for r in api('GET', '/api/reminders')[1]['reminders'] if r['id'] == 'water')
+    assert water['interval_minutes'] == 5
+    assert water['next_in_seconds'] <= 5 * 60
+
+
+def test_custom_reminders_through_config(api, orchestrator):
+    status, body = api('POST', '/api/reminders', {'add_custom': {'name': 'Чай', 'interval_minutes': 0}})
+    assert status == 422
+    assert body['errors'][0]['path'].endswith('/interval_minutes')
+    assert orchestrator.config.config.reminders.custom == []
+
+    status, _ = api('POST', '/api/reminders', {'add_custom': {'name': 'Чай', 'interval_minutes': 40}})
+    assert status == 200
+    [tea] = orchestrator.config.config.reminders.custom
+    reminders = api('GET', '/api/reminders')[1]['reminders']
+    assert 39 * 60 < next(r for r in reminders if r['id'] == tea.id)['next_in_seconds'] <= 40 * 60
+
+    status, _ = api('POST', '/api/reminders', {'reminder_id': tea.id, 'interval_minutes': 'x'})
+    assert status == 422
+    status, _ = api('POST', '/api/reminders', {'reminder_id': tea.id, 'interval_minutes': 10})
+    assert status == 200
+    assert orchestrator.config.config.reminders.custom[0].interval_minutes == 10
+
+    status, _ = api('POST', '/api/reminders', {'remove_custom': tea.id})
+    assert status == 200
+    assert orchestrator.config.config.reminders.custom == []
+    assert all(r['id'] != tea.id for r in api('GET', '/api/reminders')[1]['reminders'])
+
+
+def open_sse(port):
+    sock = socket.create_connection(('127.0.0.1', port), timeout=5)
+    sock.sendall(b'GET /api/events HTTP/1.1\r\nHost: localhost\r\n\r\n')
+    stream = sock.makefile('rb')
+    assert stream.readline().startswith(b'HTTP/1.1 200')
+    while stream.readline().strip():
+        pass
+    return sock
+
+
+def test_streams_and_idle_keepalive_do_not_take_request_slots(orchestrator, api):
+    port = orchestrator.server.port
+    workers = orchestrator.server.server.max_workers
+    # вкладки: SSE, WebSocket и простаивающие keep-alive соединения
+    sockets = [open_sse(port) for _ in range(workers)]
+    clients = [websocket.WebSocketClient(port=port, timeout=5) for _ in range(workers // 2)]
+    idle = []
+    for _ in range(workers):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+        conn.request('GET', '/api/ready')
+        conn.getresponse().read()
+        idle.append(conn)
+    try:
+        started = time.monotonic()
+        status, _ = api('GET', '/api/pomodoro')
+        assert status == 200
+        assert time.monotonic() - started < 1
+        # и сами потоки работают
+        assert clients[-1].command('pomodoro.start')['ok'] is True
+    finally:
+        for sock in sockets:
+            sock.close()
+        for client in clients:
+            client.close()
+        for conn in idle:
+            conn.close()
+
+
+@pytest.fixture
+def idle_orchestrator(data_dir, clock):
+    # без сервера и потоков: трекер тикает по виртуальным часам
+    from afo.backend import SimulatedBackend
+    from afo.server import Orchestrator
+
+    orch = Orchestrator(SimulatedBackend([('code', 'server.py', 2), ('', '', 10)]), clock=clock)
+    orch.tracker.start()
+    yield orch
+    orch.tracker.stop()
+    orch.config.close()
+    orch.scheduler.close()
+
+
+def test_status_snapshot_is_not_stale_while_idle_grows(idle_orchestrator):
+    orch = idle_orchestrator
+    snapshots = []
+    for _ in range(8):
+        orch.scheduler.advance(orch.tracker.TICK_INTERVAL)
+        snapshot = orch.status_snapshot()
+        snapshots.append((snapshot.etag, json.loads(snapshot.body)['activity']))
+
+    # простой растёт с каждым тиком, а тело снимка не устаревает:
+    # 304 отдаётся, только пока в ответе действительно ничего не поменялось
+    for (etag, activity), (next_etag, next_activity) in zip(snapshots, snapshots[1:]):
+        assert 'idle_seconds' not in activity
+        assert (etag == next_etag) == (activity == next_activity)
+    levels = [activity['activity_level'] for _, activity in snapshots]
+    assert levels[0] == 'high' and levels[-1] == 'idle'
+    assert snapshots[-1][1]['is_idle'] is True
@@ -0,0 +1,95 @@
+import time
+
+import pytest
+
+from afo.audiohost import AudioHost, stub_command
+
+
+@pytest.fixture
+def host():
+    host = AudioHost(stub_command())
+    yield host
+    host.close()
+
+
+def wait_for(host, predicate, timeout=5.0):
+    # ответы приходят из потока чтения - ждём нужный
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        for reply in list(host.replies):
+            if predicate(reply):
+                return reply
+        time.sleep(0.01)
+    raise AssertionError(f"no reply, got {host.replies}")
+
+
+def state(host):
+    host.replies.clear()
+    host._send('state')
+    _, _, playing, volume, file = wait_for(host, lambda r: r.startswith('ok state')).split(' ', 4)
+    return playing == '1', float(volume), file
+
+
+def test_commands_get_ok_replies(host):
+    host.play('/sounds/rain.mp3', volume=0.5)
+    wait_for(host, lambda r: r == 'ok play')
+    assert host.replies[:3] == ['ready', 'ok volume', 'ok play']
+    assert state(host) == (True, 0.5, '/sounds/rain.mp3')
+
+    host.set_volume(0.25)
+    assert state(host) == (True, 0.25, '/sounds/rain.mp3')
+
+    host.stop()
+    wait_for(host, lambda r: r == 'ok stop')
+    assert state(host)[0] is False
+
+
+def test_bad_commands_get_err_replies(host):
+    host._send('volume loud')
+    assert wait_for(host, lambda r: r.startswith('err')) == 'err bad volume loud'
+    host._send('rewind')
+    assert wait_for(host, lambda r: r.startswith('err unknown')) == 'err unknown command rewind'
+    # хелпер жив и принимает дальше
+    host.set_volume(0.4)
+    assert state(host)[1] == 0.4
+
+
+def test_restart_after_kill_restores_sound(host):
+    host.play('/sounds/fire.mp3', volume=0.7)
+    wait_for(host, lambda r: r == 'ok play')
+    first = host._proc
+
+    first.kill()
+    first.wait()
+    # поток чтения видит EOF, поднимает процесс и возвращает звук
+    deadline = time.monotonic() + 5
+    while (host._proc is first or not host.is_alive()) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert host.is_alive() and host._proc is not first
+    assert state(host) == (True, 0.7, '/sounds/fire.mp3')
+
+
+def test_restart_after_kill_while_stopped_waits_for_command(host):
+    host.play('/sounds/fire.mp3', volume=0.6)
+    host.stop()
+    wait_for(host, lambda r: r == 'ok stop')
+    proc = host._proc
+
+    proc.kill()
+    proc.wait()
+    time.sleep(0.2)
+    # ничего не играло - процесс поднимется только при следующей команде
+    assert not host.is_alive()
+
+    host.play('/sounds/cafe.mp3')
+    assert state(host) == (True, 0.6, '/sounds/cafe.mp3')
+
+
+def test_close_sends_quit(host):
+    host.play('/sounds/rain.mp3')
+    wait_for(host, lambda r: r == 'ok play')
+    proc = host._proc
+    host.close()
+    assert proc.wait(timeout=2) == 0
+    wait_for(host, lambda r: r == 'ok quit')
+    assert not host.is_alive()
@@ -0,0 +1,111 @@
+import json
+import time
+
+from afo.config import ConfigManager
+from afo.reminders import ReminderManager
+
+import pytest
+
+
+@pytest.fixture
+def config(data_dir):
+    manager = ConfigManager()
+    yield manager
+    manager.close()
+
+
+def test_null_section_resets_in_place(config):
+    reminders = config.config.reminders
+    pomodoro = config.config.pomodoro
+    config.patch({'reminders': {'water': {'interval_minutes': 5}}, 'pomodoro': {'work_minutes': 50}})
+
+    changes = config.patch({'reminders': None, 'pomodoro': None})
+
+    assert config.config.reminders is reminders
+    assert config.config.pomodoro is pomodoro
+    assert reminders.water.interval_minutes == 30
+    assert pomodoro.work_minutes == 25
+    # только реально изменившиеся листья
+    assert sorted(c.key for c in changes) == ['pomodoro.work_minutes', 'reminders.water.interval_minutes']
+
+
+def test_null_nested_object_keeps_section_defaults(config):
+    water = config.config.reminders.water
+    config.patch({'reminders': {'water': {'interval_minutes': 5, 'message': 'x'}}})
+
+    config.patch({'reminders': {'water': None}})
+
+    assert config.config.reminders.water is water
+    assert water.id == 'water'
+    assert water.interval_minutes == 30
+    assert water.message != 'x'
+
+
+def test_subscriber_sees_patches_after_section_reset(config, scheduler):
+    manager = ReminderManager(config.config.reminders, scheduler=scheduler)
+    config.subscribe(manager.apply_changes, 'reminders')
+
+    config.patch({'reminders': None})
+    config.patch({'reminders': {'water': {'interval_minutes': 5}}})
+
+    assert manager.settings is config.config.reminders
+    water = next(r for r in manager.get_status()['reminders'] if r['id'] == 'water')
+    assert water['interval_minutes'] == 5
+    assert water['next_in_seconds'] == 5 * 60
+
+
+def edit_outside(config, section, **fields):
+    # админ правит config.json, пока у нас висит отложенная запись
+    data = json.loads(config.config_path.read_text(encoding='utf-8'))
+    data[section].update(fields)
+    config.config_path.write_text(json.dumps(data), encoding='utf-8')
+
+
+def saved(config):
+    return json.loads(config.config_path.read_text(encoding='utf-8'))
+
+
+def test_reload_keeps_pending_changes_of_other_fields(config):
+    config.patch({'pomodoro': {'work_minutes': 30}})
+    config.flush()
+    config.patch({'pomodoro': {'short_break_minutes': 10}})
+
+    edit_outside(config, 'pomodoro', work_minutes=45)
+    config.reload()
+    config.flush()
+
+    assert config.config.pomodoro.work_minutes == 45
+    assert config.config.pomodoro.short_break_minutes == 10
+    assert saved(config)['pomodoro']['work_minutes'] == 45
+    assert saved(config)['pomodoro']['short_break_minutes'] == 10
+
+
+def test_reload_drops_pending_write_of_the_same_field(config):
+    config.patch({'pomodoro': {'work_minutes': 30}})
+    config.flush()
+    written = config.write_stats()['written']
+    config.patch({'pomodoro': {'work_minutes': 50}})
+
+    edit_outside(config, 'pomodoro', work_minutes=45)
+    config.reload()
+    # отложенная запись отменена и файл не затирает
+    config.flush()
+    time.sleep(config.SAVE_DELAY + 0.2)
+
+    assert config.config.pomodoro.work_minutes == 45
+    assert saved(config)['pomodoro']['work_minutes'] == 45
+    assert config.write_stats()['written'] == written
+
+
+def test_pending_write_rebases_on_edit_not_yet_reloaded(config):
+    # правка снаружи раньше, чем её заметил watcher
+    config.patch({'pomodoro': {'work_minutes': 30}})
+    config.flush()
+    config.patch({'pomodoro': {'long_break_minutes': 20}})
+
+    edit_outside(config, 'display', color_temperature=3000)
+    config.flush()
+
+    assert config.config.display.color_temperature == 3000
+    assert saved(config)['display']['color_temperature'] == 3000
+    assert saved(config)['pomodoro']['long_break_minutes'] == 20
@@ -0,0 +1,118 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from afo.history import MAX_BUCKETS, BucketGrid, IntervalIndex, Session, SessionStore, bucket_floor, parse_time
+
+
+def all_edges(start, end, bucket):
+    # как раньше: все границы подряд
+    step = {'hour': timedelta(hours=1), 'day': timedelta(days=1), 'week': timedelta(weeks=1)}[bucket]
+    current = bucket_floor(datetime.fromtimestamp(start), bucket)
+    edges = [current.timestamp()]
+    while edges[-1] < end:
+        current += step
+        edges.append(current.timestamp())
+    return edges
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SessionStore(tmp_path / 'sessions.jsonl')
+
+
+@pytest.mark.parametrize('bucket', ['hour', 'day', 'week'])
+def test_grid_matches_full_edge_list(bucket):
+    start = datetime(2023, 3, 1, 10, 30).timestamp()
+    end = datetime(2023, 11, 20, 8, 15).timestamp()
+    expected = all_edges(start, end, bucket)
+    grid = BucketGrid(start, end, bucket)
+
+    assert grid.count == len(expected) - 1
+    assert grid.edges(0, 5) == expected[:6]
+    assert grid.edges(grid.count - 3, 100) == expected[-4:]
+    assert grid.edges(grid.count, 10) == []
+
+
+def test_aggregate_pages_a_long_range_without_all_edges(store):
+    day = datetime(2024, 1, 1, 10).timestamp()
+    store.append(Session(start=day, end=day + 1800, app='code', mode='deep_work', category='work'))
+
+    start = datetime(2015, 1, 1).timestamp()
+    end = datetime(2024, 12, 31).timestamp()
+    result = store.aggregate(start, end, bucket='hour', offset=0, limit=10)
+
+    assert result['total_buckets'] > 80_000
+    assert len(result['buckets']) == 10
+    # страница с нужным часом: номер бакета, в который попадает day
+    offset = BucketGrid(start, day + 1, 'hour').count - 1
+    page = store.aggregate(start, end, bucket='hour', offset=offset, limit=1)
+    assert page['buckets'][0]['total_seconds'] == 1800
+
+
+def test_aggregate_rejects_too_many_buckets(store):
+    end = datetime(2024, 1, 1).timestamp()
+    start = end - (MAX_BUCKETS + 10) * 3600
+    with pytest.raises(ValueError, match='range too large'):
+        store.aggregate(start, end, bucket='hour')
+    # тот же диапазон по дням - можно
+    assert store.aggregate(start, end, bucket='day')['total_buckets'] < MAX_BUCKETS
+
+
+def test_index_matches_full_scan():
+    rng = random.Random(7)
+    index = IntervalIndex()
+    sessions = []
+    for _ in range(2000):
+        start = rng.uniform(0, 30 * 86400)
+        # в основном короткие, иногда ночные и многодневные
+        length = rng.choice([rng.uniform(0, 600), rng.uniform(0, 4 * 3600), rng.uniform(0, 3 * 86400), 0])
+        session = Session(start=start, end=start + length, app='code', mode='deep_work', category='work')
+        sessions.append(session)
+        index.add(session)
+
+    assert len(index) == len(sessions)
+    assert [s.start for s in index] == sorted(s.start for s in sessions)
+    for _ in range(200):
+        start = rng.uniform(-86400, 31 * 86400)
+        end = start + rng.choice([60, 3600, 86400, 7 * 86400])
+        expected = sorted((s for s in sessions if s.start < end and s.end > start), key=lambda s: s.start)
+        assert list(index.overlapping(start, end)) == expected
+
+
+class CountedSession(Session):
+    # сколько раз индекс смотрел на конец сессии
+    checked = 0
+
+    def __getattribute__(self, name):
+        if name == 'end':
+            CountedSession.checked += 1
+        return super().__getattribute__(name)
+
+
+def test_long_session_does_not_widen_every_scan():
+    index = IntervalIndex()
+    # ночь без выхода из приложения, потом неделя коротких сессий
+    index.add(CountedSession(start=0, end=12 * 3600, app='code', mode='deep_work', category='work'))
+    for i in range(5000):
+        start = 12 * 3600 + i * 120
+        index.add(CountedSession(start=start, end=start + 60, app='code', mode='deep_work', category='work'))
+
+    last = 12 * 3600 + 4990 * 120
+    CountedSession.checked = 0
+    found = list(index.overlapping(last, last + 600))
+    assert len(found) == 5
+    # просмотрены соседи по классу длины, а не 12 часов сессий
+    assert CountedSession.checked < 20
+
+
+@pytest.mark.parametrize('value', ['inf', '-inf', 'nan', '1e300'])
+def test_parse_time_rejects_non_finite_and_out_of_range(value):
+    with pytest.raises(ValueError):
+        parse_time(value)
+
+
+def test_parse_time_accepts_unix_and_iso():
+    assert parse_time(' 1700000000.5 ') == 1700000000.5
+    assert parse_time('2024-01-01T09:00') == datetime(2024, 1, 1, 9).timestamp()
@@ -0,0 +1,198 @@
+import sys
+import threading
+
+from afo.config import PomodoroSettings
+from afo.pomodoro import PomodoroPhase, PomodoroStore, PomodoroTimer
+from afo.scheduler import Scheduler
+
+import pytest
+
+WORK = 25 * 60
+SHORT = 5 * 60
+LONG = 15 * 60
+
+
+@pytest.fixture
+def store_dir(data_dir):
+    data_dir.mkdir(parents=True, exist_ok=True)
+    return data_dir
+
+
+def make_timer(scheduler, store_dir=None, **settings):
+    store = PomodoroStore(store_dir) if store_dir else None
+    return PomodoroTimer(PomodoroSettings(**settings), scheduler=scheduler, store=store)
+
+
+def test_work_ends_in_short_break(scheduler):
+    timer = make_timer(scheduler)
+    phases = []
+    timer.set_callbacks(on_phase_complete=lambda prev, nxt: phases.append((prev, nxt)))
+
+    timer.start()
+    scheduler.advance(WORK - 1)
+    assert timer.state.phase == PomodoroPhase.WORK
+    assert timer.seconds_left == 1
+
+    scheduler.advance(1)
+    assert phases == [(PomodoroPhase.WORK, PomodoroPhase.SHORT_BREAK)]
+    # без автостарта перерыв ждёт нажатия
+    assert not timer.state.running
+    assert timer.seconds_left == SHORT
+    assert timer.get_status()['completed_today'] == 1
+
+
+def test_auto_start_cycles_to_long_break(scheduler):
+    timer = make_timer(scheduler, auto_start_breaks=True, auto_start_work=True)
+    phases = []
+    timer.set_callbacks(on_phase_complete=lambda prev, nxt: phases.append(nxt))
+
+    timer.start()
+    # 4 помидора и 3 коротких перерыва, четвёртый перерыв - длинный
+    scheduler.advance(4 * WORK + 3 * SHORT)
+    assert phases == [PomodoroPhase.SHORT_BREAK, PomodoroPhase.WORK] * 3 + [PomodoroPhase.LONG_BREAK]
+    assert timer.state.running
+    assert timer.state.current_pomodoro == 0
+    assert timer.seconds_left == LONG
+
+    scheduler.advance(LONG)
+    assert timer.state.phase == PomodoroPhase.WORK
+    status = timer.get_status()
+    assert status['completed_today'] == 4
+    assert status['total_work_minutes'] == 100
+    assert status['total_break_minutes'] == 30
+
+
+def test_pause_freezes_remaining(scheduler):
+    timer = make_timer(scheduler)
+    timer.start()
+    scheduler.advance(10 * 60)
+
+    timer.pause()
+    assert scheduler.pending() == 0
+    scheduler.advance(3600)
+    assert timer.state.phase == PomodoroPhase.WORK
+    assert timer.seconds_left == WORK - 10 * 60
+
+    timer.resume()
+    scheduler.advance(WORK - 10 * 60 - 1)
+    assert timer.state.phase == PomodoroPhase.WORK
+    scheduler.advance(1)
+    assert timer.state.phase == PomodoroPhase.SHORT_BREAK
+
+
+def test_pause_resume_completes_once(scheduler):
+    # таймер от отменённого отсчёта не завершает фазу второй раз
+    timer = make_timer(scheduler)
+    completed = []
+    timer.set_callbacks(on_pomodoro_complete=completed.append)
+    timer.start()
+    scheduler.advance(60)
+    timer.pause()
+    timer.resume()
+    timer.start()
+    scheduler.advance(WORK)
+    assert completed == [1]
+
+
+def test_restore_running_phase(clock, store_dir):
+    first = Scheduler(clock)
+    timer = make_timer(first, store_dir)
+    timer.start()
+    first.advance(10 * 60)
+    timer.close()
+    first.close()
+
+    # приложение закрыто две минуты
+    clock.advance(120)
+    second = Scheduler(clock)
+    try:
+        restored = make_timer(second, store_dir)
+        assert restored.state.phase == PomodoroPhase.WORK
+        assert restored.state.running
+        assert restored.seconds_left == WORK - 12 * 60
+
+        second.advance(WORK - 12 * 60)
+        assert restored.state.phase == PomodoroPhase.SHORT_BREAK
+        assert restored.get_status()['completed_today'] == 1
+        restored.close()
+    finally:
+        second.close()
+
+
+def test_restore_paused_phase(clock, store_dir):
+    first = Scheduler(clock)
+    timer = make_timer(first, store_dir)
+    timer.start()
+    first.advance(5 * 60)
+    timer.pause()
+    timer.close()
+    first.close()
+
+    clock.advance(3600)
+    second = Scheduler(clock)
+    try:
+        restored = make_timer(second, store_dir)
+        assert restored.state.phase == PomodoroPhase.WORK
+        assert not restored.state.running
+        assert restored.seconds_left == WORK - 5 * 60
+        assert second.pending() == 0
+        restored.close()
+    finally:
+        second.close()
+
+
+def test_phase_ended_while_closed_completes_once(clock, store_dir):
+    first = Scheduler(clock)
+    timer = make_timer(first, store_dir)
+    timer.start()
+    timer.close()
+    first.close()
+
+    clock.advance(WORK + 3600)
+    second = Scheduler(clock)
+    try:
+        restored = make_timer(second, store_dir)
+        assert restored.state.phase == PomodoroPhase.SHORT_BREAK
+        assert not restored.state.running
+        assert restored.get_status()['completed_today'] == 1
+        restored.close()
+
+        # итог дня дописан в файл и переживает ещё один перезапуск
+        again = make_timer(second, store_dir)
+        assert again.get_history(1)[0]['pomodoros'] == 1
+        assert again.state.phase == PomodoroPhase.SHORT_BREAK
+        again.close()
+    finally:
+        second.close()
+
+
+@pytest.fixture
+def eager_switch():
+    # потоки переключаются почти на каждой инструкции - гонка видна сразу
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def test_history_while_days_roll_over(clock, scheduler, eager_switch):
+    # смена дня из другого потока не ломает обход истории
+    timer = make_timer(scheduler)
+    timer.MAX_DAYS = 50
+    errors = []
+
+    def read():
+        try:
+            for _ in range(2000):
+                assert len(timer.get_history(50)) <= 50
+        except Exception as e:
+            errors.append(e)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    while reader.is_alive():
+        clock.advance(86400)
+        timer.get_status()
+    reader.join()
+    assert errors == []
+    assert [day['date'] for day in timer.get_history(50)] == list(timer._days)[::-1]
@@ -0,0 +1,144 @@
+import random
+
+from afo.config import ConfigManager, ReminderItem, ReminderSettings
+from afo.reminders import ReminderManager, ReminderStore
+from afo.scheduler import Scheduler
+
+import pytest
+
+MINUTE = 60
+COUNT = 300
+
+
+def custom(interval_minutes, i):
+    return ReminderItem(id=f'c{i}', name=f'#{i}', interval_minutes=interval_minutes)
+
+
+def make_settings(intervals):
+    settings = ReminderSettings(custom=[custom(m, i) for i, m in enumerate(intervals)])
+    # встроенные не мешают считать срабатывания
+    settings.water.enabled = settings.stretch.enabled = False
+    return settings
+
+
+def make_manager(scheduler, settings, store=None):
+    manager = ReminderManager(settings, scheduler=scheduler, store=store)
+    fired = []
+    manager.add_listener(lambda r: fired.append((scheduler.clock.monotonic(), r.id)))
+    manager.start()
+    return manager, fired
+
+
+def next_in(manager, reminder_id):
+    return next(r['next_in_seconds'] for r in manager.get_status()['reminders'] if r['id'] == reminder_id)
+
+
+def test_hundreds_fire_in_order(scheduler):
+    intervals = list(range(1, COUNT + 1))
+    random.Random(1).shuffle(intervals)
+    manager, fired = make_manager(scheduler, make_settings(intervals))
+
+    horizon = 2 * COUNT * MINUTE
+    scheduler.run_until(horizon)
+
+    times = [t for t, _ in fired]
+    assert times == sorted(times)
+    # первые срабатывания - по возрастанию интервала
+    first = list(dict.fromkeys(rid for _, rid in fired))
+    assert first == [f'c{intervals.index(m)}' for m in range(1, COUNT + 1)]
+    # каждое - ровно по разу за интервал, без дрейфа
+    counts = {rid: 0 for rid in first}
+    for _, rid in fired:
+        counts[rid] += 1
+    for i, m in enumerate(intervals):
+        assert counts[f'c{i}'] == horizon // (m * MINUTE)
+    # по таймеру на напоминание, лишних в куче нет
+    assert scheduler.pending() == COUNT
+
+
+def test_snooze_survives_rearm(scheduler):
+    settings = make_settings([30] * COUNT)
+    manager, fired = make_manager(scheduler, settings)
+    scheduler.advance(10 * MINUTE)
+
+    manager.snooze('c7', minutes=60)
+    # stop/start и смена интервала перевзводят таймер через _rearm
+    manager.stop()
+    manager.start()
+    settings.custom[7].interval_minutes = 15
+    manager.update_settings(settings)
+    assert next_in(manager, 'c7') == 60 * MINUTE
+
+    scheduler.advance(50 * MINUTE)
+    assert 'c7' not in {rid for _, rid in fired}
+    status = next(r for r in manager.get_status()['reminders'] if r['id'] == 'c7')
+    assert status['snoozed']
+
+    scheduler.advance(10 * MINUTE)
+    assert [t for t, rid in fired if rid == 'c7'] == [70 * MINUTE]
+    # после срабатывания - снова по интервалу
+    assert next_in(manager, 'c7') == 15 * MINUTE
+
+
+@pytest.fixture
+def config(data_dir):
+    manager = ConfigManager()
+    yield manager
+    manager.close()
+
+
+def test_apply_changes_reschedules_only_changed(config, scheduler):
+    custom = [{'id': f'c{i}', 'name': f'#{i}', 'interval_minutes': 30 + i} for i in range(COUNT)]
+    config.patch({'reminders': {'water': {'enabled': False}, 'stretch': {'enabled': False}, 'custom': custom}})
+    manager, fired = make_manager(scheduler, config.config.reminders)
+    config.subscribe(manager.apply_changes, 'reminders')
+    scheduler.advance(10 * MINUTE)
+    before = {r['id']: r['next_in_seconds'] for r in manager.get_status()['reminders']}
+
+    custom[5]['interval_minutes'] = 12
+    del custom[9]
+    config.patch({'reminders': {'custom': custom}})
+
+    after = {r['id']: r['next_in_seconds'] for r in manager.get_status()['reminders']}
+    # новый интервал - от старта, а не от момента правки
+    assert after.pop('c5') == 2 * MINUTE
+    assert 'c9' not in after
+    del before['c5'], before['c9']
+    assert after == before
+    assert scheduler.pending() == COUNT - 1
+
+    scheduler.advance(2 * MINUTE)
+    assert [rid for _, rid in fired] == ['c5']
+
+
+def test_restart_catches_up_once(clock, data_dir):
+    data_dir.mkdir(parents=True, exist_ok=True)
+    intervals = [30 + i for i in range(COUNT)]
+
+    first = Scheduler(clock)
+    manager, _ = make_manager(first, make_settings(intervals), ReminderStore(data_dir))
+    first.advance(10 * MINUTE)
+    manager.snooze('c3', minutes=24 * 60 * 2)
+    manager.close()
+    first.close()
+
+    # приложение закрыто сутки - за это время каждое "сработало" бы десятки раз
+    clock.advance(24 * 3600)
+    second = Scheduler(clock)
+    try:
+        manager, fired = make_manager(second, make_settings(intervals), ReminderStore(data_dir))
+        second.advance(0)
+        restart = clock.monotonic()
+        # по одному разу, кроме отложенного на двое суток
+        assert sorted(rid for _, rid in fired) == sorted(f'c{i}' for i in range(COUNT) if i != 3)
+        assert next_in(manager, 'c3') == 24 * 3600
+
+        # следующий интервал - от срабатывания при старте
+        fired.clear()
+        second.advance(30 * MINUTE - 1)
+        assert fired == []
+        second.advance(1)
+        assert fired == [(restart + 30 * MINUTE, 'c0')]
+        manager.close()
+    finally:
+        second.close()
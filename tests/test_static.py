@@ -0,0 +1,101 @@
+import http.client
+from pathlib import Path
+
+import pytest
+
+from afo.static import parse_range
+
+SOUND = Path(__file__).parent.parent / 'afo' / 'sounds' / 'cafe.mp3'
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('bytes=0-99', (0, 99)),
+    ('bytes=100-', (100, 999)),
+    ('bytes=-100', (900, 999)),
+    ('bytes=-5000', (0, 999)),
+    ('bytes=900-5000', (900, 999)),
+    ('bytes=999-999', (999, 999)),
+    # целиком: нет заголовка, несколько диапазонов, мусор, перевёрнутый диапазон
+    (None, None),
+    ('bytes=0-1,5-9', None),
+    ('items=0-1', None),
+    ('bytes=abc', None),
+    ('bytes=5-1', None),
+    ('bytes=-', None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize('header, size', [
+    ('bytes=1000-', 1000),
+    ('bytes=1000-2000', 1000),
+    ('bytes=-0', 1000),
+    ('bytes=-10', 0),
+])
+def test_parse_range_unsatisfiable(header, size):
+    with pytest.raises(ValueError):
+        parse_range(header, size)
+
+
+@pytest.fixture
+def get(orchestrator):
+    conn = http.client.HTTPConnection('127.0.0.1', orchestrator.server.port, timeout=5)
+
+    def request(**headers):
+        conn.request('GET', '/sounds/' + SOUND.name, headers=headers)
+        response = conn.getresponse()
+        return response, response.read()
+
+    yield request
+    conn.close()
+
+
+def test_full_file(get):
+    data = SOUND.read_bytes()
+    response, body = get()
+    assert response.status == 200
+    assert body == data
+    assert response.getheader('Accept-Ranges') == 'bytes'
+    assert int(response.getheader('Content-Length')) == len(data)
+
+
+def test_single_range(get):
+    data = SOUND.read_bytes()
+    response, body = get(Range='bytes=10-109')
+    assert response.status == 206
+    assert body == data[10:110]
+    assert response.getheader('Content-Range') == f'bytes 10-109/{len(data)}'
+
+
+def test_suffix_range(get):
+    data = SOUND.read_bytes()
+    response, body = get(Range='bytes=-64')
+    assert response.status == 206
+    assert body == data[-64:]
+    assert response.getheader('Content-Range') == f'bytes {len(data) - 64}-{len(data) - 1}/{len(data)}'
+
+
+def test_unsatisfiable_range(get):
+    size = SOUND.stat().st_size
+    response, body = get(Range=f'bytes={size}-')
+    assert response.status == 416
+    assert body == b''
+    assert response.getheader('Content-Range') == f'bytes */{size}'
+    # соединение keep-alive живо после 416
+    response, _ = get(Range='bytes=0-0')
+    assert response.status == 206
+
+
+def test_if_range(get):
+    data = SOUND.read_bytes()
+    etag = get()[0].getheader('ETag')
+
+    response, body = get(Range='bytes=0-9', **{'If-Range': etag})
+    assert response.status == 206
+    assert body == data[:10]
+
+    # файл поменялся с тех пор - отдаётся целиком
+    response, body = get(Range='bytes=0-9', **{'If-Range': '"stale"'})
+    assert response.status == 200
+    assert body == data
@@ -0,0 +1,70 @@
+import time
+
+from afo import storage
+from afo.storage import DebouncedWriter
+
+
+class FlakyWrite:
+    # падает, пока broken
+
+    def __init__(self):
+        self.broken = True
+        self.attempts = []
+        self.writes = 0
+
+    def __call__(self):
+        self.attempts.append(time.monotonic())
+        if self.broken:
+            raise OSError("disk full")
+        self.writes += 1
+
+
+def test_failing_write_backs_off(capsys):
+    write = FlakyWrite()
+    writer = DebouncedWriter(write, delay=0.01, max_delay=0.05, name='test', max_retry_delay=0.08)
+    try:
+        writer.save()
+        # новые изменения посреди серии ошибок не ускоряют повторы
+        deadline = time.monotonic() + 0.6
+        while time.monotonic() < deadline:
+            writer.save()
+            time.sleep(0.005)
+
+        # без backoff было бы ~60 попыток, с ним - около 10
+        assert 4 <= len(write.attempts) <= 15
+        gaps = [b - a for a, b in zip(write.attempts, write.attempts[1:])]
+        assert gaps[-1] >= 0.06
+        assert capsys.readouterr().out.count('Write error (test)') == 1
+
+        write.broken = False
+        time.sleep(0.15)
+        assert write.writes == 1
+        out = capsys.readouterr().out
+        assert 'Write recovered (test)' in out
+        assert writer.stats()['failed'] == len(write.attempts) - 1
+    finally:
+        writer.close()
+
+
+def test_close_flushes_despite_backoff():
+    write = FlakyWrite()
+    writer = DebouncedWriter(write, delay=0.01, name='test', max_retry_delay=60)
+    writer.save()
+    time.sleep(0.05)
+    assert write.writes == 0
+    # следующий повтор только через секунды, но close() пишет сразу
+    write.broken = False
+    writer.close()
+    assert write.writes == 1
+
+
+def test_close_unregisters_exit_flush(monkeypatch):
+    hooks = []
+    monkeypatch.setattr(storage.atexit, 'register', hooks.append)
+    monkeypatch.setattr(storage.atexit, 'unregister', hooks.remove)
+    writers = [DebouncedWriter(FlakyWrite(), name='test') for _ in range(3)]
+    assert len(hooks) == 3
+    for writer in writers:
+        writer.close()
+    # писатели не копятся в atexit
+    assert hooks == []
@@ -0,0 +1,82 @@
+import threading
+import time
+
+from afo import metrics
+from afo.backend import SimulatedBackend
+from afo.scheduler import Scheduler
+from afo.tracker import ActivityTracker
+
+
+class StuckBackend(SimulatedBackend):
+    # опрос окна висит, пока не отпустят
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+        self.calls = 0
+
+    def foreground_window(self):
+        self.calls += 1
+        self.release.wait(5)
+        return super().foreground_window()
+
+
+def test_stuck_tick_does_not_block_timers():
+    scheduler = Scheduler(name='test')
+    backend = StuckBackend()
+    tracker = ActivityTracker(scheduler=scheduler, backend=backend)
+    tracker.TICK_INTERVAL = 0.01
+    fired = threading.Event()
+    try:
+        tracker.start()
+        time.sleep(0.05)
+        # тик встал в пуле, а таймеры планировщика идут
+        scheduler.call_later(0.01, fired.set)
+        assert fired.wait(1)
+        time.sleep(0.05)
+        # новые тики пропускаются, а не копятся в очереди пула
+        assert backend.calls == 1
+        assert tracker._task.skipped > 0
+
+        backend.release.set()
+        deadline = time.monotonic() + 1
+        while backend.calls < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert backend.calls >= 3
+        assert tracker.state.current_app == 'code'
+    finally:
+        backend.release.set()
+        tracker.stop()
+        scheduler.close()
+
+
+class BrokenBackend(SimulatedBackend):
+    # опрос простоя падает, пока broken
+
+    def __init__(self):
+        super().__init__()
+        self.broken = True
+
+    def idle_seconds(self):
+        if self.broken:
+            raise OSError("GetLastInputInfo failed")
+        return super().idle_seconds()
+
+
+def test_failing_tick_is_counted_and_logged_once(scheduler, capsys):
+    backend = BrokenBackend()
+    tracker = ActivityTracker(scheduler=scheduler, backend=backend)
+    before = metrics.TRACKER_TICK_ERRORS.collect().get((), 0)
+    tracker.start()
+    try:
+        # первый тик - сразу при старте
+        scheduler.advance(5 * tracker.TICK_INTERVAL)
+        assert metrics.TRACKER_TICK_ERRORS.collect()[()] - before == 6
+        assert capsys.readouterr().out.count('Tracker tick error: GetLastInputInfo failed') == 1
+
+        backend.broken = False
+        scheduler.advance(tracker.TICK_INTERVAL)
+        assert 'Tracker recovered after 6 failed ticks' in capsys.readouterr().out
+        assert tracker.state.current_app == 'code'
+    finally:
+        tracker.stop()
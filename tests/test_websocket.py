@@ -0,0 +1,99 @@
+import io
+import socket
+import struct
+import time
+
+import pytest
+
+from afo import websocket
+from afo.server import APIHandler
+
+
+@pytest.fixture
+def client(orchestrator):
+    ws = websocket.WebSocketClient(port=orchestrator.server.port, timeout=5)
+    yield ws
+    ws.close()
+
+
+def test_command_roundtrip(client, orchestrator):
+    reply = client.command('pomodoro.start')
+    assert reply['ok'] is True
+    assert orchestrator.pomodoro.state.running
+
+
+def test_bad_param_type_keeps_connection(client):
+    # "minutes": "5" - TypeError внутри команды
+    reply = client.command('reminders.snooze', id='water', minutes='5')
+    assert reply['ok'] is False
+    assert 'error' in reply
+    # соединение живо
+    assert client.command('pomodoro.start')['ok'] is True
+
+
+def test_unknown_command(client):
+    reply = client.command('nope')
+    assert reply == {'type': 'ack', 'id': reply['id'], 'ok': False, 'error': 'unknown command: nope'}
+
+
+def test_frame_sent_with_handshake_is_not_lost(orchestrator):
+    # клиент шлёт кадр сразу за запросом, не дожидаясь 101
+    sock = socket.create_connection(('127.0.0.1', orchestrator.server.port), timeout=5)
+    frame = websocket.encode_frame(websocket.OP_TEXT, b'{"id": 1, "cmd": "pomodoro.start"}', mask=True)
+    sock.sendall(
+        b"GET /api/ws HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+        b"Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\nSec-WebSocket-Version: 13\r\n\r\n" + frame)
+    stream = sock.makefile('rb')
+    while stream.readline().strip():
+        pass
+    opcode, payload = websocket.read_message(stream, sock.sendall, mask=True)
+    assert opcode == websocket.OP_TEXT
+    assert b'"ok": true' in payload
+    sock.close()
+
+
+def test_idle_connection_gets_ping_and_dead_one_is_closed(orchestrator, monkeypatch):
+    monkeypatch.setattr(APIHandler, 'WS_PING_INTERVAL', 0.1)
+    ws = websocket.WebSocketClient(port=orchestrator.server.port, timeout=5)
+    # живой клиент отвечает на ping (как браузер) - пингов больше лимита, а связь есть
+    for _ in range(APIHandler.WS_MISSED_PINGS + 2):
+        fin, opcode, payload = websocket.read_frame(ws.stream)
+        assert opcode == websocket.OP_PING
+        ws.sock.sendall(websocket.encode_frame(websocket.OP_PONG, payload, mask=True))
+    assert ws.command('pomodoro.start')['ok'] is True
+
+    # клиент, который не отвечает, закрывается сервером
+    started = time.monotonic()
+    opcodes = []
+    while True:
+        fin, opcode, _ = websocket.read_frame(ws.stream)
+        opcodes.append(opcode)
+        if opcode == websocket.OP_CLOSE:
+            break
+    assert opcodes == [websocket.OP_PING] * APIHandler.WS_MISSED_PINGS + [websocket.OP_CLOSE]
+    assert time.monotonic() - started < 2
+    ws.sock.close()
+
+
+def test_stop_closes_open_websockets(orchestrator):
+    ws = websocket.WebSocketClient(port=orchestrator.server.port, timeout=5)
+    started = time.monotonic()
+    orchestrator.stop()
+    with pytest.raises((ConnectionError, OSError)):
+        ws.recv_json()
+    assert time.monotonic() - started < 5
+    ws.sock.close()
+
+
+def test_unmasked_client_frame_closes_with_protocol_error(client):
+    # RFC 6455: кадры клиента всегда с маской, иначе 1002
+    client.sock.sendall(websocket.encode_frame(websocket.OP_TEXT, b'{"cmd": "pomodoro.start"}'))
+    fin, opcode, payload = websocket.read_frame(client.stream)
+    assert opcode == websocket.OP_CLOSE
+    assert struct.unpack('!H', payload)[0] == websocket.CLOSE_PROTOCOL_ERROR
+
+
+def test_masked_server_frame_is_rejected():
+    frame = websocket.encode_frame(websocket.OP_TEXT, b'{}', mask=True)
+    with pytest.raises(websocket.WebSocketError):
+        websocket.read_frame(io.BytesIO(frame), masked=False)